@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import Board, BoardLog, Capability, PCStats, Relay, TestPC
+from .models import Board, BoardLog, Capability, PCStats, PCStatsRollup, Relay, TestPC
 
 
 @admin.register(Capability)
@@ -36,6 +37,7 @@ class BoardAdmin(admin.ModelAdmin):
         "is_locked",
         "relay",
         "test_pc",
+        "health_score",
         "last_heartbeat_at",
     )
     search_fields = ("name", "hardware_serial_number", "project", "board_ip")
@@ -43,6 +45,13 @@ class BoardAdmin(admin.ModelAdmin):
     raw_id_fields = ("relay", "test_pc")
     filter_horizontal = ("capabilities",)
     ordering = ("name",)
+    readonly_fields = ("health_score", "health_updated_at")
+    actions = ["reset_health_score"]
+
+    @admin.action(description="Reset health score of selected boards")
+    def reset_health_score(self, request, queryset):
+        updated = queryset.update(health_score=1.0, health_updated_at=timezone.now())
+        self.message_user(request, f"Reset the health score of {updated} boards.")
 
 
 @admin.register(PCStats)
@@ -53,6 +62,22 @@ class PCStatsAdmin(admin.ModelAdmin):
     ordering = ("-timestamp",)
 
 
+@admin.register(PCStatsRollup)
+class PCStatsRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "test_pc",
+        "resolution",
+        "bucket_start",
+        "samples",
+        "cpu_avg",
+        "memory_avg",
+        "disk_avg",
+    )
+    list_filter = ("resolution",)
+    search_fields = ("test_pc__hostname",)
+    ordering = ("-bucket_start",)
+
+
 @admin.register(BoardLog)
 class BoardLogAdmin(admin.ModelAdmin):
     list_display = ("board", "level", "created_at")
@@ -6,3 +6,5 @@ class BoardsConfig(AppConfig):
     name = "apps.boards"
     verbose_name = "Boards"
 
+    def ready(self):
+        from . import signals  # noqa: F401
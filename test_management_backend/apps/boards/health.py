@@ -0,0 +1,153 @@
+"""Board health scores, kept as exponentially weighted averages of recent events.
+
+Every event moves a board's score in [0, 1] part of the way towards the event's outcome (1 for
+a passed request or an on-time heartbeat, 0 for a failed request, an ERROR log or a late
+heartbeat) with one UPDATE, so recording an event costs the same however long the board's
+history is. The dispatcher serves boards below DISPATCHER_HEALTH_DEPRIORITIZE_SCORE last and
+gives none below DISPATCHER_QUARANTINE_SCORE new work; on-time heartbeats lift a quarantined
+board back out.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from .models import Board, BoardLog
+
+logger = logging.getLogger(__name__)
+
+# Outcome of a BoardLog entry by level; INFO entries leave the score alone.
+LOG_OUTCOMES = {"WARN": 0.5, "ERROR": 0.0}
+
+
+def record(board_ids: Iterable, outcome: float, alpha: Optional[float] = None):
+    """Move the scores of ``board_ids`` towards ``outcome``, once per occurrence of each id."""
+    alpha = settings.BOARD_HEALTH_ALPHA if alpha is None else alpha
+    by_weight = defaultdict(list)
+    for board_id, events in Counter(board_id for board_id in board_ids if board_id).items():
+        # k events in one batch weigh as much as k single updates in a row.
+        by_weight[1 - (1 - alpha) ** events].append(board_id)
+    for weight, ids in by_weight.items():
+        _log_crossings(ids, outcome, weight)
+        Board.objects.filter(pk__in=ids).update(
+            health_score=F("health_score") * (1 - weight) + weight * outcome,
+            health_updated_at=timezone.now(),
+        )
+
+
+def record_results(results: Iterable[Tuple[object, bool]]):
+    """Count finished requests, as (board_id, success) pairs, towards their boards' scores."""
+    results = list(results)
+    record([board_id for board_id, success in results if success], 1.0)
+    record([board_id for board_id, success in results if not success], 0.0)
+
+
+def record_logs(board_ids: Iterable, level: str):
+    """Count BoardLog entries of one level towards their boards' scores."""
+    if level in LOG_OUTCOMES:
+        record(board_ids, LOG_OUTCOMES[level])
+
+
+def record_heartbeats(board_ids: Iterable, now=None):
+    """Stamp heartbeats, counting one later than BOARD_HEARTBEAT_MAX_GAP as a miss."""
+    now = now or timezone.now()
+    rows = Board.objects.filter(pk__in=list(board_ids)).values_list(
+        "pk", "last_heartbeat_at", "health_score"
+    )
+    apply_heartbeats({pk: (previous, score, now) for pk, previous, score in rows})
+
+
+def apply_heartbeats(beats: Dict[object, Tuple[Optional[datetime], float, datetime]]):
+    """Stamp heartbeats with one UPDATE.
+
+    ``beats`` maps pk to (last_heartbeat_at, health_score, new stamp).
+    """
+    if not beats:
+        return
+    alpha = settings.BOARD_HEALTH_HEARTBEAT_ALPHA
+    max_gap = timedelta(seconds=settings.BOARD_HEARTBEAT_MAX_GAP)
+    late = {
+        pk
+        for pk, (previous, _score, seen) in beats.items()
+        if previous is not None and seen - previous > max_gap
+    }
+    by_stamp = defaultdict(list)
+    for pk, (_previous, _score, seen) in beats.items():
+        by_stamp[seen].append(pk)
+    if len(by_stamp) == 1:
+        stamp = next(iter(by_stamp))
+    else:
+        stamp = Case(
+            *[When(pk__in=ids, then=Value(seen)) for seen, ids in by_stamp.items()],
+            output_field=DateTimeField(),
+        )
+    decayed = F("health_score") * (1 - alpha)
+    Board.objects.filter(pk__in=list(beats)).update(
+        last_heartbeat_at=stamp,
+        health_score=(
+            Case(When(pk__in=late, then=decayed), default=decayed + alpha)
+            if late
+            else decayed + alpha
+        ),
+        health_updated_at=timezone.now(),
+    )
+
+    threshold = settings.DISPATCHER_QUARANTINE_SCORE
+    entering, leaving = [], []
+    for pk, (_previous, score, _seen) in beats.items():
+        new_score = score * (1 - alpha) + (0.0 if pk in late else alpha)
+        if score >= threshold > new_score:
+            entering.append(pk)
+        elif score < threshold <= new_score:
+            leaving.append(pk)
+    _log_quarantine(entering, leaving)
+
+
+def _log_crossings(board_ids: List, outcome: float, weight: float):
+    """Log boards this update takes into or out of quarantine, found before it is applied."""
+    threshold = settings.DISPATCHER_QUARANTINE_SCORE
+    if weight >= 1:
+        bound = None
+    else:
+        # Scores on this side of ``bound`` end up on the other side of the threshold.
+        bound = (threshold - weight * outcome) / (1 - weight)
+    if outcome < threshold:
+        crossing = Board.objects.filter(pk__in=board_ids, health_score__gte=threshold)
+        if bound is not None:
+            crossing = crossing.filter(health_score__lt=bound)
+        _log_quarantine(entering=list(crossing.values_list("pk", flat=True)))
+    else:
+        crossing = Board.objects.filter(pk__in=board_ids, health_score__lt=threshold)
+        if bound is not None:
+            crossing = crossing.filter(health_score__gte=bound)
+        _log_quarantine(leaving=list(crossing.values_list("pk", flat=True)))
+
+
+def _log_quarantine(entering: Iterable = (), leaving: Iterable = ()):
+    threshold = settings.DISPATCHER_QUARANTINE_SCORE
+    entries = [
+        BoardLog(
+            board_id=pk, level="WARN", message=f"Quarantined: health score fell below {threshold}"
+        )
+        for pk in entering
+    ] + [
+        BoardLog(
+            board_id=pk,
+            level="INFO",
+            message=f"Released from quarantine: health score back above {threshold}",
+        )
+        for pk in leaving
+    ]
+    if entries:
+        # bulk_create sends no post_save, so these entries do not feed back into the scores.
+        BoardLog.objects.bulk_create(entries)
+    if entering:
+        logger.warning(
+            "Quarantined boards %s: health score fell below %s", list(entering), threshold
+        )
+    if leaving:
+        logger.info("Released boards %s from quarantine", list(leaving))
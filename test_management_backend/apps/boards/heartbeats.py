@@ -0,0 +1,217 @@
+"""Batched heartbeats from TestPC agents, reporting the PC and all of its boards in one call.
+
+Every reported board gets its heartbeat stamp in one multi-row UPDATE. Only boards whose
+liveness or status actually changed are written again, logged, and announced through
+``boards_changed`` so the dispatcher can pick up boards that came back.
+
+With BOARD_HEARTBEAT_WRITE_BEHIND the stamps go to the cache instead, one entry per PC
+holding the latest heartbeat of the PC and each of its boards, and ``flush`` persists and
+drops them every BOARD_HEARTBEAT_FLUSH_SECONDS. Liveness and status changes are still written
+at once. Readers of last_heartbeat_at should take the later of the column and ``buffered``.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import health
+from .models import Board, BoardLog, TestPC
+from .signals import BoardChange, boards_changed
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "boards:heartbeats:{test_pc_id}"
+
+# Statuses the dispatcher sets while a board runs a request; heartbeats leave them alone.
+DISPATCHER_STATUSES = ("BUSY",)
+
+
+@dataclass
+class BoardReport:
+    id: object
+    is_alive: bool = True
+    status: Optional[str] = None
+
+
+@dataclass
+class HeartbeatResult:
+    """What one heartbeat call stamped and changed."""
+
+    seen: int = 0
+    changed: List[BoardChange] = field(default_factory=list)
+    # Reported ids that are not boards of this TestPC.
+    unknown: List = field(default_factory=list)
+
+
+def _next_state(report: BoardReport, is_alive: bool, status: str, is_locked: bool):
+    """Liveness and status after a report.
+
+    Without an explicit status, liveness moves boards between IDLE and OFFLINE.
+    """
+    if status in DISPATCHER_STATUSES or is_locked:
+        return report.is_alive, status
+    if report.status:
+        return report.is_alive, report.status
+    if not report.is_alive and status == "IDLE":
+        return False, "OFFLINE"
+    if report.is_alive and status == "OFFLINE":
+        return True, "IDLE"
+    return report.is_alive, status
+
+
+def apply(
+    test_pc: TestPC, reports: Iterable[BoardReport], pc_status: Optional[str] = None, now=None
+):
+    """Stamp the PC and its reported boards as seen and apply liveness/status changes."""
+    now = now or timezone.now()
+    reports: Dict[object, BoardReport] = {report.id: report for report in reports}
+    result = HeartbeatResult()
+    write_behind = settings.BOARD_HEARTBEAT_WRITE_BEHIND
+    with transaction.atomic():
+        pc_updates = {} if write_behind else {"last_heartbeat_at": now}
+        if pc_status and pc_status != test_pc.status:
+            pc_updates["status"] = pc_status
+        if pc_updates:
+            TestPC.objects.filter(pk=test_pc.pk).update(**pc_updates)
+
+        rows = Board.objects.filter(test_pc=test_pc, pk__in=list(reports)).values_list(
+            "pk", "is_alive", "status", "is_locked", "last_heartbeat_at", "health_score"
+        )
+        current, beats = {}, {}
+        for pk, is_alive, status, is_locked, last_heartbeat_at, score in rows:
+            current[pk] = (is_alive, status, is_locked)
+            beats[pk] = (last_heartbeat_at, score, now)
+        if write_behind:
+            _buffer(test_pc.pk, list(current), now)
+        else:
+            health.apply_heartbeats(beats)
+        result.seen = len(current)
+        result.unknown = [pk for pk in reports if pk not in current]
+
+        for pk, (is_alive, status, is_locked) in current.items():
+            new_alive, new_status = _next_state(reports[pk], is_alive, status, is_locked)
+            if (new_alive, new_status) != (is_alive, status):
+                result.changed.append(BoardChange(pk, is_alive, status, new_alive, new_status))
+        if result.changed:
+            _write_changes(result.changed)
+            boards_changed.send(sender=Board, changes=result.changed)
+
+    if result.changed:
+        logger.info(
+            "Heartbeat from %s changed %s of %s boards",
+            test_pc.hostname,
+            len(result.changed),
+            result.seen,
+        )
+    return result
+
+
+def _buffer(test_pc_id, board_ids: List, now: datetime):
+    # Only this PC's agent writes its entry, so read-modify-write does not race in practice.
+    key = BUFFER_KEY.format(test_pc_id=test_pc_id)
+    entry = cache.get(key) or {"seen_at": None, "boards": {}}
+    entry["seen_at"] = now
+    entry["boards"].update({str(pk): now for pk in board_ids})
+    cache.set(key, entry, timeout=None)
+
+
+def buffered(test_pc_ids: Iterable) -> Dict[object, dict]:
+    """Buffered entries by PC id.
+
+    Each entry is ``{"seen_at": datetime, "boards": {board id string: datetime}}``.
+    """
+    if not settings.BOARD_HEARTBEAT_WRITE_BEHIND:
+        return {}
+    keys = {BUFFER_KEY.format(test_pc_id=pc_id): pc_id for pc_id in test_pc_ids}
+    return {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+
+
+def latest(stored: Optional[datetime], pending: Optional[datetime]) -> Optional[datetime]:
+    """The later of a last_heartbeat_at column and its buffered value.
+
+    Either of them may be missing.
+    """
+    if stored is None or (pending is not None and pending > stored):
+        return pending
+    return stored
+
+
+def flush() -> Dict[str, int]:
+    """Persist buffered heartbeats newer than the database: one UPDATE for PCs, one for boards.
+
+    Stamps the database already has are skipped, which makes flushing the same entries again a
+    no-op. Entries are dropped from the cache only once committed, and only if no heartbeat
+    replaced them meanwhile; after a failed flush they stay buffered and readers still see them.
+    """
+    entries = buffered(TestPC.objects.values_list("pk", flat=True))
+    if not entries:
+        return {"test_pcs": 0, "boards": 0}
+
+    with transaction.atomic():
+        pc_rows = TestPC.objects.filter(pk__in=list(entries)).values_list("pk", "last_heartbeat_at")
+        pcs = {
+            pk: entries[pk]["seen_at"]
+            for pk, stored in pc_rows
+            if latest(stored, entries[pk]["seen_at"]) != stored
+        }
+        if pcs:
+            TestPC.objects.filter(pk__in=list(pcs)).update(
+                last_heartbeat_at=Case(*[When(pk=pk, then=Value(seen)) for pk, seen in pcs.items()])
+            )
+
+        stamps = {
+            board_id: seen
+            for entry in entries.values()
+            for board_id, seen in entry["boards"].items()
+        }
+        rows = Board.objects.filter(pk__in=list(stamps)).values_list(
+            "pk", "last_heartbeat_at", "health_score"
+        )
+        beats = {
+            pk: (stored, score, stamps[str(pk)])
+            for pk, stored, score in rows
+            if latest(stored, stamps[str(pk)]) != stored
+        }
+        health.apply_heartbeats(beats)
+        transaction.on_commit(lambda: _discard(entries))
+
+    logger.debug("Flushed buffered heartbeats of %s PCs and %s boards", len(pcs), len(beats))
+    return {"test_pcs": len(pcs), "boards": len(beats)}
+
+
+def _discard(entries: Dict[object, dict]):
+    """Drop flushed entries that are still the ones in the cache."""
+    flushed = {BUFFER_KEY.format(test_pc_id=pk): entry for pk, entry in entries.items()}
+    current = cache.get_many(list(flushed))
+    cache.delete_many([key for key, entry in current.items() if entry == flushed[key]])
+
+
+def _write_changes(changes: List[BoardChange]):
+    Board.objects.filter(pk__in=[change.board_id for change in changes]).update(
+        is_alive=Case(
+            *[When(pk=change.board_id, then=Value(change.is_alive)) for change in changes]
+        ),
+        status=Case(
+            *[When(pk=change.board_id, then=Value(change.status)) for change in changes],
+            default=F("status"),
+        ),
+    )
+    entries = []
+    for change in changes:
+        level = "INFO"
+        if change.status == "ERROR":
+            level = "ERROR"
+        elif change.status == "OFFLINE" or not change.is_alive:
+            level = "WARN"
+        liveness = "alive" if change.is_alive else "not alive"
+        message = f"Heartbeat: {change.was_status} -> {change.status}, {liveness}"
+        entries.append(BoardLog(board_id=change.board_id, level=level, message=message))
+    BoardLog.objects.bulk_create(entries)
+    for level in health.LOG_OUTCOMES:
+        health.record_logs([entry.board_id for entry in entries if entry.level == level], level)
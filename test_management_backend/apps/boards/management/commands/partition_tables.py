@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.boards import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Show and maintain time partitioning of PCStats and BoardLog on PostgreSQL, "
+        "or convert the tables to it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "tables",
+            nargs="*",
+            help=f"Tables to act on: {', '.join(partitions.TABLES)} (default all)",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Rebuild plain tables as partitioned ones, copying rows under an exclusive lock",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["tables"]) - set(partitions.TABLES)
+        if unknown:
+            raise CommandError(f"Unknown tables: {', '.join(sorted(unknown))}")
+        if connection.vendor != "postgresql":
+            if options["convert"]:
+                raise CommandError("Table partitioning needs PostgreSQL.")
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{connection.vendor} has no table partitioning; "
+                    "retention deletes rows in chunks."
+                )
+            )
+            return
+
+        for key in options["tables"] or partitions.TABLES:
+            spec = partitions.TABLES[key]
+            if options["convert"] and not partitions.is_partitioned(spec):
+                copied = partitions.convert(spec)
+                self.stdout.write(
+                    self.style.SUCCESS(f"Partitioned {spec.table}, copying {copied} rows.")
+                )
+        partitions.maintain()
+        for key in options["tables"] or partitions.TABLES:
+            spec = partitions.TABLES[key]
+            if partitions.is_partitioned(spec):
+                starts = sorted(partitions.partitions(spec))
+                self.stdout.write(
+                    f"{spec.table}: {len(starts)} partitions of {spec.step.days} days, "
+                    f"{starts[0]:%Y-%m-%d} to {starts[-1] + spec.step:%Y-%m-%d}"
+                )
+            else:
+                self.stdout.write(f"{spec.table}: not partitioned")
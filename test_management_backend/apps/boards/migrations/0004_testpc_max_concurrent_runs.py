@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0003_rename_boards_boar_name_5ff716_idx_boards_boar_name_110f36_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testpc",
+            name="max_concurrent_runs",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text=(
+                    "Most boards on this PC running tests at once; "
+                    "empty uses the dispatcher default"
+                ),
+                null=True,
+            ),
+        ),
+    ]
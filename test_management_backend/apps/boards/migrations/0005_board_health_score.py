@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0004_testpc_max_concurrent_runs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="board",
+            name="health_score",
+            field=models.FloatField(
+                default=1.0,
+                help_text=(
+                    "Weighted average of recent request results, error logs and heartbeats (0-1)"
+                ),
+            ),
+        ),
+        migrations.AddField(
+            model_name="board",
+            name="health_updated_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When the health score last changed", null=True
+            ),
+        ),
+    ]
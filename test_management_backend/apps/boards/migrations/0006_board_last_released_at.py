@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0005_board_health_score"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="board",
+            name="last_released_at",
+            field=models.DateTimeField(
+                blank=True, help_text="When the board last finished a request", null=True
+            ),
+        ),
+    ]
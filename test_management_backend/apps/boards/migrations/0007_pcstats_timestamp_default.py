@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0006_board_last_released_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pcstats",
+            name="timestamp",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="When this stat was recorded",
+            ),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0007_pcstats_timestamp_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PCStatsRollupMark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("1m", "1 minute"), ("1h", "1 hour"), ("1d", "1 day")],
+                        max_length=2,
+                        unique=True,
+                    ),
+                ),
+                ("rolled_up_to", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PCStatsRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("1m", "1 minute"), ("1h", "1 hour"), ("1d", "1 day")],
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "bucket_start",
+                    models.DateTimeField(help_text="Start of the aggregated interval"),
+                ),
+                (
+                    "samples",
+                    models.PositiveIntegerField(help_text="Raw samples the interval aggregates"),
+                ),
+                ("cpu_avg", models.FloatField()),
+                ("cpu_min", models.FloatField()),
+                ("cpu_max", models.FloatField()),
+                ("cpu_p95", models.FloatField()),
+                ("memory_avg", models.FloatField()),
+                ("memory_min", models.FloatField()),
+                ("memory_max", models.FloatField()),
+                ("memory_p95", models.FloatField()),
+                ("disk_avg", models.FloatField()),
+                ("disk_min", models.FloatField()),
+                ("disk_max", models.FloatField()),
+                ("disk_p95", models.FloatField()),
+                ("network_read_avg", models.FloatField()),
+                ("network_read_min", models.FloatField()),
+                ("network_read_max", models.FloatField()),
+                ("network_read_p95", models.FloatField()),
+                ("network_write_avg", models.FloatField()),
+                ("network_write_min", models.FloatField()),
+                ("network_write_max", models.FloatField()),
+                ("network_write_p95", models.FloatField()),
+                (
+                    "test_pc",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats_rollups",
+                        to="boards.testpc",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "PC Stats Rollup",
+                "verbose_name_plural": "PC Stats Rollups",
+                "ordering": ("test_pc", "resolution", "-bucket_start"),
+                "indexes": [
+                    models.Index(
+                        fields=["resolution", "bucket_start"], name="boards_pcst_resolut_b9ec0a_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("test_pc", "resolution", "bucket_start"),
+                        name="unique_pc_stats_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
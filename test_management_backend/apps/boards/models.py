@@ -1,6 +1,7 @@
 """Hardware board and infrastructure models."""
 import uuid
 
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from django.db import models
 from django.utils import timezone
@@ -132,6 +133,11 @@ class TestPC(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last heartbeat received from this PC")
+    max_concurrent_runs = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Most boards on this PC running tests at once; empty uses the dispatcher default",
+    )
 
     class Meta:
         ordering = ("hostname",)
@@ -199,7 +205,9 @@ class PCStats(models.Model):
     network_io_write_mb = models.FloatField(default=0, help_text="Network write in MB")
     process_count = models.PositiveIntegerField(help_text="Number of active test processes")
     thread_count = models.PositiveIntegerField(help_text="Number of active test threads")
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True, help_text="When this stat was recorded")
+    timestamp = models.DateTimeField(
+        default=timezone.now, db_index=True, help_text="When this stat was recorded"
+    )
 
     class Meta:
         ordering = ("-timestamp",)
@@ -232,6 +240,70 @@ class PCStats(models.Model):
         return self.memory_total_gb - self.memory_used_gb
 
 
+class PCStatsRollup(models.Model):
+    """Aggregated PCStats of one TestPC over one minute, hour or day."""
+
+    RESOLUTION_CHOICES = [
+        ("1m", _("1 minute")),
+        ("1h", _("1 hour")),
+        ("1d", _("1 day")),
+    ]
+
+    test_pc = models.ForeignKey(TestPC, on_delete=models.CASCADE, related_name="stats_rollups")
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField(help_text="Start of the aggregated interval")
+    samples = models.PositiveIntegerField(help_text="Raw samples the interval aggregates")
+    cpu_avg = models.FloatField()
+    cpu_min = models.FloatField()
+    cpu_max = models.FloatField()
+    cpu_p95 = models.FloatField()
+    memory_avg = models.FloatField()
+    memory_min = models.FloatField()
+    memory_max = models.FloatField()
+    memory_p95 = models.FloatField()
+    disk_avg = models.FloatField()
+    disk_min = models.FloatField()
+    disk_max = models.FloatField()
+    disk_p95 = models.FloatField()
+    network_read_avg = models.FloatField()
+    network_read_min = models.FloatField()
+    network_read_max = models.FloatField()
+    network_read_p95 = models.FloatField()
+    network_write_avg = models.FloatField()
+    network_write_min = models.FloatField()
+    network_write_max = models.FloatField()
+    network_write_p95 = models.FloatField()
+
+    class Meta:
+        ordering = ("test_pc", "resolution", "-bucket_start")
+        verbose_name = _("PC Stats Rollup")
+        verbose_name_plural = _("PC Stats Rollups")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["test_pc", "resolution", "bucket_start"], name="unique_pc_stats_rollup"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["resolution", "bucket_start"]),
+        ]
+
+    def __str__(self):
+        return f"{self.test_pc_id} {self.resolution} @ {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
+class PCStatsRollupMark(models.Model):
+    """High-water mark of one rollup resolution: everything before it has been aggregated."""
+
+    resolution = models.CharField(
+        max_length=2, choices=PCStatsRollup.RESOLUTION_CHOICES, unique=True
+    )
+    rolled_up_to = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.resolution} rolled up to {self.rolled_up_to:%Y-%m-%d %H:%M}"
+
+
 class Board(models.Model):
     """Hardware board (EVM) model."""
 
@@ -324,7 +396,17 @@ class Board(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="Creation timestamp")
     updated_at = models.DateTimeField(auto_now=True, help_text="Last update timestamp")
     last_used_at = models.DateTimeField(null=True, blank=True, help_text="Last test execution timestamp")
+    last_released_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the board last finished a request"
+    )
     last_heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last heartbeat timestamp")
+    health_score = models.FloatField(
+        default=1.0,
+        help_text="Weighted average of recent request results, error logs and heartbeats (0-1)",
+    )
+    health_updated_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the health score last changed"
+    )
 
     class Meta:
         ordering = ("name",)
@@ -364,12 +446,18 @@ class Board(models.Model):
     def is_healthy(self):
         return self.is_alive and self.status != "ERROR"
 
+    @property
+    def is_quarantined(self):
+        return self.health_score < settings.DISPATCHER_QUARANTINE_SCORE
+
     def get_available_capabilities(self):
         return self.capabilities.filter(is_active=True)
 
     def mark_seen(self):
+        from .health import record_heartbeats
+
         self.last_heartbeat_at = timezone.now()
-        self.save(update_fields=["last_heartbeat_at"])
+        record_heartbeats([self.pk], now=self.last_heartbeat_at)
 
 
 class BoardLog(models.Model):
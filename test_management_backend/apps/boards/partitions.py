@@ -0,0 +1,277 @@
+"""Time-partitioned storage for the append-only PCStats and BoardLog tables.
+
+On PostgreSQL, ``manage.py partition_tables --convert`` turns each table into one range
+partitioned by its timestamp column, in epoch-aligned partitions of PC_STATS_PARTITION_DAYS
+and BOARD_LOG_PARTITION_DAYS, plus a default partition for rows outside every range. The
+maintain_partitions beat task keeps PARTITION_PREMAKE_DAYS of partitions ready ahead of time,
+and retention drops whole partitions instead of deleting rows, so it neither holds long row
+locks nor leaves bloated indexes behind. Queries that filter on the timestamp column only
+read the partitions they need.
+
+Tables that are not partitioned (SQLite in development, or PostgreSQL before converting)
+fall back to deleting expired rows in chunks of RETENTION_DELETE_CHUNK_SIZE, each in its own
+short transaction.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.core.utils import floor_time
+
+from .models import BoardLog, PCStats
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PartitionedTable:
+    model: type
+    column: str
+    days_setting: str
+
+    @property
+    def table(self) -> str:
+        return self.model._meta.db_table
+
+    @property
+    def step(self) -> timedelta:
+        return timedelta(days=getattr(settings, self.days_setting))
+
+    def partition_name(self, start: datetime) -> str:
+        return f"{self.table}_p{start:%Y%m%d}"
+
+    @property
+    def default_name(self) -> str:
+        return f"{self.table}_default"
+
+
+TABLES = {
+    "pcstats": PartitionedTable(PCStats, "timestamp", "PC_STATS_PARTITION_DAYS"),
+    "boardlog": PartitionedTable(BoardLog, "created_at", "BOARD_LOG_PARTITION_DAYS"),
+}
+
+
+def _table_for(model) -> Optional[PartitionedTable]:
+    return next((spec for spec in TABLES.values() if spec.model is model), None)
+
+
+def is_partitioned(spec: PartitionedTable) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [spec.table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions(spec: PartitionedTable) -> Dict[datetime, str]:
+    """Range partitions of a partitioned table by start, from their names; not the default."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [spec.table],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+    prefix = f"{spec.table}_p"
+    starts = {}
+    for name in names:
+        if name.startswith(prefix):
+            start = datetime.strptime(name[len(prefix) :], "%Y%m%d").replace(tzinfo=UTC)
+            starts[start] = name
+    return starts
+
+
+def _create_partition(cursor, spec: PartitionedTable, start: datetime):
+    """Add the partition starting at ``start``, first moving its rows out of the default one."""
+    qn = connection.ops.quote_name
+    end = start + spec.step
+    table, column, default = qn(spec.table), qn(spec.column), qn(spec.default_name)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {column} >= %s AND {column} < %s)",
+        [start, end],
+    )
+    (stray,) = cursor.fetchone()
+    if stray:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE partition_move ON COMMIT DROP AS "
+            f"SELECT * FROM {default} WHERE {column} >= %s AND {column} < %s",
+            [start, end],
+        )
+        cursor.execute(
+            f"DELETE FROM {default} WHERE {column} >= %s AND {column} < %s", [start, end]
+        )
+    cursor.execute(
+        f"CREATE TABLE {qn(spec.partition_name(start))} PARTITION OF {table} "
+        "FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+    if stray:
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM partition_move")
+
+
+def ensure_partitions(spec: PartitionedTable, start: datetime, end: datetime) -> List[str]:
+    """Create the missing partitions covering [start, end); returns their names."""
+    existing = partitions(spec)
+    created = []
+    moment = floor_time(start, spec.step)
+    while moment < end:
+        if moment not in existing:
+            with transaction.atomic(), connection.cursor() as cursor:
+                _create_partition(cursor, spec, moment)
+            created.append(spec.partition_name(moment))
+        moment += spec.step
+    return created
+
+
+def maintain(now: Optional[datetime] = None) -> Dict[str, List[str]]:
+    """Create PARTITION_PREMAKE_DAYS of future partitions for every partitioned table."""
+    now = now or timezone.now()
+    created = {}
+    for key, spec in TABLES.items():
+        if is_partitioned(spec):
+            created[key] = ensure_partitions(
+                spec, now, now + timedelta(days=settings.PARTITION_PREMAKE_DAYS)
+            )
+    if any(created.values()):
+        logger.info("Created partitions: %s", created)
+    return created
+
+
+def delete_before(model, cutoff: datetime) -> int:
+    """Remove rows of a time-partitioned model older than ``cutoff``; returns rows removed.
+
+    Partitioned tables lose whole partitions that end by ``cutoff`` (rows of the partition
+    straddling it stay until it ends) plus expired rows of the default partition; the count
+    for dropped partitions is the planner's estimate. Other tables are deleted from in chunks.
+    """
+    spec = _table_for(model)
+    if is_partitioned(spec):
+        return _drop_partitions(spec, cutoff)
+    return _delete_in_chunks(model.objects.filter(**{f"{spec.column}__lt": cutoff}))
+
+
+def _drop_partitions(spec: PartitionedTable, cutoff: datetime) -> int:
+    qn = connection.ops.quote_name
+    removed = 0
+    for start, name in sorted(partitions(spec).items()):
+        if start + spec.step > cutoff:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT greatest(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass",
+                [name],
+            )
+            (rows,) = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {qn(name)}")
+        logger.info("Dropped partition %s (about %s rows)", name, rows)
+        removed += rows
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(spec.default_name)} WHERE {qn(spec.column)} < %s", [cutoff]
+        )
+        removed += cursor.rowcount
+    return removed
+
+
+def _delete_in_chunks(queryset) -> int:
+    deleted = 0
+    while True:
+        pks = list(
+            queryset.order_by().values_list("pk", flat=True)[: settings.RETENTION_DELETE_CHUNK_SIZE]
+        )
+        if not pks:
+            return deleted
+        count, _by_model = queryset.model.objects.filter(pk__in=pks).delete()
+        deleted += count
+
+
+def prune_board_logs(now: Optional[datetime] = None) -> int:
+    """Remove BoardLog entries older than BOARD_LOG_RETENTION_DAYS; 0 keeps them forever."""
+    if not settings.BOARD_LOG_RETENTION_DAYS:
+        return 0
+    now = now or timezone.now()
+    removed = delete_before(BoardLog, now - timedelta(days=settings.BOARD_LOG_RETENTION_DAYS))
+    if removed:
+        logger.info("Pruned %s board log entries", removed)
+    return removed
+
+
+def convert(spec: PartitionedTable, now: Optional[datetime] = None) -> int:
+    """Rebuild a plain PostgreSQL table as a range-partitioned one; returns the rows it copied.
+
+    The primary key becomes (pk, partition column), since PostgreSQL requires unique
+    constraints on a partitioned table to include the partition key; the pk column alone stays
+    unique in practice because it is a UUID or comes from a sequence. Runs in one transaction
+    holding an exclusive lock on the table, so schedule it while agents are stopped.
+    """
+    if connection.vendor != "postgresql":
+        raise RuntimeError("Table partitioning needs PostgreSQL")
+    if is_partitioned(spec):
+        return 0
+    now = now or timezone.now()
+    qn = connection.ops.quote_name
+    table, column, old = qn(spec.table), qn(spec.column), qn(f"{spec.table}_unpartitioned")
+    pk = spec.model._meta.pk
+    bounds = spec.model.objects.aggregate(first=Min(spec.column), last=Max(spec.column))
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s "
+            "AND indexdef NOT LIKE 'CREATE UNIQUE%%'",
+            [spec.table],
+        )
+        indexes = [definition for (definition,) in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [spec.table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        cursor.execute(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({column})"
+        )
+        cursor.execute(f"CREATE TABLE {qn(spec.default_name)} PARTITION OF {table} DEFAULT")
+        first = bounds["first"] or now
+        last = max(bounds["last"] or now, now) + timedelta(days=settings.PARTITION_PREMAKE_DAYS)
+        moment = floor_time(first, spec.step)
+        while moment < last:
+            _create_partition(cursor, spec, moment)
+            moment += spec.step
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        copied = cursor.rowcount
+        cursor.execute(f"DROP TABLE {old}")
+
+        cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({qn(pk.column)}, {column})")
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {qn(name)} {definition}")
+        for definition in indexes:
+            cursor.execute(definition)
+        if isinstance(pk, models.fields.AutoFieldMixin):
+            # The identity sequence went with the old table; number new rows from a plain sequence.
+            sequence = qn(f"{spec.table}_{pk.column}_seq")
+            cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.{qn(pk.column)}")
+            cursor.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {qn(pk.column)} "
+                f"SET DEFAULT nextval('{sequence}')"
+            )
+            cursor.execute(
+                f"SELECT setval('{sequence}', COALESCE(MAX({qn(pk.column)}), 0) + 1, false) "
+                f"FROM {table}"
+            )
+    logger.info("Partitioned %s by %s, copying %s rows", spec.table, spec.column, copied)
+    return copied
@@ -0,0 +1,302 @@
+"""PCStats rollups: 1-minute, 1-hour and 1-day aggregates per TestPC, retention, and series reads.
+
+Each resolution advances from its own high-water mark (PCStatsRollupMark). Minutes are
+aggregated from raw samples PC_STATS_ROLLUP_LAG_SECONDS behind real time, so late samples
+still land in their bucket; hours are built from finished minutes and days from finished
+hours. Averages, minimums and maximums combine exactly. The p95 of an hour or a day is the
+sample-weighted 95th percentile of its children's p95s, an approximation that avoids
+keeping raw samples for as long as the coarse rollups.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.core.utils import floor_time, percentile
+
+from . import partitions
+from .models import PCStats, PCStatsRollup, PCStatsRollupMark
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {"1m": timedelta(minutes=1), "1h": timedelta(hours=1), "1d": timedelta(days=1)}
+# The resolution each level is built from; minutes come from raw samples.
+SOURCES = {"1m": None, "1h": "1m", "1d": "1h"}
+# Rollup metric prefix -> PCStats field.
+METRICS = {
+    "cpu": "cpu_percent",
+    "memory": "memory_percent",
+    "disk": "disk_percent",
+    "network_read": "network_io_read_mb",
+    "network_write": "network_io_write_mb",
+}
+STATS = ("avg", "min", "max", "p95")
+# Retention setting per level; each holds days, 0 keeping that level forever.
+RETENTION_SETTINGS = {
+    "raw": "PC_STATS_RETENTION_RAW_DAYS",
+    "1m": "PC_STATS_RETENTION_1M_DAYS",
+    "1h": "PC_STATS_RETENTION_1H_DAYS",
+    "1d": "PC_STATS_RETENTION_1D_DAYS",
+}
+# Buckets aggregated per transaction, bounding the rows held in memory at once.
+BUCKETS_PER_BATCH = 60
+
+Summary = Dict[str, float]
+
+
+def summarize(values: List[float]) -> Summary:
+    return {
+        "avg": sum(values) / len(values),
+        "min": min(values),
+        "max": max(values),
+        "p95": percentile(values, 95),
+    }
+
+
+def combine(children: List[Tuple[int, Summary]]) -> Summary:
+    """Merge (samples, summary) pairs of finer buckets into one summary."""
+    total = sum(samples for samples, _summary in children)
+    ordered = sorted((summary["p95"], samples) for samples, summary in children)
+    rank, p95 = total * 0.95, ordered[-1][0]
+    seen = 0
+    for value, samples in ordered:
+        seen += samples
+        if seen >= rank:
+            p95 = value
+            break
+    return {
+        "avg": sum(samples * summary["avg"] for samples, summary in children) / total,
+        "min": min(summary["min"] for _samples, summary in children),
+        "max": max(summary["max"] for _samples, summary in children),
+        "p95": p95,
+    }
+
+
+def _raw_buckets(
+    rows: Iterable[tuple], step: timedelta
+) -> Dict[tuple, Tuple[int, Dict[str, Summary]]]:
+    """Group (test_pc_id, timestamp, *metric values) rows into per-PC buckets and summarize them."""
+    grouped: Dict[tuple, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for test_pc_id, moment, *values in rows:
+        bucket = grouped[test_pc_id, floor_time(moment, step)]
+        for metric, value in zip(METRICS, values):
+            bucket[metric].append(value)
+    return {
+        key: (len(values["cpu"]), {metric: summarize(values[metric]) for metric in METRICS})
+        for key, values in grouped.items()
+    }
+
+
+def _raw_rows(start: datetime, end: datetime, test_pc_id=None):
+    rows = PCStats.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if test_pc_id is not None:
+        rows = rows.filter(test_pc_id=test_pc_id)
+    return rows.order_by().values_list("test_pc_id", "timestamp", *METRICS.values())
+
+
+def _rolled_buckets(source: str, start: datetime, end: datetime, step: timedelta):
+    grouped: Dict[tuple, List[Tuple[int, Dict[str, Summary]]]] = defaultdict(list)
+    for rollup in PCStatsRollup.objects.filter(
+        resolution=source, bucket_start__gte=start, bucket_start__lt=end
+    ):
+        key = rollup.test_pc_id, floor_time(rollup.bucket_start, step)
+        grouped[key].append((rollup.samples, _summaries(rollup)))
+    return {
+        key: (
+            sum(samples for samples, _summaries in children),
+            {
+                metric: combine([(samples, summaries[metric]) for samples, summaries in children])
+                for metric in METRICS
+            },
+        )
+        for key, children in grouped.items()
+    }
+
+
+def _summaries(rollup: PCStatsRollup) -> Dict[str, Summary]:
+    return {
+        metric: {stat: getattr(rollup, f"{metric}_{stat}") for stat in STATS} for metric in METRICS
+    }
+
+
+def _mark(resolution: str) -> Optional[datetime]:
+    return (
+        PCStatsRollupMark.objects.filter(resolution=resolution)
+        .values_list("rolled_up_to", flat=True)
+        .first()
+    )
+
+
+def _first_source_time(source: Optional[str]) -> Optional[datetime]:
+    if source is None:
+        return PCStats.objects.aggregate(first=Min("timestamp"))["first"]
+    rollups = PCStatsRollup.objects.filter(resolution=source)
+    return rollups.aggregate(first=Min("bucket_start"))["first"]
+
+
+def roll_up(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Aggregate everything complete since each resolution's mark; returns rollups written."""
+    now = now or timezone.now()
+    return {resolution: _roll_up(resolution, now) for resolution in RESOLUTIONS}
+
+
+def _roll_up(resolution: str, now: datetime) -> int:
+    step, source = RESOLUTIONS[resolution], SOURCES[resolution]
+    if source is None:
+        limit = floor_time(now - timedelta(seconds=settings.PC_STATS_ROLLUP_LAG_SECONDS), step)
+    else:
+        source_mark = _mark(source)
+        if source_mark is None:
+            return 0
+        limit = floor_time(source_mark, step)
+
+    start = _mark(resolution)
+    if start is None:
+        first = _first_source_time(source)
+        if first is None:
+            return 0
+        start = floor_time(first, step)
+
+    written = 0
+    while start < limit:
+        end = min(start + step * BUCKETS_PER_BATCH, limit)
+        if source is None:
+            buckets = _raw_buckets(_raw_rows(start, end), step)
+        else:
+            buckets = _rolled_buckets(source, start, end, step)
+        rollups = [
+            PCStatsRollup(
+                test_pc_id=test_pc_id,
+                resolution=resolution,
+                bucket_start=bucket_start,
+                samples=samples,
+                **{
+                    f"{metric}_{stat}": summaries[metric][stat]
+                    for metric in METRICS
+                    for stat in STATS
+                },
+            )
+            for (test_pc_id, bucket_start), (samples, summaries) in buckets.items()
+        ]
+        with transaction.atomic():
+            # Upsert, so a batch repeated after a crash between the insert and the mark is harmless.
+            PCStatsRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=["test_pc", "resolution", "bucket_start"],
+                update_fields=[
+                    "samples",
+                    *(f"{metric}_{stat}" for metric in METRICS for stat in STATS),
+                ],
+            )
+            PCStatsRollupMark.objects.update_or_create(
+                resolution=resolution, defaults={"rolled_up_to": end}
+            )
+        written += len(rollups)
+        start = end
+
+    if written:
+        logger.info("Rolled up %s %s PCStats buckets", written, resolution)
+    return written
+
+
+def prune(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Delete raw samples and rollups past their retention, but never data not yet rolled up."""
+    now = now or timezone.now()
+    deleted = {}
+    levels = [("raw", "1m"), ("1m", "1h"), ("1h", "1d"), ("1d", None)]
+    for level, consumer in levels:
+        cutoff = retained_since(level, now)
+        if cutoff is None:
+            continue
+        if consumer is not None:
+            consumed = _mark(consumer)
+            if consumed is None:
+                continue
+            cutoff = min(cutoff, consumed)
+        if level == "raw":
+            deleted[level] = partitions.delete_before(PCStats, cutoff)
+        else:
+            deleted[level], _by_model = PCStatsRollup.objects.filter(
+                resolution=level, bucket_start__lt=cutoff
+            ).delete()
+    if any(deleted.values()):
+        logger.info("Pruned PCStats history: %s", deleted)
+    return deleted
+
+
+def retained_since(level: str, now: datetime) -> Optional[datetime]:
+    """Oldest time ``level`` ("raw" or a resolution) still covers; None when kept forever."""
+    days = getattr(settings, RETENTION_SETTINGS[level])
+    return now - timedelta(days=days) if days else None
+
+
+def pick_resolution(
+    test_pc_id, start: datetime, end: datetime, max_points: int, now: datetime
+) -> str:
+    """The finest level that still covers ``start`` and returns at most ``max_points`` points."""
+    since = retained_since("raw", now)
+    if since is None or start >= since:
+        raw = PCStats.objects.filter(test_pc_id=test_pc_id, timestamp__gte=start, timestamp__lt=end)
+        if raw.order_by()[: max_points + 1].count() <= max_points:
+            return "raw"
+    for resolution, step in RESOLUTIONS.items():
+        since = retained_since(resolution, now)
+        if (end - start) / step <= max_points and (since is None or start >= since):
+            return resolution
+    return "1d"
+
+
+def series(
+    test_pc_id, start: datetime, end: datetime, max_points: int, resolution: Optional[str] = None
+) -> dict:
+    """Points of one TestPC's stats in [start, end) at ``resolution``, or the best fit if not given.
+
+    Buckets past the resolution's high-water mark are summarized from raw samples on the fly,
+    so the newest points are there before the rollup task has caught up.
+    """
+    now = timezone.now()
+    resolution = resolution or pick_resolution(test_pc_id, start, end, max_points, now)
+    if resolution == "raw":
+        points = [
+            {
+                "t": moment,
+                "samples": 1,
+                **{metric: dict.fromkeys(STATS, value) for metric, value in zip(METRICS, values)},
+            }
+            for _pc, moment, *values in _raw_rows(start, end, test_pc_id).order_by("timestamp")
+        ]
+    else:
+        step = RESOLUTIONS[resolution]
+        mark = _mark(resolution) or floor_time(start, step)
+        stored = PCStatsRollup.objects.filter(
+            test_pc_id=test_pc_id,
+            resolution=resolution,
+            bucket_start__gte=floor_time(start, step),
+            bucket_start__lt=min(end, mark),
+        ).order_by("bucket_start")
+        points = [
+            {"t": rollup.bucket_start, "samples": rollup.samples, **_summaries(rollup)}
+            for rollup in stored
+        ]
+        tail_start = max(mark, floor_time(start, step))
+        if tail_start < end:
+            tail = _raw_buckets(_raw_rows(tail_start, end, test_pc_id), step)
+            points += [
+                {"t": bucket_start, "samples": samples, **summaries}
+                for (_pc, bucket_start), (samples, summaries) in sorted(
+                    tail.items(), key=lambda item: item[0][1]
+                )
+            ]
+    return {
+        "test_pc": test_pc_id,
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "points": points,
+    }
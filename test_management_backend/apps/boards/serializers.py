@@ -1,6 +1,8 @@
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Board, BoardLog, Capability, PCStats, Relay, TestPC
+from . import heartbeats
+from .models import Board, BoardLog, Capability, PCStats, PCStatsRollup, Relay, TestPC
 
 
 class CapabilitySerializer(serializers.ModelSerializer):
@@ -32,7 +34,26 @@ class RelaySerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at", "last_checked_at", "is_healthy"]
 
 
-class TestPCSerializer(serializers.ModelSerializer):
+class BufferedHeartbeatMixin:
+    """Reads last_heartbeat_at through the write-behind heartbeat buffer.
+
+    The buffer is read once per PC per response.
+    """
+
+    def buffered_heartbeats(self, test_pc_id) -> dict:
+        if not test_pc_id:
+            return {}
+        seen = self.context.setdefault("buffered_heartbeats", {})
+        if test_pc_id not in seen:
+            seen[test_pc_id] = heartbeats.buffered([test_pc_id]).get(test_pc_id, {})
+        return seen[test_pc_id]
+
+    def heartbeat_representation(self, stored, pending):
+        return serializers.DateTimeField().to_representation(heartbeats.latest(stored, pending))
+
+
+class TestPCSerializer(BufferedHeartbeatMixin, serializers.ModelSerializer):
+    last_heartbeat_at = serializers.SerializerMethodField()
     is_online = serializers.ReadOnlyField()
     is_available_for_testing = serializers.ReadOnlyField()
 
@@ -53,11 +74,61 @@ class TestPCSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "last_heartbeat_at",
+            "max_concurrent_runs",
             "is_online",
             "is_available_for_testing",
         ]
         read_only_fields = ["id", "created_at", "updated_at", "last_heartbeat_at", "is_online", "is_available_for_testing"]
 
+    def get_last_heartbeat_at(self, obj):
+        return self.heartbeat_representation(
+            obj.last_heartbeat_at, self.buffered_heartbeats(obj.pk).get("seen_at")
+        )
+
+
+class BoardHeartbeatSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    is_alive = serializers.BooleanField(required=False, default=True)
+    status = serializers.ChoiceField(
+        choices=[
+            choice for choice in Board.STATUS_CHOICES if choice[0] not in ("BUSY", "DEACTIVATED")
+        ],
+        required=False,
+        help_text="Omit to let liveness move the board between IDLE and OFFLINE",
+    )
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=TestPC.STATUS_CHOICES, required=False)
+    boards = BoardHeartbeatSerializer(many=True, required=False, default=list)
+
+
+class PCStatsIngestSerializer(serializers.Serializer):
+    test_pc = serializers.PrimaryKeyRelatedField(queryset=TestPC.objects.all())
+    samples = serializers.DictField(
+        help_text="Column name to array of values, all arrays the same length"
+    )
+
+
+class PCStatsSeriesQuerySerializer(serializers.Serializer):
+    test_pc = serializers.PrimaryKeyRelatedField(queryset=TestPC.objects.all())
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField(required=False, help_text="Defaults to now")
+    points = serializers.IntegerField(
+        min_value=1, max_value=10000, default=500, help_text="Most points to return"
+    )
+    resolution = serializers.ChoiceField(
+        choices=["raw", *(choice for choice, _label in PCStatsRollup.RESOLUTION_CHOICES)],
+        required=False,
+        help_text="Omit to use the finest resolution that fits in the requested points",
+    )
+
+    def validate(self, attrs):
+        attrs.setdefault("end", timezone.now())
+        if attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError({"start": "Must be before end."})
+        return attrs
+
 
 class PCStatsSerializer(serializers.ModelSerializer):
     is_healthy = serializers.ReadOnlyField()
@@ -96,7 +167,7 @@ class BoardLogSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at"]
 
 
-class BoardSerializer(serializers.ModelSerializer):
+class BoardSerializer(BufferedHeartbeatMixin, serializers.ModelSerializer):
     capabilities = CapabilitySerializer(many=True, read_only=True)
     capability_ids = serializers.PrimaryKeyRelatedField(
         source="capabilities",
@@ -119,8 +190,10 @@ class BoardSerializer(serializers.ModelSerializer):
         allow_null=True,
         required=False,
     )
+    last_heartbeat_at = serializers.SerializerMethodField()
     can_execute_test = serializers.ReadOnlyField()
     is_healthy = serializers.ReadOnlyField()
+    is_quarantined = serializers.ReadOnlyField()
 
     class Meta:
         model = Board
@@ -151,24 +224,36 @@ class BoardSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "last_used_at",
+            "last_released_at",
             "last_heartbeat_at",
             "capabilities",
             "capability_ids",
             "can_execute_test",
             "is_healthy",
+            "health_score",
+            "health_updated_at",
+            "is_quarantined",
         ]
         read_only_fields = [
             "id",
             "created_at",
             "updated_at",
             "last_used_at",
+            "last_released_at",
             "last_heartbeat_at",
             "relay",
             "test_pc",
             "can_execute_test",
             "is_healthy",
+            "health_score",
+            "health_updated_at",
+            "is_quarantined",
         ]
 
+    def get_last_heartbeat_at(self, obj):
+        pending = self.buffered_heartbeats(obj.test_pc_id).get("boards", {}).get(str(obj.pk))
+        return self.heartbeat_representation(obj.last_heartbeat_at, pending)
+
     def create(self, validated_data):
         capabilities = validated_data.pop("capabilities", [])
         board = super().create(validated_data)
@@ -1,2 +1,27 @@
-"""Signals for board events (placeholder)."""
+"""Signals for board events."""
+from typing import NamedTuple
 
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from . import health
+from .models import BoardLog
+
+
+class BoardChange(NamedTuple):
+    board_id: object
+    was_alive: bool
+    was_status: str
+    is_alive: bool
+    status: str
+
+
+# Sent inside the heartbeat transaction with ``changes``, a list of BoardChange.
+boards_changed = Signal()
+
+
+@receiver(post_save, sender=BoardLog)
+def score_board_log(sender, instance, created, **kwargs):
+    """Count new WARN and ERROR entries against the board's health score."""
+    if created:
+        health.record_logs([instance.board_id], instance.level)
@@ -0,0 +1,34 @@
+"""Celery tasks for boards and TestPCs."""
+from celery import shared_task
+
+from apps.boards import heartbeats, partitions, rollups
+
+
+@shared_task
+def flush_heartbeats():
+    """Persist heartbeats buffered in the cache to last_heartbeat_at."""
+    return heartbeats.flush()
+
+
+@shared_task
+def rollup_pc_stats():
+    """Aggregate PCStats into 1m/1h/1d rollups up to the newest complete buckets."""
+    return rollups.roll_up()
+
+
+@shared_task
+def prune_pc_stats():
+    """Delete PCStats samples and rollups past their retention."""
+    return rollups.prune()
+
+
+@shared_task
+def maintain_partitions():
+    """Create upcoming PCStats and BoardLog partitions on PostgreSQL."""
+    return partitions.maintain()
+
+
+@shared_task
+def prune_board_logs():
+    """Delete BoardLog entries past their retention."""
+    return partitions.prune_board_logs()
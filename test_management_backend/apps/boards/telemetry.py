@@ -0,0 +1,167 @@
+"""Bulk PCStats ingestion from TestPC agents in a compact columnar form.
+
+A batch names each field once, with one array of values per field::
+
+    {"test_pc": "<id>", "samples": {"timestamp": [1718000000, ...], "cpu_percent": [12.5, ...]}}
+
+Validation runs a column at a time (types, bounds and choices over the whole array) instead
+of a serializer per sample, and reports at most one error per column with the offending
+index. Bounds and required columns come from the PCStats field definitions.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from apps.core.utils import chunked
+
+from .models import PCStats, TestPC
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ColumnSpec:
+    field: models.Field
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+
+    @property
+    def required(self) -> bool:
+        return not self.field.has_default()
+
+
+def column_specs() -> Dict[str, ColumnSpec]:
+    """Every settable PCStats field with the bounds its validators declare."""
+    specs = {}
+    for field in PCStats._meta.concrete_fields:
+        if field.primary_key or field.is_relation:
+            continue
+        spec = ColumnSpec(field)
+        # Integer fields also carry the database's range validators; keep the tightest bounds.
+        lowers = [v.limit_value for v in field.validators if isinstance(v, MinValueValidator)]
+        uppers = [v.limit_value for v in field.validators if isinstance(v, MaxValueValidator)]
+        spec.lower = max(lowers) if lowers else None
+        spec.upper = min(uppers) if uppers else None
+        specs[field.name] = spec
+    return specs
+
+
+def _to_datetime(value) -> datetime:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Out-of-range values raise OverflowError or OSError, depending on the platform.
+        return datetime.fromtimestamp(value, tz=UTC)
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, UTC)
+
+
+def _to_number(cast):
+    def convert(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(value)
+        if cast is int and value != int(value):
+            raise ValueError(value)
+        return cast(value)
+
+    return convert
+
+
+def _converter(field: models.Field):
+    if isinstance(field, models.DateTimeField):
+        return _to_datetime
+    if isinstance(field, models.IntegerField):
+        return _to_number(int)
+    if isinstance(field, models.FloatField):
+        return _to_number(float)
+    return str
+
+
+def _first_bad(values: List, check) -> int:
+    return next(index for index, value in enumerate(values) if check(value))
+
+
+def validate_columns(samples: dict) -> Dict[str, list]:
+    """Check and convert a columnar batch; raises ValidationError keyed by column."""
+    if not isinstance(samples, dict) or not samples:
+        raise ValidationError({"samples": ["Expected an object of equally long value arrays."]})
+    specs = column_specs()
+    errors: Dict[str, List[str]] = {}
+
+    unknown = sorted(set(samples) - set(specs))
+    for name in unknown:
+        errors[name] = ["Unknown column."]
+    for name, spec in specs.items():
+        if spec.required and name not in samples:
+            errors[name] = ["This column is required."]
+    lengths = {len(values) for values in samples.values() if isinstance(values, list)}
+    if any(not isinstance(values, list) for values in samples.values()) or len(lengths) != 1:
+        errors["samples"] = ["Every column must be an array, all of the same length."]
+    if errors:
+        raise ValidationError(errors)
+    (size,) = lengths
+    if not size or size > settings.PC_STATS_INGEST_MAX_SAMPLES:
+        raise ValidationError(
+            {"samples": [f"Send between 1 and {settings.PC_STATS_INGEST_MAX_SAMPLES} samples."]}
+        )
+
+    columns = {}
+    for name, values in samples.items():
+        spec = specs[name]
+        convert = _converter(spec.field)
+        try:
+            column = [convert(value) for value in values]
+        except (TypeError, ValueError, OverflowError, OSError):
+            index = _first_bad(values, lambda value: _fails(convert, value))
+            errors[name] = [f"Invalid value {values[index]!r} at index {index}."]
+            continue
+        if spec.field.choices:
+            allowed = {choice for choice, _label in spec.field.choices}
+            if not allowed.issuperset(column):
+                index = _first_bad(column, lambda value: value not in allowed)
+                errors[name] = [f"{column[index]!r} at index {index} is not a valid choice."]
+                continue
+        if spec.lower is not None and min(column) < spec.lower:
+            index = _first_bad(column, lambda value: value < spec.lower)
+            errors[name] = [f"Value {column[index]} at index {index} is below {spec.lower}."]
+        elif spec.upper is not None and max(column) > spec.upper:
+            index = _first_bad(column, lambda value: value > spec.upper)
+            errors[name] = [f"Value {column[index]} at index {index} is above {spec.upper}."]
+        columns[name] = column
+    if errors:
+        raise ValidationError(errors)
+    return columns
+
+
+def _fails(convert, value) -> bool:
+    try:
+        convert(value)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return True
+    return False
+
+
+def ingest(test_pc: TestPC, samples: dict) -> List[PCStats]:
+    """Validate a columnar batch and bulk_create it in chunks of PC_STATS_INGEST_CHUNK_SIZE."""
+    columns = validate_columns(samples)
+    size = len(next(iter(columns.values())))
+    if "timestamp" not in columns:
+        columns["timestamp"] = [timezone.now()] * size
+    names = list(columns)
+    rows = [
+        PCStats(test_pc=test_pc, **dict(zip(names, values)))
+        for values in zip(*(columns[name] for name in names))
+    ]
+    with transaction.atomic():
+        for chunk in chunked(rows, settings.PC_STATS_INGEST_CHUNK_SIZE):
+            PCStats.objects.bulk_create(chunk)
+    logger.debug("Ingested %s PCStats samples from %s", len(rows), test_pc.hostname)
+    return rows
@@ -1,14 +1,20 @@
-from rest_framework import permissions, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from apps.core.parsers import GzipJSONParser
+
+from . import heartbeats, rollups, telemetry
 from .filters import BoardFilter
 from .models import Board, BoardLog, Capability, PCStats, Relay, TestPC
 from .serializers import (
     BoardLogSerializer,
     BoardSerializer,
     CapabilitySerializer,
+    HeartbeatSerializer,
+    PCStatsIngestSerializer,
     PCStatsSerializer,
+    PCStatsSeriesQuerySerializer,
     RelaySerializer,
     TestPCSerializer,
 )
@@ -43,6 +49,25 @@ class TestPCViewSet(viewsets.ModelViewSet):
     search_fields = ["hostname", "ip_address", "domain_name"]
     ordering_fields = ["hostname", "status", "os_version", "created_at", "updated_at"]
 
+    @action(detail=True, methods=["post"])
+    def heartbeat(self, request, pk=None):
+        """Mark the PC and every board it reports as seen, in one call per PC."""
+        test_pc = self.get_object()
+        serializer = HeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = heartbeats.apply(
+            test_pc,
+            [heartbeats.BoardReport(**board) for board in serializer.validated_data["boards"]],
+            pc_status=serializer.validated_data.get("status"),
+        )
+        return Response(
+            {
+                "seen": result.seen,
+                "changed": [change._asdict() for change in result.changed],
+                "unknown": result.unknown,
+            }
+        )
+
 
 class PCStatsViewSet(viewsets.ReadOnlyModelViewSet):
     """Read-only viewset for test PC performance stats."""
@@ -53,6 +78,39 @@ class PCStatsViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ["test_pc__hostname", "status"]
     ordering_fields = ["timestamp", "status", "cpu_percent", "memory_percent", "disk_percent"]
 
+    @action(detail=False, methods=["post"], parser_classes=[GzipJSONParser])
+    def ingest(self, request):
+        """Store a batch of one TestPC's samples sent as columns; the body may be gzip-encoded."""
+        serializer = PCStatsIngestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = telemetry.ingest(
+            serializer.validated_data["test_pc"], serializer.validated_data["samples"]
+        )
+        return Response(
+            {
+                "created": len(rows),
+                "first_timestamp": min(row.timestamp for row in rows),
+                "last_timestamp": max(row.timestamp for row in rows),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["get"])
+    def series(self, request):
+        """One TestPC's stats over a time range, raw or from the rollup that fits ``points``."""
+        query = PCStatsSeriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        data = query.validated_data
+        return Response(
+            rollups.series(
+                data["test_pc"].pk,
+                data["start"],
+                data["end"],
+                data["points"],
+                data.get("resolution"),
+            )
+        )
+
 
 class BoardViewSet(viewsets.ModelViewSet):
     """CRUD operations for boards."""
@@ -77,6 +135,7 @@ class BoardViewSet(viewsets.ModelViewSet):
         "created_at",
         "updated_at",
         "last_heartbeat_at",
+        "health_score",
     ]
 
     @action(detail=True, methods=["get"])
@@ -0,0 +1,40 @@
+"""Project middleware."""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+def _not_static(_request):
+    return None
+
+
+class StaticFilesMiddleware:
+    """WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise's middleware is sync-only, which makes Django run every ASGI request, async
+    views included, on a thread for its whole duration. Long-polling views would then hold a
+    thread each; this keeps the chain async and only asks WhiteNoise, on a thread, whether the
+    path is a static file. Its public middleware answers None for anything else.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            self.whitenoise = WhiteNoiseMiddleware(_not_static)
+            markcoroutinefunction(self)
+        else:
+            self.whitenoise = WhiteNoiseMiddleware(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.whitenoise(request)
+
+    async def __acall__(self, request):
+        response = await sync_to_async(self.whitenoise, thread_sensitive=False)(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
@@ -0,0 +1,37 @@
+"""Request body parsers."""
+import gzip
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class GzipJSONParser(JSONParser):
+    """JSON that may arrive with ``Content-Encoding: gzip``.
+
+    The decompressed body is capped at DATA_UPLOAD_MAX_DECOMPRESSED_SIZE, so a small
+    compressed upload cannot expand without bound.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get("request")
+        encoding = (
+            request.META.get("HTTP_CONTENT_ENCODING", "").lower() if request is not None else ""
+        )
+        if encoding == "gzip":
+            stream = self._decompress(stream)
+        elif encoding not in ("", "identity"):
+            raise ParseError(f"Unsupported Content-Encoding {encoding!r}.")
+        return super().parse(stream, media_type, parser_context)
+
+    def _decompress(self, stream):
+        limit = settings.DATA_UPLOAD_MAX_DECOMPRESSED_SIZE
+        try:
+            body = gzip.GzipFile(fileobj=stream).read(limit + 1)
+        except (OSError, EOFError, zlib.error) as exc:
+            raise ParseError(f"Invalid gzip body - {exc}")
+        if len(body) > limit:
+            raise ParseError(f"Decompressed body is larger than {limit} bytes.")
+        return io.BytesIO(body)
@@ -1,7 +1,22 @@
 """Shared utility helpers."""
+from datetime import datetime, timezone
 
 
 def chunked(iterable, size):
     for i in range(0, len(iterable), size):
         yield iterable[i : i + size]
 
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (0 < pct <= 100), or None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def floor_time(moment, step):
+    """Start of the ``step``-long interval containing ``moment``, aligned to the epoch in UTC."""
+    seconds = int(step.total_seconds())
+    return datetime.fromtimestamp(int(moment.timestamp()) // seconds * seconds, tz=timezone.utc)
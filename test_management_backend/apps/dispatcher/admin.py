@@ -1,11 +1,18 @@
 from django.contrib import admin
 
-from .models import TestRequest
+from .models import RunDuration, TestRequest
 
 
 @admin.register(TestRequest)
 class TestRequestAdmin(admin.ModelAdmin):
     list_display = ("id", "platform", "status", "priority", "executed_on_board", "created_at", "started_at", "completed_at")
     list_filter = ("status", "platform")
-    search_fields = ("id", "platform", "executed_on_board__name")
+    search_fields = ("id", "platform", "client_key", "executed_on_board__name")
     ordering = ("-priority", "-created_at")
+
+
+@admin.register(RunDuration)
+class RunDurationAdmin(admin.ModelAdmin):
+    list_display = ("platform", "required_capabilities", "runs", "recent_seconds", "updated_at")
+    list_filter = ("platform",)
+    search_fields = ("platform", "required_capabilities")
@@ -5,3 +5,6 @@ class DispatcherConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.dispatcher"
     verbose_name = "Dispatcher"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,220 @@
+"""Strategies that turn idle boards and indexed queued requests into an assignment plan."""
+import heapq
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from apps.boards.models import Board
+from apps.dispatcher.hosts import HostCapacity
+from apps.dispatcher.matching import RequestIndex
+from apps.dispatcher.models import TestRequest
+from apps.dispatcher.queueing import QueuePolicy
+
+
+class MinCostFlow:
+    """Successive shortest paths with Johnson potentials; supports negative edge costs on DAGs."""
+
+    def __init__(self, node_count: int):
+        self.node_count = node_count
+        self.graph: List[List[list]] = [[] for _ in range(node_count)]
+
+    def add_edge(self, source: int, target: int, capacity: int, cost: int) -> list:
+        forward = [target, capacity, cost, None]
+        backward = [source, 0, -cost, forward]
+        forward[3] = backward
+        self.graph[source].append(forward)
+        self.graph[target].append(backward)
+        return forward
+
+    def _initial_potentials(self, source: int) -> List[float]:
+        potential = [float("inf")] * self.node_count
+        potential[source] = 0
+        for _ in range(self.node_count - 1):
+            changed = False
+            for node, edges in enumerate(self.graph):
+                if potential[node] == float("inf"):
+                    continue
+                for target, capacity, cost, _rev in edges:
+                    if capacity > 0 and potential[node] + cost < potential[target]:
+                        potential[target] = potential[node] + cost
+                        changed = True
+            if not changed:
+                break
+        return potential
+
+    def solve(self, source: int, sink: int) -> Tuple[int, int]:
+        """Push the maximum flow at minimum cost; returns (flow, cost)."""
+        potential = self._initial_potentials(source)
+        flow = cost = 0
+        while True:
+            distance = [float("inf")] * self.node_count
+            distance[source] = 0
+            parent_edge: List[list] = [None] * self.node_count
+            queue = [(0, source)]
+            while queue:
+                dist, node = heapq.heappop(queue)
+                if dist > distance[node]:
+                    continue
+                for edge in self.graph[node]:
+                    target, capacity, edge_cost, _rev = edge
+                    if capacity <= 0 or potential[target] == float("inf"):
+                        continue
+                    candidate = dist + edge_cost + potential[node] - potential[target]
+                    if candidate < distance[target]:
+                        distance[target] = candidate
+                        parent_edge[target] = edge
+                        heapq.heappush(queue, (candidate, target))
+            if distance[sink] == float("inf"):
+                return flow, cost
+
+            for node in range(self.node_count):
+                if distance[node] < float("inf"):
+                    potential[node] += distance[node]
+
+            push = float("inf")
+            node = sink
+            while node != source:
+                edge = parent_edge[node]
+                push = min(push, edge[1])
+                node = edge[3][0]
+            node = sink
+            while node != source:
+                edge = parent_edge[node]
+                edge[1] -= push
+                edge[3][1] += push
+                cost += push * edge[2]
+                node = edge[3][0]
+            flow += push
+
+
+def greedy_assignment(
+    platform: str,
+    boards: List[Board],
+    board_masks: Dict[object, int],
+    index: RequestIndex,
+    hosts: Optional[HostCapacity] = None,
+) -> List[Tuple[Board, TestRequest]]:
+    """Each board, in the given order, takes the best queued request it can serve.
+
+    Boards whose TestPC has no free slot left are skipped.
+    """
+    plan = []
+    for board in boards:
+        if not index:
+            break
+        if hosts and not hosts.admits(board):
+            continue
+        match = index.pop_best(platform, board_masks[board.pk], board.sdk_version)
+        if match:
+            plan.append((board, match))
+            if hosts:
+                hosts.charge(board)
+    return plan
+
+
+def optimal_assignment(
+    platform: str,
+    boards: List[Board],
+    board_masks: Dict[object, int],
+    index: RequestIndex,
+    hosts: Optional[HostCapacity] = None,
+) -> List[Tuple[Board, TestRequest]]:
+    """Assign as many requests as possible, preferring higher priorities, across all idle boards.
+
+    Boards are grouped by (capability mask, SDK) and requests by (mask, SDK, priority), so the
+    flow network stays small however many rows are involved: one node per board class, one per
+    request class, and one edge per distinct priority in a request class. Every unit of flow is
+    worth more than any priority difference plus reflash penalty, so the result is a maximum
+    matching first and the best priority/reflash trade-off among those second. Within a request
+    class, requests are taken in queue order. Priorities include aging; fair-share usage only
+    affects the greedy mode. Per-PC limits are applied up front by keeping the best-ranked
+    boards of each PC, since the network has no per-host nodes.
+    """
+    if hosts:
+        boards = hosts.trim(boards)
+    policy = index.policy
+    board_classes: Dict[Tuple[int, str], List[Board]] = defaultdict(list)
+    for board in boards:
+        board_classes[board_masks[board.pk], policy.sdk_of(board.sdk_version)].append(board)
+
+    request_classes: Dict[Tuple[int, str], List[TestRequest]] = {}
+    for mask, sdk in index.classes(platform):
+        capacity = sum(
+            len(members)
+            for (board_mask, _sdk), members in board_classes.items()
+            if mask & ~board_mask == 0
+        )
+        if capacity:
+            request_classes[mask, sdk] = index.top(platform, mask, sdk, capacity)
+    if not request_classes:
+        return []
+
+    plan, reflashes = _min_cost_plan(board_classes, request_classes, policy, policy.reflash_penalty)
+    if policy.reflash_penalty and any(sdk for _mask, sdk in request_classes):
+        # Re-solve without the penalty to count the reflashes affinity saved in this pass.
+        _unpinned, unpinned_reflashes = _min_cost_plan(board_classes, request_classes, policy, 0)
+        policy.reflashes_avoided += max(0, unpinned_reflashes - reflashes)
+    return plan
+
+
+def _min_cost_plan(
+    board_classes: Dict[Tuple[int, str], List[Board]],
+    request_classes: Dict[Tuple[int, str], List[TestRequest]],
+    policy: QueuePolicy,
+    reflash_penalty: int,
+) -> Tuple[List[Tuple[Board, TestRequest]], int]:
+    """Solve one class-level flow network; returns the plan and how many of its pairs reflash."""
+    effective = policy.effective_priority
+    priorities = [effective(req) for reqs in request_classes.values() for req in reqs]
+    lowest = min(priorities)
+    board_count = sum(len(members) for members in board_classes.values())
+    unit_value = (max(priorities) - lowest + reflash_penalty + 1) * (board_count + 1)
+
+    board_keys = list(board_classes)
+    request_keys = list(request_classes)
+    source = 0
+    sink = 1 + len(board_keys) + len(request_keys)
+    network = MinCostFlow(sink + 1)
+    board_node = {key: 1 + i for i, key in enumerate(board_keys)}
+    request_node = {key: 1 + len(board_keys) + i for i, key in enumerate(request_keys)}
+
+    for board_key, members in board_classes.items():
+        network.add_edge(source, board_node[board_key], len(members), 0)
+    links = {}
+    for board_mask, board_sdk in board_keys:
+        for request_mask, request_sdk in request_keys:
+            if request_mask & ~board_mask == 0:
+                reflash = policy.needs_reflash(request_sdk, board_sdk)
+                links[(board_mask, board_sdk), (request_mask, request_sdk)] = network.add_edge(
+                    board_node[board_mask, board_sdk],
+                    request_node[request_mask, request_sdk],
+                    len(board_classes[board_mask, board_sdk]),
+                    reflash_penalty if reflash else 0,
+                )
+    for request_key, reqs in request_classes.items():
+        counts: Dict[int, int] = defaultdict(int)
+        for req in reqs:
+            counts[effective(req)] += 1
+        for priority, count in counts.items():
+            network.add_edge(
+                request_node[request_key], sink, count, -(unit_value + priority - lowest)
+            )
+
+    network.solve(source, sink)
+
+    plan = []
+    reflashes = 0
+    free_boards = {key: iter(members) for key, members in board_classes.items()}
+    pending = {key: iter(reqs) for key, reqs in request_classes.items()}
+    for (board_key, request_key), edge in links.items():
+        used = len(board_classes[board_key]) - edge[1]
+        if used and policy.needs_reflash(request_key[1], board_key[1]):
+            reflashes += used
+        for _ in range(used):
+            plan.append((next(free_boards[board_key]), next(pending[request_key])))
+    return plan, reflashes
+
+
+ASSIGNMENT_MODES = {
+    "greedy": greedy_assignment,
+    "optimal": optimal_assignment,
+}
@@ -0,0 +1,474 @@
+"""Synthetic workloads for measuring dispatcher scheduling cost."""
+import multiprocessing
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, FrozenSet, List
+
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.boards.models import Board, Capability, TestPC
+from apps.core.utils import percentile
+from apps.dispatcher.assignment import ASSIGNMENT_MODES
+from apps.dispatcher.matching import CapabilityCatalog, RequestIndex
+from apps.dispatcher.models import TestRequest
+from apps.dispatcher.queueing import QueuePolicy
+
+
+@dataclass
+class SyntheticBoard:
+    pk: int
+    platform: str
+    capabilities: FrozenSet[str]
+    sdk_version: str = ""
+
+
+@dataclass
+class SyntheticFleet:
+    capabilities: List[str]
+    boards: List[SyntheticBoard]
+    requests: List[TestRequest]
+
+
+def build_fleet(
+    board_count: int,
+    requests_per_board: int = 10,
+    capability_count: int = 24,
+    profiles_per_platform: int = 6,
+    blocked_ratio: float = 0.2,
+    seed: int = 0,
+    prefix: str = "",
+) -> SyntheticFleet:
+    """Generate boards drawn from a few hardware profiles per platform and queued requests.
+
+    ``blocked_ratio`` of the requests need a capability combination no board has, so they
+    stay queued the way requests waiting on scarce hardware do in a real lab.
+    """
+    rng = random.Random(seed)
+    platforms = [choice for choice, _label in Board.PLATFORM_CHOICES]
+    capabilities = [f"{prefix}cap_{i:02d}" for i in range(capability_count)]
+    profiles = {
+        platform: [
+            frozenset(rng.sample(capabilities, rng.randint(3, min(10, capability_count))))
+            for _ in range(profiles_per_platform)
+        ]
+        for platform in platforms
+    }
+    boards = []
+    for i in range(board_count):
+        platform = rng.choice(platforms)
+        boards.append(
+            SyntheticBoard(pk=i, platform=platform, capabilities=rng.choice(profiles[platform]))
+        )
+
+    now = timezone.now()
+    requests = []
+    for i in range(board_count * requests_per_board):
+        platform = rng.choice(platforms)
+        if rng.random() < blocked_ratio:
+            required = capabilities
+        else:
+            profile = sorted(rng.choice(profiles[platform]))
+            required = rng.sample(profile, rng.randint(0, min(3, len(profile))))
+        requests.append(
+            TestRequest(
+                platform=platform,
+                priority=rng.randint(0, 5),
+                required_capabilities=",".join(sorted(required)),
+                created_at=now - timedelta(seconds=i),
+            )
+        )
+    requests.sort(key=QueuePolicy().sort_key)
+    return SyntheticFleet(capabilities=capabilities, boards=boards, requests=requests)
+
+
+def legacy_scan_pass(fleet: SyntheticFleet) -> int:
+    """Board-by-board linear scan that re-parses capability strings for every pair."""
+    queued = list(fleet.requests)
+    assigned = 0
+    for board in fleet.boards:
+        for req in queued:
+            if req.platform != board.platform:
+                continue
+            required = {cap for cap in req.required_capabilities.split(",") if cap}
+            if required.issubset(board.capabilities):
+                queued.remove(req)
+                assigned += 1
+                break
+    return assigned
+
+
+def indexed_pass(fleet: SyntheticFleet) -> int:
+    """Catalog + bitmask index lookup, as used by DispatcherService.schedule."""
+    index, board_masks = _fleet_index(fleet)
+    assigned = 0
+    for board in fleet.boards:
+        if index.pop_best(board.platform, board_masks[board.pk]):
+            assigned += 1
+    return assigned
+
+
+def _fleet_index(fleet: SyntheticFleet):
+    catalog = CapabilityCatalog(enumerate(fleet.capabilities))
+    index = RequestIndex(catalog)
+    index.extend((req, catalog.mask_for_names(req.required_capabilities)) for req in fleet.requests)
+    board_masks = {}
+    for board in fleet.boards:
+        board_masks[board.pk] = 0
+        for name in board.capabilities:
+            board_masks[board.pk] |= catalog.bit_by_name[name]
+    return index, board_masks
+
+
+def benchmark_assignment(
+    fleet_sizes: List[int], requests_per_board: int = 1, seed: int = 0
+) -> List[Dict]:
+    """Compare assignment modes on the same fleets.
+
+    Reports assignments, priority served and CPU time per pass for each mode.
+
+    With about one queued request per board, contention for scarce capability profiles is what
+    separates the modes; deep queues let almost any board find some work either way.
+    """
+    rows = []
+    for size in fleet_sizes:
+        fleet = build_fleet(size, requests_per_board=requests_per_board, seed=seed)
+        platforms = sorted({board.platform for board in fleet.boards})
+        for mode, strategy in ASSIGNMENT_MODES.items():
+            index, board_masks = _fleet_index(fleet)
+            started = time.perf_counter()
+            plan = []
+            for platform in platforms:
+                boards = [board for board in fleet.boards if board.platform == platform]
+                plan.extend(strategy(platform, boards, board_masks, index))
+            rows.append(
+                {
+                    "boards": size,
+                    "requests": len(fleet.requests),
+                    "mode": mode,
+                    "assigned": len(plan),
+                    "priority_served": sum(req.priority for _board, req in plan),
+                    "cpu_ms": (time.perf_counter() - started) * 1000,
+                }
+            )
+    return rows
+
+
+def benchmark_matcher(
+    fleet_sizes: List[int], requests_per_board: int = 10, legacy_limit: int = 1000, seed: int = 0
+) -> List[Dict]:
+    """Time one scheduling pass per fleet size for the legacy scan and the indexed matcher."""
+    rows = []
+    for size in fleet_sizes:
+        fleet = build_fleet(size, requests_per_board=requests_per_board, seed=seed)
+        row = {"boards": size, "requests": len(fleet.requests)}
+
+        started = time.perf_counter()
+        row["assigned"] = indexed_pass(fleet)
+        row["indexed_ms"] = (time.perf_counter() - started) * 1000
+
+        if size <= legacy_limit:
+            started = time.perf_counter()
+            row["legacy_assigned"] = legacy_scan_pass(fleet)
+            row["legacy_ms"] = (time.perf_counter() - started) * 1000
+        else:
+            row["legacy_assigned"] = row["legacy_ms"] = None
+        rows.append(row)
+    return rows
+
+
+@dataclass
+class SeededFleet:
+    capability_ids: List
+    test_pc_ids: List
+    board_ids: List
+    request_ids: List[int]
+
+    def delete(self):
+        """Remove every row created by ``seed_fleet``."""
+        TestRequest.objects.filter(pk__in=self.request_ids).delete()
+        Board.objects.filter(pk__in=self.board_ids).delete()
+        TestPC.objects.filter(pk__in=self.test_pc_ids).delete()
+        Capability.objects.filter(pk__in=self.capability_ids).delete()
+
+
+def seed_fleet(
+    fleet: SyntheticFleet, prefix: str, boards_per_pc: int = 8, with_requests: bool = True
+) -> SeededFleet:
+    """Persist a synthetic fleet as Capability/TestPC/Board rows and, optionally, its queue.
+
+    TestPCs get addresses from the 198.18.0.0/15 benchmarking range so they cannot clash with
+    real lab machines; names are prefixed so seeded rows are easy to spot.
+    """
+    capabilities = Capability.objects.bulk_create(
+        [Capability(name=name) for name in fleet.capabilities]
+    )
+    cap_by_name = {cap.name: cap for cap in capabilities}
+
+    pc_count = -(-len(fleet.boards) // boards_per_pc)
+    test_pcs = TestPC.objects.bulk_create(
+        [
+            TestPC(
+                hostname=f"{prefix}pc-{i}",
+                ip_address=f"198.{18 + (i >> 16)}.{(i >> 8) & 255}.{i & 255}",
+                os_version="ubuntu_22_04",
+                status="ONLINE",
+            )
+            for i in range(pc_count)
+        ]
+    )
+
+    boards = Board.objects.bulk_create(
+        [
+            Board(
+                name=f"{prefix}board-{board.pk:05d}",
+                hardware_serial_number=f"{prefix}sn-{board.pk:05d}",
+                project="benchmark",
+                platform=board.platform,
+                test_farm="STAGING",
+                sdk_version="benchmark",
+                status="IDLE",
+                is_alive=True,
+                test_pc=test_pcs[board.pk // boards_per_pc],
+            )
+            for board in fleet.boards
+        ]
+    )
+    Board.capabilities.through.objects.bulk_create(
+        [
+            Board.capabilities.through(board_id=board.pk, capability_id=cap_by_name[name].pk)
+            for board, synthetic in zip(boards, fleet.boards)
+            for name in synthetic.capabilities
+        ]
+    )
+
+    requests = []
+    if with_requests:
+        requests = TestRequest.objects.bulk_create(
+            [
+                TestRequest(
+                    platform=req.platform,
+                    priority=req.priority,
+                    required_capabilities=req.required_capabilities,
+                )
+                for req in fleet.requests
+            ]
+        )
+        TestRequest.capabilities.through.objects.bulk_create(
+            [
+                TestRequest.capabilities.through(
+                    testrequest_id=req.pk, capability_id=cap_by_name[name].pk
+                )
+                for req in requests
+                for name in req.required_capabilities.split(",")
+                if name
+            ]
+        )
+    return SeededFleet(
+        capability_ids=[cap.pk for cap in capabilities],
+        test_pc_ids=[pc.pk for pc in test_pcs],
+        board_ids=[board.pk for board in boards],
+        request_ids=[req.pk for req in requests],
+    )
+
+
+def find_double_dispatch(request_ids: List[int]) -> List:
+    """Boards that hold more than one RUNNING request, or a RUNNING request while not BUSY."""
+    running = TestRequest.objects.filter(pk__in=request_ids, status="RUNNING")
+    overbooked = (
+        running.order_by()
+        .values("executed_on_board")
+        .annotate(running=Count("id"))
+        .filter(running__gt=1)
+        .values_list("executed_on_board", flat=True)
+    )
+    inconsistent = running.filter(
+        Q(executed_on_board__isnull=True) | ~Q(executed_on_board__status="BUSY")
+    ).values_list("executed_on_board", flat=True)
+    return sorted({*overbooked, *inconsistent}, key=str)
+
+
+def _churn(request_ids: List[int], rounds: int, errors: List[str]):
+    from apps.dispatcher.services import dispatcher_service
+
+    rng = random.Random()
+    try:
+        for _ in range(rounds):
+            try:
+                running = TestRequest.objects.filter(pk__in=request_ids, status="RUNNING")
+                running = list(running.values_list("pk", flat=True)[:20])
+                if running:
+                    dispatcher_service.complete_request(
+                        rng.choice(running), success=rng.random() > 0.1
+                    )
+                dispatcher_service.schedule()
+            except OperationalError as exc:
+                errors.append(str(exc))
+    finally:
+        connection.close()
+
+
+def _churn_threads(request_ids: List[int], rounds: int, threads: int, errors: List[str]):
+    workers = [
+        threading.Thread(target=_churn, args=(request_ids, rounds, errors)) for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def _churn_process(request_ids: List[int], rounds: int, threads: int, results):
+    errors: List[str] = []
+    _churn_threads(request_ids, rounds, threads, errors)
+    results.put(errors)
+
+
+def hammer_schedule(
+    request_ids: List[int], threads: int = 8, processes: int = 4, rounds: int = 20
+) -> Dict:
+    """Complete and schedule concurrently from ``processes`` x ``threads`` workers.
+
+    Transient database errors (e.g. SQLite's "database is locked") are counted rather than
+    raised; what matters is that ``find_double_dispatch`` comes back empty afterwards.
+    """
+    errors: List[str] = []
+    started = time.perf_counter()
+    if processes:
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        children = [
+            context.Process(target=_churn_process, args=(request_ids, rounds, threads, results))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+        for _child in children:
+            errors.extend(results.get())
+        for child in children:
+            child.join()
+    else:
+        _churn_threads(request_ids, rounds, threads, errors)
+    return {
+        "workers": max(processes, 1) * threads,
+        "elapsed_s": time.perf_counter() - started,
+        "errors": errors,
+        "violations": find_double_dispatch(request_ids),
+    }
+
+
+class QueryCounter:
+    """Database execute wrapper that counts statements without keeping a query log."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class OperationStats:
+    """Latency and query-count samples for one kind of dispatcher call."""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.queries: List[int] = []
+
+    def measure(self, func, *args, **kwargs):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.latencies_ms.append((time.perf_counter() - started) * 1000)
+        self.queries.append(counter.count)
+        return result
+
+    def summary(self) -> Dict:
+        return {
+            "calls": len(self.latencies_ms),
+            "p50_ms": percentile(self.latencies_ms, 50),
+            "p95_ms": percentile(self.latencies_ms, 95),
+            "p99_ms": percentile(self.latencies_ms, 99),
+            "total_ms": sum(self.latencies_ms),
+            "avg_queries": sum(self.queries) / len(self.queries) if self.queries else None,
+        }
+
+
+def simulate(
+    seeded: SeededFleet,
+    fleet: SyntheticFleet,
+    arrivals_per_tick: int = 50,
+    completions_per_tick: int = 25,
+    failure_ratio: float = 0.05,
+    seed: int = 0,
+) -> Dict:
+    """Replay the fleet's requests as an arrival stream against the real dispatcher.
+
+    Every tick queues ``arrivals_per_tick`` requests, then completes up to
+    ``completions_per_tick`` running ones. Runs until the stream is exhausted and the queue
+    has drained or stalled; a final full ``schedule()`` is measured as the reconciliation pass.
+    """
+    from apps.dispatcher.services import dispatcher_service
+
+    rng = random.Random(seed)
+    stats = {name: OperationStats() for name in ("queue_requests", "complete_request", "schedule")}
+    arrivals = sorted(fleet.requests, key=lambda req: req.created_at)
+    utilization: List[float] = []
+    board_count = len(seeded.board_ids)
+
+    cursor = 0
+    while True:
+        batch = arrivals[cursor : cursor + arrivals_per_tick]
+        cursor += len(batch)
+        if batch:
+            result = stats["queue_requests"].measure(
+                dispatcher_service.queue_requests,
+                [
+                    {
+                        "platform": req.platform,
+                        "priority": req.priority,
+                        "required_capabilities": [
+                            cap for cap in req.required_capabilities.split(",") if cap
+                        ],
+                    }
+                    for req in batch
+                ],
+            )
+            seeded.request_ids.extend(result.request_ids)
+
+        running = TestRequest.objects.filter(pk__in=seeded.request_ids, status="RUNNING")
+        running = list(running.values_list("pk", flat=True))
+        for request_id in rng.sample(running, min(completions_per_tick, len(running))):
+            stats["complete_request"].measure(
+                dispatcher_service.complete_request,
+                request_id,
+                success=rng.random() >= failure_ratio,
+            )
+
+        busy = Board.objects.filter(pk__in=seeded.board_ids, status="BUSY").count()
+        utilization.append(busy / board_count if board_count else 0.0)
+        if not batch and not running:
+            break
+
+    stats["schedule"].measure(dispatcher_service.schedule)
+
+    assigned = TestRequest.objects.filter(
+        pk__in=seeded.request_ids, started_at__isnull=False
+    ).count()
+    scheduling_ms = sum(op.summary()["total_ms"] for op in stats.values())
+    return {
+        "boards": board_count,
+        "requests": len(seeded.request_ids),
+        "assigned": assigned,
+        "ticks": len(utilization),
+        "assignments_per_s": assigned / (scheduling_ms / 1000) if scheduling_ms else None,
+        "mean_utilization": sum(utilization) / len(utilization) if utilization else 0.0,
+        "operations": {name: op.summary() for name, op in stats.items()},
+        "violations": find_double_dispatch(seeded.request_ids),
+    }
@@ -0,0 +1,136 @@
+"""Dispatcher status counters kept in the cache and adjusted as requests move through the queue."""
+import logging
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.boards.models import Board
+from apps.dispatcher.models import TestRequest
+
+logger = logging.getLogger(__name__)
+
+COUNTER_KEYS = {
+    "queued_requests": "dispatcher:count:queued_requests",
+    "running_requests": "dispatcher:count:running_requests",
+    "busy_boards": "dispatcher:count:busy_boards",
+    "idle_boards": "dispatcher:count:idle_boards",
+}
+# Cumulative, not derivable from the database, so never recounted or expired.
+SDK_PLACEMENT_KEYS = {
+    "reflashes": "dispatcher:sdk:reflashes",
+    "reflashes_avoided": "dispatcher:sdk:reflashes_avoided",
+}
+# Dispatches onto boards that had queued work waiting when they were freed, split by whether the
+# request was reserved for the board, with the milliseconds each board sat idle in between.
+IDLE_GAP_KEYS = {
+    "reservations": "dispatcher:pipeline:reservations",
+    "reserved_dispatches": "dispatcher:pipeline:reserved_dispatches",
+    "reserved_idle_ms": "dispatcher:pipeline:reserved_idle_ms",
+    "unreserved_dispatches": "dispatcher:pipeline:unreserved_dispatches",
+    "unreserved_idle_ms": "dispatcher:pipeline:unreserved_idle_ms",
+}
+
+
+def recount() -> Dict[str, int]:
+    """Count exactly from the database and overwrite the cached counters."""
+    counts = {
+        "queued_requests": TestRequest.objects.filter(status="QUEUED").count(),
+        "running_requests": TestRequest.objects.filter(status="RUNNING").count(),
+        "busy_boards": Board.objects.filter(status="BUSY").count(),
+        "idle_boards": Board.objects.filter(status="IDLE", is_locked=False).count(),
+    }
+    cache.set_many(
+        {COUNTER_KEYS[name]: value for name, value in counts.items()},
+        timeout=settings.DISPATCHER_COUNTERS_TTL,
+    )
+    return counts
+
+
+def read(fresh: bool = False) -> Dict[str, int]:
+    """Cached counters, recounted when ``fresh`` is set or any counter has expired."""
+    if not fresh:
+        cached = cache.get_many(list(COUNTER_KEYS.values()))
+        if len(cached) == len(COUNTER_KEYS):
+            return {name: max(cached[key], 0) for name, key in COUNTER_KEYS.items()}
+    return recount()
+
+
+def _apply(deltas: Dict[str, int]):
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(COUNTER_KEYS[name], delta)
+        except ValueError:
+            # Expired or never counted; the next read recounts from the database.
+            pass
+
+
+def adjust(**deltas: int):
+    """Shift counters by the given amounts once the current transaction commits.
+
+    Changes made outside the dispatcher (admin edits, board maintenance) are not tracked;
+    the periodic recount and the counter TTL bound how long they can drift.
+    """
+    transaction.on_commit(lambda: _apply(deltas))
+
+
+def record_sdk_placements(**counts: int):
+    """Add to the running totals of reflashes caused and avoided by dispatching."""
+    for name, count in counts.items():
+        if count:
+            cache.add(SDK_PLACEMENT_KEYS[name], 0, timeout=None)
+            cache.incr(SDK_PLACEMENT_KEYS[name], count)
+
+
+def sdk_placements() -> Dict[str, int]:
+    """Reflash totals and the board time affinity saved.
+
+    The saved time is estimated from DISPATCHER_REFLASH_SECONDS.
+    """
+    cached = cache.get_many(list(SDK_PLACEMENT_KEYS.values()))
+    totals = {name: cached.get(key, 0) for name, key in SDK_PLACEMENT_KEYS.items()}
+    saved = totals["reflashes_avoided"] * settings.DISPATCHER_REFLASH_SECONDS
+    totals["board_seconds_saved"] = saved
+    return totals
+
+
+def record_idle_gaps(
+    reserved: Iterable[float] = (), unreserved: Iterable[float] = (), reservations: int = 0
+):
+    """Add idle seconds between consecutive jobs on a board, and new reservations, to the totals."""
+    reserved, unreserved = list(reserved), list(unreserved)
+    counts = {
+        "reservations": reservations,
+        "reserved_dispatches": len(reserved),
+        "reserved_idle_ms": int(sum(reserved) * 1000),
+        "unreserved_dispatches": len(unreserved),
+        "unreserved_idle_ms": int(sum(unreserved) * 1000),
+    }
+    for name, count in counts.items():
+        if count:
+            cache.add(IDLE_GAP_KEYS[name], 0, timeout=None)
+            cache.incr(IDLE_GAP_KEYS[name], count)
+
+
+def idle_gaps() -> Dict[str, object]:
+    """Average idle time between jobs with and without a reservation, and the difference."""
+    cached = cache.get_many(list(IDLE_GAP_KEYS.values()))
+    totals = {name: cached.get(key, 0) for name, key in IDLE_GAP_KEYS.items()}
+    averages = {}
+    for kind in ("reserved", "unreserved"):
+        dispatches = totals[f"{kind}_dispatches"]
+        averages[kind] = totals[f"{kind}_idle_ms"] / dispatches / 1000 if dispatches else None
+    saved = None
+    if averages["reserved"] is not None and averages["unreserved"] is not None:
+        saved = averages["unreserved"] - averages["reserved"]
+    return {
+        "reservations": totals["reservations"],
+        "reserved_dispatches": totals["reserved_dispatches"],
+        "unreserved_dispatches": totals["unreserved_dispatches"],
+        "avg_idle_seconds_reserved": averages["reserved"],
+        "avg_idle_seconds_unreserved": averages["unreserved"],
+        "avg_idle_seconds_saved": saved,
+    }
@@ -0,0 +1,113 @@
+"""Long-running scheduling loop driven by wakeup notifications."""
+import logging
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.core.utils import percentile
+from apps.dispatcher.services import DAEMON_STATS_CACHE_KEY, DispatcherService
+from apps.dispatcher.wakeup import Wakeup, WakeupListener
+
+logger = logging.getLogger(__name__)
+
+LOOP_HISTORY = 200
+
+
+class DispatcherDaemon:
+    """Owns scheduling: waits for wakeups, coalesces bursts, and runs one pass per burst.
+
+    Without wakeups for ``idle_seconds`` it runs a full pass anyway, so lost notifications
+    delay work by at most that long.
+    """
+
+    def __init__(
+        self,
+        service: Optional[DispatcherService] = None,
+        listener: Optional[WakeupListener] = None,
+        coalesce_seconds: Optional[float] = None,
+        idle_seconds: Optional[float] = None,
+    ):
+        self.service = service or DispatcherService()
+        self.listener = listener or WakeupListener()
+        self.coalesce_seconds = (
+            settings.DISPATCHER_DAEMON_COALESCE_SECONDS
+            if coalesce_seconds is None
+            else coalesce_seconds
+        )
+        self.idle_seconds = (
+            settings.DISPATCHER_DAEMON_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        )
+        self.loops = 0
+        self.stopping = False
+        self.started_at = timezone.now()
+        self._pass_ms: Deque[float] = deque(maxlen=LOOP_HISTORY)
+
+    def stop(self, *_args):
+        self.stopping = True
+
+    def run(self, max_loops: Optional[int] = None):
+        logger.info(
+            "Dispatcher daemon started (wakeups via %s, coalesce %.2fs, idle pass every %.0fs)",
+            self.listener.kind,
+            self.coalesce_seconds,
+            self.idle_seconds,
+        )
+        try:
+            while not self.stopping and (max_loops is None or self.loops < max_loops):
+                self.run_once()
+        finally:
+            self.listener.close()
+            logger.info("Dispatcher daemon stopped after %s loops", self.loops)
+
+    def run_once(self):
+        waited = time.perf_counter()
+        wakeups = self.listener.wait(self.idle_seconds, self.coalesce_seconds)
+        started = time.perf_counter()
+
+        merged = Wakeup(full=not wakeups)
+        for wakeup in wakeups:
+            merged.merge(wakeup)
+
+        close_old_connections()
+        try:
+            self._dispatch(merged)
+        except Exception:
+            logger.exception("Dispatcher pass failed")
+        finished = time.perf_counter()
+
+        self.loops += 1
+        self._pass_ms.append((finished - started) * 1000)
+        self._publish(
+            wakeups=len(wakeups),
+            trigger="full" if merged.full else "wakeup",
+            wait_ms=(started - waited) * 1000,
+            pass_ms=(finished - started) * 1000,
+        )
+
+    def _dispatch(self, wakeup: Wakeup):
+        if wakeup.full:
+            self.service.schedule()
+            return
+        if wakeup.platforms:
+            self.service.schedule(platforms=wakeup.platforms)
+        if wakeup.board_ids:
+            self.service.schedule_boards(wakeup.board_ids)
+
+    def _publish(self, **last_loop):
+        history = list(self._pass_ms)
+        cache.set(
+            DAEMON_STATS_CACHE_KEY,
+            {
+                "started_at": self.started_at.isoformat(),
+                "loops": self.loops,
+                "wakeup_backend": self.listener.kind,
+                "last_loop": {**last_loop, "finished_at": timezone.now().isoformat()},
+                "pass_ms": {f"p{pct}": percentile(history, pct) for pct in (50, 95, 99)},
+            },
+            timeout=max(self.idle_seconds * 3, 60),
+        )
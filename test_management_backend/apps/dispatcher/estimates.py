@@ -0,0 +1,195 @@
+"""Run-duration history and start/finish estimates for queued requests."""
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.boards.models import Board
+from apps.dispatcher.matching import CapabilityCatalog, able_to_serve
+from apps.dispatcher.models import RunDuration, TestRequest
+
+DurationKey = Tuple[str, str]
+# Statuses whose boards will not take work any time soon.
+UNAVAILABLE_BOARD_STATUSES = ("OFFLINE", "DEACTIVATED", "ERROR")
+
+
+def record_durations(runs: Iterable[Tuple[str, str, Optional[datetime]]], finished_at: datetime):
+    """Fold finished (platform, required_capabilities, started_at) runs into RunDuration rows.
+
+    Call inside the transaction that completes the requests. Rows are locked per key, so
+    concurrent completions of the same kind of request update the averages in turn.
+    """
+    samples: Dict[DurationKey, List[float]] = defaultdict(list)
+    for platform, cap_str, started_at in runs:
+        if started_at is not None:
+            samples[platform, cap_str].append(max((finished_at - started_at).total_seconds(), 0.0))
+    if not samples:
+        return
+
+    RunDuration.objects.bulk_create(
+        [
+            RunDuration(platform=platform, required_capabilities=cap_str)
+            for platform, cap_str in samples
+        ],
+        ignore_conflicts=True,
+    )
+    key_filter = Q()
+    for platform, cap_str in samples:
+        key_filter |= Q(platform=platform, required_capabilities=cap_str)
+    alpha = settings.DISPATCHER_DURATION_EWMA_ALPHA
+    for stat in RunDuration.objects.select_for_update().filter(key_filter):
+        for seconds in samples[stat.platform, stat.required_capabilities]:
+            if stat.runs:
+                stat.recent_seconds += alpha * (seconds - stat.recent_seconds)
+            else:
+                stat.recent_seconds = seconds
+            stat.runs += 1
+            stat.total_seconds += seconds
+        stat.save(update_fields=["runs", "total_seconds", "recent_seconds", "updated_at"])
+
+
+class DurationModel:
+    """Expected run time per (platform, capability set), falling back to the platform average."""
+
+    def __init__(self, stats: Iterable[RunDuration]):
+        self.by_key: Dict[DurationKey, RunDuration] = {}
+        weighted: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        for stat in stats:
+            self.by_key[stat.platform, stat.required_capabilities] = stat
+            weighted[stat.platform][0] += stat.recent_seconds * stat.runs
+            weighted[stat.platform][1] += stat.runs
+        self.by_platform = {
+            platform: total / runs for platform, (total, runs) in weighted.items() if runs
+        }
+
+    @classmethod
+    def for_platform(cls, platform: str) -> "DurationModel":
+        return cls(RunDuration.objects.filter(platform=platform))
+
+    def expected(self, req: TestRequest) -> float:
+        """Expected seconds on a board; the request's timeout when nothing like it has run yet."""
+        stat = self.by_key.get((req.platform, req.required_capabilities))
+        if stat and stat.runs:
+            return stat.recent_seconds
+        return self.by_platform.get(req.platform, float(req.timeout))
+
+    def samples(self, req: TestRequest) -> int:
+        stat = self.by_key.get((req.platform, req.required_capabilities))
+        return stat.runs if stat else 0
+
+
+def estimate(req: TestRequest, now: Optional[datetime] = None) -> dict:
+    """Estimated start and finish of a request, with the inputs the estimate was built from.
+
+    For a queued request this replays the queue: requests ahead of it in priority order that
+    one of its matching boards could also serve take the earliest-free board in turn, busy
+    boards free up when their current run is expected to end, and the request starts on the
+    first board free after them. Fair share, aging and placement preferences are not modelled.
+    """
+    now = now or timezone.now()
+    durations = DurationModel.for_platform(req.platform)
+    expected = durations.expected(req)
+    result = {
+        "request_id": req.pk,
+        "status": req.status,
+        "expected_duration_seconds": expected,
+        "duration_samples": durations.samples(req),
+        "queue_position": None,
+        "matching_boards": None,
+        "estimated_start": None,
+        "estimated_finish": None,
+        "estimated_wait_seconds": None,
+    }
+
+    if req.status == "RUNNING":
+        finish = max(req.started_at + timedelta(seconds=expected), now)
+        result.update(
+            estimated_start=req.started_at, estimated_finish=finish, estimated_wait_seconds=0.0
+        )
+        return result
+    if req.status != "QUEUED":
+        result.update(
+            estimated_start=req.started_at,
+            estimated_finish=req.completed_at,
+            estimated_wait_seconds=0.0,
+        )
+        return result
+
+    boards = list(
+        Board.objects.filter(
+            platform=req.platform, health_score__gte=settings.DISPATCHER_QUARANTINE_SCORE
+        )
+        .exclude(status__in=UNAVAILABLE_BOARD_STATUSES)
+        .filter(able_to_serve(req.pk))
+        .values_list("pk", "status", "is_locked")
+    )
+    result["matching_boards"] = len(boards)
+    if not boards:
+        return result
+
+    free_at = _board_free_times(boards, durations, now)
+    ahead = _requests_ahead(req, [board[0] for board in boards])
+    result["queue_position"] = len(ahead)
+
+    heapq.heapify(free_at)
+    for other in ahead:
+        heapq.heappush(free_at, heapq.heappop(free_at) + durations.expected(other))
+    start = now + timedelta(seconds=free_at[0])
+    result.update(
+        estimated_start=start,
+        estimated_finish=start + timedelta(seconds=expected),
+        estimated_wait_seconds=free_at[0],
+    )
+    return result
+
+
+def _board_free_times(
+    boards: List[Tuple[object, str, bool]], durations: DurationModel, now: datetime
+) -> List[float]:
+    """Seconds from now until each matching board is expected to be free."""
+    busy_ids = [pk for pk, status, _locked in boards if status != "IDLE"]
+    runs = TestRequest.objects.filter(status="RUNNING", executed_on_board_id__in=busy_ids).only(
+        "platform", "required_capabilities", "timeout", "started_at", "executed_on_board_id"
+    )
+    running = {run.executed_on_board_id: run for run in runs}
+    # Busy outside the dispatcher (e.g. UPDATING_SDK or locked): assume one typical run.
+    typical = next(iter(durations.by_platform.values()), 0.0)
+    free_at = []
+    for pk, status, locked in boards:
+        run = running.get(pk)
+        if run is None:
+            free_at.append(0.0 if status == "IDLE" and not locked else typical)
+            continue
+        expected_end = run.started_at + timedelta(seconds=durations.expected(run))
+        remaining = (expected_end - now).total_seconds()
+        free_at.append(max(remaining, 0.0))
+    return free_at
+
+
+def _requests_ahead(req: TestRequest, board_ids: List) -> List[TestRequest]:
+    """Queued requests scheduled before ``req`` that one of its matching boards could serve."""
+    ahead_filter = (
+        Q(priority__gt=req.priority)
+        | Q(priority=req.priority, created_at__lt=req.created_at)
+        | Q(priority=req.priority, created_at=req.created_at, pk__lt=req.pk)
+    )
+    queued = (
+        TestRequest.objects.filter(status="QUEUED", platform=req.platform)
+        .filter(ahead_filter)
+        .order_by("-priority", "created_at", "pk")
+        .only("platform", "priority", "required_capabilities", "timeout", "created_at")
+    )
+    catalog = CapabilityCatalog.load()
+    board_masks = set(catalog.board_masks(board_ids).values())
+    request_masks = catalog.request_masks(queued.values("pk"))
+    ahead = []
+    for other in queued:
+        mask = request_masks.get(other.pk, 0)
+        # None means a needed capability is inactive: no board serves it, so it is not ahead.
+        if mask is not None and any(mask & ~board_mask == 0 for board_mask in board_masks):
+            ahead.append(other)
+    return ahead
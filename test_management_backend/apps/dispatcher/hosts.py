@@ -0,0 +1,166 @@
+"""TestPC load awareness: latest host stats, per-PC concurrency limits and headroom ranking."""
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+
+from apps.boards.models import Board, PCStats, TestPC
+
+PC_STATS_CACHE_KEY = "dispatcher:pc_stats:{test_pc_id}"
+STAT_FIELDS = ("cpu_percent", "memory_percent", "disk_percent", "timestamp")
+
+
+@dataclass
+class HostLoad:
+    """Latest resource usage of one TestPC and the dispatcher's view of its running jobs."""
+
+    test_pc_id: object
+    running: int = 0
+    limit: Optional[int] = None
+    cpu_percent: Optional[float] = None
+    memory_percent: Optional[float] = None
+    disk_percent: Optional[float] = None
+
+    @property
+    def headroom(self) -> float:
+        """Percentage points left on the scarcest resource; 0 when no recent stats exist."""
+        if self.cpu_percent is None:
+            return 0.0
+        return 100 - max(self.cpu_percent, self.memory_percent, self.disk_percent)
+
+    @property
+    def saturated(self) -> bool:
+        if self.cpu_percent is None:
+            return False
+        return (
+            self.cpu_percent >= settings.DISPATCHER_PC_CPU_LIMIT
+            or self.memory_percent >= settings.DISPATCHER_PC_MEMORY_LIMIT
+            or self.disk_percent >= settings.DISPATCHER_PC_DISK_LIMIT
+        )
+
+    @property
+    def has_slot(self) -> bool:
+        return not self.saturated and (self.limit is None or self.running < self.limit)
+
+
+def latest_pc_stats(test_pc_ids: Iterable[object]) -> Dict[object, Optional[dict]]:
+    """Latest PCStats values per TestPC, from the cache or one query for the misses."""
+    test_pc_ids = set(test_pc_ids)
+    keys = {PC_STATS_CACHE_KEY.format(test_pc_id=pc_id): pc_id for pc_id in test_pc_ids}
+    cached = cache.get_many(list(keys))
+    stats = {keys[key]: value for key, value in cached.items()}
+
+    missing = test_pc_ids - set(stats)
+    if missing:
+        # Older stats count as missing anyway; the bound also lets partitioned tables skip old
+        # partitions.
+        oldest = timezone.now() - timedelta(seconds=settings.DISPATCHER_PC_STATS_MAX_AGE)
+        latest = PCStats.objects.filter(test_pc=OuterRef("pk"), timestamp__gte=oldest)
+        latest = latest.order_by("-timestamp")
+        rows = TestPC.objects.filter(pk__in=missing).annotate(
+            **{f"latest_{name}": Subquery(latest.values(name)[:1]) for name in STAT_FIELDS}
+        )
+        fresh = {}
+        for pc in rows.values("pk", *(f"latest_{name}" for name in STAT_FIELDS)):
+            row = {name: pc[f"latest_{name}"] for name in STAT_FIELDS}
+            fresh[pc["pk"]] = row if row["timestamp"] is not None else None
+        # Cache PCs without stats too, so they do not cost a query on every pass.
+        cache.set_many(
+            {PC_STATS_CACHE_KEY.format(test_pc_id=pc_id): fresh.get(pc_id) for pc_id in missing},
+            timeout=settings.DISPATCHER_PC_STATS_TTL,
+        )
+        stats.update({pc_id: fresh.get(pc_id) for pc_id in missing})
+    return stats
+
+
+class HostCapacity:
+    """Per-pass view of TestPC load: which boards may take work, and in what order.
+
+    Built once per scheduling pass from the cached latest stats plus one grouped count of busy
+    boards per PC. Stats older than DISPATCHER_PC_STATS_MAX_AGE are treated as missing: the
+    host is neither preferred nor held back on account of them.
+    """
+
+    def __init__(self, hosts: Dict[object, HostLoad]):
+        self.hosts = hosts
+        self.held_back = 0
+
+    @classmethod
+    def for_boards(cls, boards: Iterable[Board]) -> "HostCapacity":
+        pc_ids = {board.test_pc_id for board in boards if board.test_pc_id}
+        if not pc_ids:
+            return cls({})
+        limits = dict(TestPC.objects.filter(pk__in=pc_ids).values_list("pk", "max_concurrent_runs"))
+        running = dict(
+            Board.objects.filter(test_pc_id__in=pc_ids, status="BUSY")
+            .order_by()
+            .values("test_pc_id")
+            .annotate(busy=Count("pk"))
+            .values_list("test_pc_id", "busy")
+        )
+        oldest = timezone.now() - timedelta(seconds=settings.DISPATCHER_PC_STATS_MAX_AGE)
+        hosts = {}
+        for pc_id, stats in latest_pc_stats(pc_ids).items():
+            limit = limits.get(pc_id) or settings.DISPATCHER_PC_MAX_CONCURRENT or None
+            host = HostLoad(test_pc_id=pc_id, running=running.get(pc_id, 0), limit=limit)
+            if stats and stats["timestamp"] >= oldest:
+                host.cpu_percent = stats["cpu_percent"]
+                host.memory_percent = stats["memory_percent"]
+                host.disk_percent = stats["disk_percent"]
+            hosts[pc_id] = host
+        return cls(hosts)
+
+    def rank(self, boards: Iterable[Board]) -> List[Board]:
+        """Healthy boards first, then by host headroom and fewest running jobs.
+
+        Boards of saturated hosts are dropped.
+        """
+        ranked = []
+        for board in boards:
+            host = self.hosts.get(board.test_pc_id)
+            if host is not None and host.saturated:
+                self.held_back += 1
+                continue
+            ranked.append(board)
+        return sorted(ranked, key=self._board_key)
+
+    def _board_key(self, board: Board):
+        degraded = board.health_score < settings.DISPATCHER_HEALTH_DEPRIORITIZE_SCORE
+        host = self.hosts.get(board.test_pc_id)
+        if host is None:
+            return (degraded, 0.0, 0, board.name)
+        return (degraded, -host.headroom, host.running, board.name)
+
+    def admits(self, board: Board) -> bool:
+        host = self.hosts.get(board.test_pc_id)
+        if host is None or host.has_slot:
+            return True
+        self.held_back += 1
+        return False
+
+    def charge(self, board: Board):
+        host = self.hosts.get(board.test_pc_id)
+        if host is not None:
+            host.running += 1
+
+    def trim(self, boards: List[Board]) -> List[Board]:
+        """Keep, in order, only as many boards per PC as it has free slots."""
+        slots = {
+            pc_id: None if host.limit is None else max(0, host.limit - host.running)
+            for pc_id, host in self.hosts.items()
+        }
+        kept = []
+        for board in boards:
+            slot = slots.get(board.test_pc_id)
+            if slot is None:
+                kept.append(board)
+            elif slot > 0:
+                slots[board.test_pc_id] = slot - 1
+                kept.append(board)
+            else:
+                self.held_back += 1
+        return kept
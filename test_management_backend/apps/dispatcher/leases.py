@@ -0,0 +1,71 @@
+"""Work announcements for TestPC agents long-polling the lease endpoint.
+
+When a pass hands boards new requests, each affected TestPC's channel-layer group gets a
+message after the transaction commits. Waiting agents sit on a process-local channel in
+that group, so an idle agent costs one coroutine, not a thread or a database poll. Without a
+channel layer, waiters re-check the database every DISPATCHER_LEASE_POLL_SECONDS instead.
+"""
+import asyncio
+import logging
+from typing import Iterable, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+LEASE_GROUP = "dispatcher_lease_{test_pc_id}"
+
+
+def group_for(test_pc_id) -> str:
+    return LEASE_GROUP.format(test_pc_id=str(test_pc_id).replace("-", ""))
+
+
+def announce(test_pc_ids: Iterable):
+    """Tell agents of these TestPCs that work is waiting, once the current transaction commits."""
+    groups = sorted({group_for(pc_id) for pc_id in test_pc_ids if pc_id})
+    if groups:
+        transaction.on_commit(lambda: _send(groups))
+
+
+def _send(groups):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        for group in groups:
+            async_to_sync(layer.group_send)(group, {"type": "dispatcher.lease"})
+    except Exception:
+        # Waiting agents re-check when their poll ends; a lost announcement only delays them.
+        logger.exception("Could not announce leases to %s", groups)
+
+
+class LeaseInbox:
+    """Async context manager subscribing one waiting agent to its TestPC's announcements."""
+
+    def __init__(self, test_pc_id):
+        self.group = group_for(test_pc_id)
+        self.layer = get_channel_layer()
+        self.channel: Optional[str] = None
+
+    async def __aenter__(self) -> "LeaseInbox":
+        if self.layer is not None:
+            self.channel = await self.layer.new_channel()
+            await self.layer.group_add(self.group, self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.channel is not None:
+            await self.layer.group_discard(self.group, self.channel)
+
+    async def wait(self, timeout: float):
+        """Return after an announcement or ``timeout`` seconds, whichever comes first."""
+        if self.channel is None:
+            await asyncio.sleep(min(timeout, settings.DISPATCHER_LEASE_POLL_SECONDS))
+            return
+        try:
+            await asyncio.wait_for(self.layer.receive(self.channel), timeout)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,88 @@
+"""Per-platform scheduling and per-client-key enqueue locks shared by every dispatcher process."""
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable
+
+from django.db import connection
+
+from apps.dispatcher.models import TestRequest
+
+# First key of the two-int advisory lock, so dispatcher locks cannot collide with other users.
+ADVISORY_LOCK_NAMESPACE = 0x44535054
+CLIENT_KEY_LOCK_NAMESPACE = 0x444B4559
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(platform: str) -> threading.Lock:
+    with _local_locks_guard:
+        return _local_locks.setdefault(platform, threading.Lock())
+
+
+def advisory_key(name: str) -> int:
+    """Stable signed 32-bit key for a platform name or client key."""
+    key = zlib.crc32(name.encode("utf-8"))
+    return key - (1 << 32) if key >= (1 << 31) else key
+
+
+@contextmanager
+def platform_lock(platform: str):
+    """Serialize scheduling of one platform across threads, processes and hosts.
+
+    Must be entered inside ``transaction.atomic()``; the database side of the lock is released
+    on commit or rollback. PostgreSQL takes a transaction-scoped advisory lock per platform.
+    SQLite has no row or advisory locks, so the fallback takes the database write lock up front
+    (which serializes all platforms across processes) and a per-platform lock within the process.
+    """
+    if not connection.in_atomic_block:
+        raise RuntimeError("platform_lock() must be used inside transaction.atomic()")
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, %s)",
+                [ADVISORY_LOCK_NAMESPACE, advisory_key(platform)],
+            )
+        yield
+        return
+
+    with _local_lock(platform):
+        sqlite_write_lock()
+        yield
+
+
+def sqlite_write_lock():
+    """On SQLite, take the database write lock now, before the transaction's first read.
+
+    A write statement, even one matching no rows, takes SQLite's RESERVED lock and waits on the
+    busy timeout; upgrading after the first read would fail immediately instead. Other
+    backends lock rows as they go, so this does nothing there.
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {TestRequest._meta.db_table} SET id = id WHERE 0")
+
+
+def client_key_lock(keys: Iterable[str]):
+    """Serialize enqueues that share a client key until the transaction ends.
+
+    Must be called inside ``transaction.atomic()``, before checking which keys already exist,
+    so a concurrent enqueue of the same key commits first and shows up in that check.
+    PostgreSQL takes one advisory lock per key, in a fixed order so two batches cannot
+    deadlock; SQLite takes its single write lock.
+    """
+    if not connection.in_atomic_block:
+        raise RuntimeError("client_key_lock() must be used inside transaction.atomic()")
+    if connection.vendor == "postgresql":
+        lock_keys = sorted({advisory_key(key) for key in keys})
+        if lock_keys:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s, key) "
+                    "FROM unnest(%s::integer[]) AS key ORDER BY key",
+                    [CLIENT_KEY_LOCK_NAMESPACE, lock_keys],
+                )
+        return
+    sqlite_write_lock()
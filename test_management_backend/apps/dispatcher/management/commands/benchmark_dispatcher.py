@@ -0,0 +1,198 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.dispatcher.benchmarks import (
+    benchmark_assignment,
+    benchmark_matcher,
+    build_fleet,
+    hammer_schedule,
+    seed_fleet,
+    simulate,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark dispatcher scheduling passes against synthetic fleets. The simulate and "
+        "stress modes write to the configured database; set DB_NAME to run them against "
+        "PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=["matcher", "assignment", "simulate", "stress"],
+            default="matcher",
+            help=(
+                "matcher: in-memory pass time vs fleet size; "
+                "assignment: greedy vs optimal assignment modes; "
+                "simulate: replay arrivals and completions through DispatcherService; "
+                "stress: concurrent schedule() against the database"
+            ),
+        )
+        parser.add_argument(
+            "--fleet-sizes",
+            default="250,500,1000,2000",
+            help="Comma-separated board counts to benchmark",
+        )
+        parser.add_argument(
+            "--requests-per-board",
+            type=int,
+            default=None,
+            help="Queue depth per board (default 10, assignment 1)",
+        )
+        parser.add_argument(
+            "--legacy-limit",
+            type=int,
+            default=1000,
+            help="Largest fleet to also time with the legacy linear scan",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix", default="bench-", help="Name prefix for seeded database rows"
+        )
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Worker threads per process (stress)"
+        )
+        parser.add_argument(
+            "--processes", type=int, default=4, help="Worker processes, 0 for threads only (stress)"
+        )
+        parser.add_argument(
+            "--rounds", type=int, default=20, help="Complete+schedule rounds per worker (stress)"
+        )
+        parser.add_argument(
+            "--arrivals-per-tick", type=int, default=50, help="Requests queued per tick (simulate)"
+        )
+        parser.add_argument(
+            "--completions-per-tick",
+            type=int,
+            default=25,
+            help="Running requests completed per tick (simulate)",
+        )
+        parser.add_argument(
+            "--failure-ratio",
+            type=float,
+            default=0.05,
+            help="Share of completions that fail (simulate)",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep seeded rows instead of deleting them"
+        )
+
+    def handle(self, *args, **options):
+        fleet_sizes = [int(size) for size in options["fleet_sizes"].split(",") if size]
+        if options["requests_per_board"] is None:
+            options["requests_per_board"] = 1 if options["mode"] == "assignment" else 10
+        if options["mode"] == "stress":
+            self._stress(fleet_sizes[0], options)
+        elif options["mode"] == "simulate":
+            for size in fleet_sizes:
+                self._simulate(size, options)
+        elif options["mode"] == "assignment":
+            self._assignment(fleet_sizes, options)
+        else:
+            self._matcher(fleet_sizes, options)
+
+    def _matcher(self, fleet_sizes, options):
+        rows = benchmark_matcher(
+            fleet_sizes,
+            requests_per_board=options["requests_per_board"],
+            legacy_limit=options["legacy_limit"],
+            seed=options["seed"],
+        )
+
+        self.stdout.write(
+            f"{'boards':>8} {'requests':>9} {'assigned':>9} {'indexed ms':>11} {'legacy ms':>10}"
+        )
+        for row in rows:
+            legacy = f"{row['legacy_ms']:.1f}" if row["legacy_ms"] is not None else "-"
+            self.stdout.write(
+                f"{row['boards']:>8} {row['requests']:>9} {row['assigned']:>9} "
+                f"{row['indexed_ms']:>11.1f} {legacy:>10}"
+            )
+            if row["legacy_assigned"] is not None and row["legacy_assigned"] != row["assigned"]:
+                self.stdout.write(
+                    self.style.WARNING(f"  legacy scan assigned {row['legacy_assigned']}")
+                )
+
+    def _assignment(self, fleet_sizes, options):
+        rows = benchmark_assignment(
+            fleet_sizes, requests_per_board=options["requests_per_board"], seed=options["seed"]
+        )
+        self.stdout.write(
+            f"{'boards':>8} {'requests':>9} {'mode':>8} {'assigned':>9} "
+            f"{'priority':>9} {'cpu ms':>8}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['boards']:>8} {row['requests']:>9} {row['mode']:>8} {row['assigned']:>9} "
+                f"{row['priority_served']:>9} {row['cpu_ms']:>8.1f}"
+            )
+
+    def _stress(self, board_count, options):
+        fleet = build_fleet(
+            board_count,
+            requests_per_board=options["requests_per_board"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+        )
+        seeded = seed_fleet(fleet, prefix=options["prefix"])
+        try:
+            result = hammer_schedule(
+                seeded.request_ids,
+                threads=options["threads"],
+                processes=options["processes"],
+                rounds=options["rounds"],
+            )
+        finally:
+            if not options["keep"]:
+                seeded.delete()
+
+        self.stdout.write(
+            f"{result['workers']} workers, {options['rounds']} rounds each "
+            f"in {result['elapsed_s']:.2f}s, {len(result['errors'])} transient database errors"
+        )
+        if result["violations"]:
+            raise CommandError(f"Double dispatch detected on boards: {result['violations']}")
+        self.stdout.write(self.style.SUCCESS("No board was dispatched twice."))
+
+    def _simulate(self, board_count, options):
+        fleet = build_fleet(
+            board_count,
+            requests_per_board=options["requests_per_board"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+        )
+        seeded = seed_fleet(fleet, prefix=options["prefix"], with_requests=False)
+        try:
+            result = simulate(
+                seeded,
+                fleet,
+                arrivals_per_tick=options["arrivals_per_tick"],
+                completions_per_tick=options["completions_per_tick"],
+                failure_ratio=options["failure_ratio"],
+                seed=options["seed"],
+            )
+        finally:
+            if not options["keep"]:
+                seeded.delete()
+
+        self.stdout.write(
+            f"[{connection.vendor}] {result['boards']} boards, {result['requests']} requests, "
+            f"{result['assigned']} assigned over {result['ticks']} ticks, "
+            f"{result['assignments_per_s'] or 0:.0f} assignments/s, "
+            f"mean utilization {result['mean_utilization']:.0%}"
+        )
+        self.stdout.write(
+            f"  {'operation':<18} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'queries':>8}"
+        )
+        for name, op in result["operations"].items():
+            if not op["calls"]:
+                continue
+            self.stdout.write(
+                f"  {name:<18} {op['calls']:>6} {op['p50_ms']:>8.2f} {op['p95_ms']:>8.2f} "
+                f"{op['p99_ms']:>8.2f} {op['avg_queries']:>8.1f}"
+            )
+        if result["violations"]:
+            raise CommandError(f"Double dispatch detected on boards: {result['violations']}")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.dispatcher.services import dispatcher_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Fail RUNNING requests that exceeded their timeout, requeue those with lapsed leases, "
+        "and free their boards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the requests that would be reaped or requeued",
+        )
+
+    def handle(self, *args, **options):
+        reaped = dispatcher_service.reap_expired(dry_run=options["dry_run"])
+        requeued = dispatcher_service.expire_leases(dry_run=options["dry_run"])
+        reap, requeue = (
+            ("Would reap", "Would requeue") if options["dry_run"] else ("Reaped", "Requeued")
+        )
+        self.stdout.write(self.style.SUCCESS(f"{reap} {len(reaped)} timed out requests: {reaped}"))
+        self.stdout.write(
+            self.style.SUCCESS(f"{requeue} {len(requeued)} requests with lapsed leases: {requeued}")
+        )
@@ -0,0 +1,34 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.dispatcher.daemon import DispatcherDaemon
+
+
+class Command(BaseCommand):
+    help = "Run the dispatcher loop that owns scheduling, woken by API notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--coalesce", type=float, help="Seconds to keep collecting wakeups before a pass"
+        )
+        parser.add_argument("--idle", type=float, help="Seconds without wakeups before a full pass")
+        parser.add_argument(
+            "--max-loops", type=int, help="Exit after this many passes (for debugging)"
+        )
+
+    def handle(self, *args, **options):
+        daemon = DispatcherDaemon(
+            coalesce_seconds=options["coalesce"], idle_seconds=options["idle"]
+        )
+        signal.signal(signal.SIGTERM, daemon.stop)
+        signal.signal(signal.SIGINT, daemon.stop)
+        if daemon.listener.kind == "poll":
+            self.stderr.write(
+                self.style.WARNING(
+                    "No PostgreSQL or Redis channel layer; "
+                    "falling back to polling every idle interval."
+                )
+            )
+        daemon.run(max_loops=options["max_loops"])
+        self.stdout.write(self.style.SUCCESS(f"Dispatcher stopped after {daemon.loops} passes."))
@@ -0,0 +1,223 @@
+"""Indexed capability matching between idle boards and queued requests."""
+import heapq
+import itertools
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Exists, OuterRef
+
+from apps.boards.models import Board, Capability
+from apps.dispatcher.models import TestRequest
+from apps.dispatcher.queueing import QueuePolicy
+
+BoardCapability = Board.capabilities.through
+RequestCapability = TestRequest.capabilities.through
+
+
+class CapabilityCatalog:
+    """Active capabilities encoded as bit positions of an integer mask."""
+
+    def __init__(self, capabilities: Iterable[Tuple[object, str]]):
+        self.bit_by_id: Dict[object, int] = {}
+        self.bit_by_name: Dict[str, int] = {}
+        for position, (cap_id, name) in enumerate(capabilities):
+            self.bit_by_id[cap_id] = 1 << position
+            self.bit_by_name[name] = 1 << position
+        self._name_masks: Dict[str, Optional[int]] = {}
+
+    @classmethod
+    def load(cls) -> "CapabilityCatalog":
+        """Build the catalog from the active capabilities in one query."""
+        return cls(
+            Capability.objects.filter(is_active=True).order_by("name").values_list("id", "name")
+        )
+
+    def mask_for_ids(self, cap_ids: Iterable[object]) -> int:
+        """Mask of the given capability ids; inactive or unknown ids are ignored."""
+        mask = 0
+        for cap_id in cap_ids:
+            mask |= self.bit_by_id.get(cap_id, 0)
+        return mask
+
+    def mask_for_names(self, cap_str: str) -> Optional[int]:
+        """Mask of a comma-separated capability string, or None if any name is not active."""
+        if cap_str not in self._name_masks:
+            mask = 0
+            for name in cap_str.split(","):
+                if not name:
+                    continue
+                bit = self.bit_by_name.get(name)
+                if bit is None:
+                    mask = None
+                    break
+                mask |= bit
+            self._name_masks[cap_str] = mask
+        return self._name_masks[cap_str]
+
+    def board_masks(self, board_ids: Iterable[object]) -> Dict[object, int]:
+        """Capability masks for the given boards, read from the M2M table in one query."""
+        masks = {board_id: 0 for board_id in board_ids}
+        rows = BoardCapability.objects.filter(board_id__in=list(masks)).values_list(
+            "board_id", "capability_id"
+        )
+        for board_id, cap_id in rows:
+            masks[board_id] |= self.bit_by_id.get(cap_id, 0)
+        return masks
+
+    def request_masks(self, request_ids: Iterable[object]) -> Dict[object, Optional[int]]:
+        """Masks of requests that need capabilities, or None when one of them is not active.
+
+        ``request_ids`` may be a queryset, which keeps the lookup a single join. Requests
+        without capabilities are absent from the result; their mask is 0.
+        """
+        masks: Dict[object, Optional[int]] = {}
+        rows = RequestCapability.objects.filter(testrequest_id__in=request_ids).values_list(
+            "testrequest_id", "capability_id"
+        )
+        for request_id, cap_id in rows:
+            bit = self.bit_by_id.get(cap_id)
+            mask = masks.get(request_id, 0)
+            masks[request_id] = None if bit is None or mask is None else mask | bit
+        return masks
+
+
+def _active_board_capabilities(board):
+    active = BoardCapability.objects.filter(board_id=board, capability__is_active=True)
+    return active.values("capability_id")
+
+
+def servable_by(board_id) -> Exists:
+    """Filter for TestRequests whose required capabilities are all active on the board.
+
+    ``TestRequest.objects.filter(servable_by(board.pk))`` is one indexed anti-join.
+    """
+    missing = RequestCapability.objects.filter(testrequest_id=OuterRef("pk")).exclude(
+        capability_id__in=_active_board_capabilities(board_id)
+    )
+    return ~Exists(missing)
+
+
+def able_to_serve(request_id) -> Exists:
+    """Filter for Boards that have every capability the request needs, all of them active."""
+    missing = RequestCapability.objects.filter(testrequest_id=request_id).exclude(
+        capability_id__in=_active_board_capabilities(OuterRef(OuterRef("pk")))
+    )
+    return ~Exists(missing)
+
+
+class RequestIndex:
+    """Queued requests bucketed by (platform, capability mask, share, SDK).
+
+    Each bucket keeps its best request first.
+    """
+
+    def __init__(self, catalog: CapabilityCatalog, policy: Optional[QueuePolicy] = None):
+        self.catalog = catalog
+        self.policy = policy or QueuePolicy()
+        self._buckets: Dict[str, Dict[int, Dict[Tuple[Optional[str], str], list]]] = {}
+        self._compatible: Dict[Tuple[str, int], List[int]] = {}
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, req: TestRequest, mask: Optional[int]) -> bool:
+        """Index a request under its capability mask.
+
+        Returns False when the mask is None, meaning the request cannot be served.
+        """
+        if mask is None:
+            return False
+        buckets = self._buckets.setdefault(req.platform, {})
+        if mask not in buckets:
+            buckets[mask] = {}
+            if self._compatible:
+                self._compatible = {
+                    key: masks for key, masks in self._compatible.items() if key[0] != req.platform
+                }
+        key = (self.policy.share_of(req), self.policy.sdk_of(req.sdk_version))
+        bucket = buckets[mask].setdefault(key, [])
+        heapq.heappush(bucket, (self.policy.sort_key(req), next(self._seq), req))
+        self._size += 1
+        return True
+
+    def extend(self, entries: Iterable[Tuple[TestRequest, Optional[int]]]):
+        for req, mask in entries:
+            self.add(req, mask)
+
+    def _compatible_masks(self, platform: str, board_mask: int) -> List[int]:
+        key = (platform, board_mask)
+        if key not in self._compatible:
+            buckets = self._buckets.get(platform, {})
+            self._compatible[key] = [mask for mask in buckets if mask & ~board_mask == 0]
+        return self._compatible[key]
+
+    def classes(self, platform: str) -> List[Tuple[int, str]]:
+        """(capability mask, SDK) pairs that currently have queued requests on a platform."""
+        return sorted(
+            {
+                (mask, sdk)
+                for mask, shares in self._buckets.get(platform, {}).items()
+                for (_share, sdk), bucket in shares.items()
+                if bucket
+            }
+        )
+
+    def top(self, platform: str, mask: int, sdk: str, limit: int) -> List[TestRequest]:
+        """Best ``limit`` requests of one (mask, SDK) class in queue order, across shares.
+
+        The requests stay in the index.
+        """
+        shares = self._buckets.get(platform, {}).get(mask, {})
+        heads = itertools.chain(
+            *(bucket for (_share, bucket_sdk), bucket in shares.items() if bucket_sdk == sdk)
+        )
+        return [entry[2] for entry in heapq.nsmallest(limit, heads)]
+
+    def pop_best(
+        self, platform: str, board_mask: int, board_sdk: str = ""
+    ) -> Optional[TestRequest]:
+        """Remove and return the best queued request a board can serve.
+
+        The board is described by its platform, capability mask and SDK.
+        """
+        best = self._best_bucket(platform, board_mask, board_sdk)
+        if not best:
+            return None
+        share, bucket = best
+        self._size -= 1
+        self.policy.charge(share)
+        return heapq.heappop(bucket)[2]
+
+    def _best_bucket(
+        self, platform: str, board_mask: int, board_sdk: str
+    ) -> Optional[Tuple[Optional[str], list]]:
+        buckets = self._buckets.get(platform)
+        if not buckets:
+            return None
+        best = best_rank = unpinned_rank = None
+        unpinned_reflash = False
+        for mask in self._compatible_masks(platform, board_mask):
+            for (share, sdk), bucket in buckets[mask].items():
+                if not bucket:
+                    continue
+                share_rank = self.policy.share_rank(share)
+                rank = (
+                    share_rank,
+                    self.policy.placement_key(bucket[0][0], sdk, board_sdk),
+                    bucket[0][1],
+                )
+                if best is None or rank < best_rank:
+                    best, best_rank = (share, bucket), rank
+                # The pick affinity would not have made, to count the reflashes it saves.
+                raw_rank = (share_rank, bucket[0][0], bucket[0][1])
+                if unpinned_rank is None or raw_rank < unpinned_rank:
+                    unpinned_rank = raw_rank
+                    unpinned_reflash = self.policy.needs_reflash(sdk, board_sdk)
+        if (
+            best
+            and unpinned_reflash
+            and not self.policy.needs_reflash(best[1][0][2].sdk_version, board_sdk)
+        ):
+            self.policy.reflashes_avoided += 1
+        return best
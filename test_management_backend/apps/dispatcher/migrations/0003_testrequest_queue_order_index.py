@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0003_rename_boards_boar_name_5ff716_idx_boards_boar_name_110f36_idx_and_more"),
+        (
+            "dispatcher",
+            "0002_rename_dispatcher_status_7187c2_idx_dispatcher__status_a81783_idx_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testrequest",
+            index=models.Index(
+                fields=["status", "platform", "-priority", "created_at"],
+                name="dispatcher__status_50a5f3_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0003_rename_boards_boar_name_5ff716_idx_boards_boar_name_110f36_idx_and_more"),
+        ("dispatcher", "0003_testrequest_queue_order_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testrequest",
+            index=models.Index(
+                fields=["status", "started_at"], name="dispatcher__status_b44d04_idx"
+            ),
+        ),
+    ]
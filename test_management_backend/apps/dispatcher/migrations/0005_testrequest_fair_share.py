@@ -0,0 +1,43 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dispatcher", "0004_testrequest_running_started_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="submitted_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="test_requests",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="testrequest",
+            name="test_farm",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("HLOS", "HLOS (Linux/QNX)"),
+                    ("RTOS", "RTOS (Real-Time OS)"),
+                    ("BAREMETAL", "Bare-metal"),
+                    ("STAGING", "Staging"),
+                    ("INTEGRATION", "Integration"),
+                ],
+                help_text="Test farm billed for this request",
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0003_rename_boards_boar_name_5ff716_idx_boards_boar_name_110f36_idx_and_more"),
+        ("dispatcher", "0005_testrequest_fair_share"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="capabilities",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Capabilities a board must have to run this",
+                related_name="test_requests",
+                to="boards.capability",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="testrequest",
+            name="required_capabilities",
+            field=models.CharField(
+                blank=True,
+                help_text="Comma-separated capability names, mirrored from capabilities",
+                max_length=255,
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:45
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_capabilities(apps, schema_editor):
+    """Link every request to the capabilities named in its required_capabilities string.
+
+    Names with no Capability row are created inactive, so those requests stay unschedulable
+    exactly as they were when matching compared strings.
+    """
+    Capability = apps.get_model("boards", "Capability")
+    TestRequest = apps.get_model("dispatcher", "TestRequest")
+    Through = TestRequest.capabilities.through
+
+    rows = TestRequest.objects.exclude(required_capabilities="").values_list(
+        "pk", "required_capabilities"
+    )
+    names = {name for _pk, cap_str in rows.iterator() for name in cap_str.split(",") if name}
+    known = set(Capability.objects.filter(name__in=names).values_list("name", flat=True))
+    Capability.objects.bulk_create(
+        [Capability(name=name, is_active=False) for name in sorted(names - known)],
+        ignore_conflicts=True,
+    )
+    cap_ids = dict(Capability.objects.filter(name__in=names).values_list("name", "pk"))
+
+    links = []
+    for pk, cap_str in rows.iterator(chunk_size=BATCH_SIZE):
+        links.extend(
+            Through(testrequest_id=pk, capability_id=cap_ids[name])
+            for name in cap_str.split(",")
+            if name
+        )
+        if len(links) >= BATCH_SIZE:
+            Through.objects.bulk_create(links, ignore_conflicts=True)
+            links = []
+    Through.objects.bulk_create(links, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dispatcher", "0006_testrequest_capabilities"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_capabilities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dispatcher", "0007_backfill_testrequest_capabilities"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="sdk_version",
+            field=models.CharField(
+                blank=True,
+                help_text="SDK the board must run; boards already on it are preferred",
+                max_length=100,
+            ),
+        ),
+    ]
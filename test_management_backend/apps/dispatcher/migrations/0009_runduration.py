@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dispatcher", "0008_testrequest_sdk_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RunDuration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("platform", models.CharField(max_length=50)),
+                ("required_capabilities", models.CharField(blank=True, max_length=255)),
+                ("runs", models.PositiveIntegerField(default=0)),
+                ("total_seconds", models.FloatField(default=0)),
+                (
+                    "recent_seconds",
+                    models.FloatField(
+                        default=0, help_text="Exponentially weighted mean favouring recent runs"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("platform", "required_capabilities"), name="unique_run_duration_key"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dispatcher", "0009_runduration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="client_key",
+            field=models.CharField(
+                blank=True,
+                help_text=(
+                    "Client-chosen idempotency key; resubmitting it returns the existing request"
+                ),
+                max_length=128,
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
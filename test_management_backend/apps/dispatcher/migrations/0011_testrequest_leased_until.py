@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-16 22:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0004_testpc_max_concurrent_runs"),
+        ("dispatcher", "0010_testrequest_client_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="leased_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the TestPC agent's claim lapses unless renewed; empty until leased",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testrequest",
+            index=models.Index(
+                fields=["status", "executed_on_pc", "leased_until"],
+                name="dispatcher__status_60aa0b_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testrequest",
+            index=models.Index(
+                fields=["status", "leased_until"], name="dispatcher__status_fe08cc_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dispatcher", "0011_testrequest_leased_until"),
+        ("test_cases", "0002_rename_tag_label"),
+        ("test_execution", "0004_testrun_work_order_testcaseduration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="test_case",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="test_requests",
+                to="test_cases.testcase",
+            ),
+        ),
+        migrations.AddField(
+            model_name="testrequest",
+            name="test_run",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="test_requests",
+                to="test_execution.testrun",
+            ),
+        ),
+    ]
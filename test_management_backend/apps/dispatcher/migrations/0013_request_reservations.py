@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0006_board_last_released_at"),
+        ("dispatcher", "0012_testrequest_test_run_test_case"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrequest",
+            name="reserved_for_board",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="reserved_requests",
+                to="boards.board",
+            ),
+        ),
+        migrations.AddField(
+            model_name="testrequest",
+            name="reserved_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Until when only reserved_for_board may take this request",
+                null=True,
+            ),
+        ),
+    ]
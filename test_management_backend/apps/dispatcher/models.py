@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.db import models
 
-from apps.boards.models import Board, TestPC
+from apps.boards.models import Board, Capability, TestPC
 
 
 class TestRequest(models.Model):
@@ -16,13 +17,69 @@ class TestRequest(models.Model):
     # identification / targeting
     platform = models.CharField(max_length=50, help_text="Target platform (matches Board.platform)")
 
+    client_key = models.CharField(
+        max_length=128,
+        null=True,
+        blank=True,
+        unique=True,
+        help_text="Client-chosen idempotency key; resubmitting it returns the existing request",
+    )
+
+    # origin, when dispatched from a test run
+    test_run = models.ForeignKey(
+        "test_execution.TestRun",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="test_requests",
+    )
+    test_case = models.ForeignKey(
+        "test_cases.TestCase",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="test_requests",
+    )
+
+    # fair-share accounting
+    submitted_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="test_requests",
+    )
+    test_farm = models.CharField(
+        max_length=50,
+        choices=Board.TEST_FARM_CHOICES,
+        blank=True,
+        help_text="Test farm billed for this request",
+    )
+
     # execution targets
     executed_on_board = models.ForeignKey(Board, on_delete=models.SET_NULL, null=True, blank=True)
     executed_on_pc = models.ForeignKey(TestPC, on_delete=models.SET_NULL, null=True, blank=True)
 
     # priority and requirements
     priority = models.IntegerField(default=0, help_text="Higher values are scheduled first")
-    required_capabilities = models.CharField(max_length=255, blank=True, help_text="Comma-separated capability names")
+    required_capabilities = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Comma-separated capability names, mirrored from capabilities",
+    )
+    capabilities = models.ManyToManyField(
+        Capability,
+        blank=True,
+        related_name="test_requests",
+        help_text="Capabilities a board must have to run this",
+    )
+
+    # placement preferences
+    sdk_version = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="SDK the board must run; boards already on it are preferred",
+    )
 
     # lifecycle status
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="QUEUED")
@@ -32,6 +89,19 @@ class TestRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    leased_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the TestPC agent's claim lapses unless renewed; empty until leased",
+    )
+
+    # pipelining: the next request held for a busy board about to finish
+    reserved_for_board = models.ForeignKey(
+        Board, on_delete=models.SET_NULL, null=True, blank=True, related_name="reserved_requests"
+    )
+    reserved_until = models.DateTimeField(
+        null=True, blank=True, help_text="Until when only reserved_for_board may take this request"
+    )
 
     class Meta:
         ordering = ("-priority", "created_at")
@@ -40,7 +110,41 @@ class TestRequest(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["platform"]),
             models.Index(fields=["priority"]),
+            models.Index(fields=["status", "platform", "-priority", "created_at"]),
+            models.Index(fields=["status", "started_at"]),
+            models.Index(fields=["status", "executed_on_pc", "leased_until"]),
+            models.Index(fields=["status", "leased_until"]),
         ]
 
     def __str__(self):
         return f"Request {self.id} - {self.platform} - {self.status}"
+
+
+class RunDuration(models.Model):
+    """How long requests with one (platform, capability set) keep a board, updated on completion."""
+
+    platform = models.CharField(max_length=50)
+    required_capabilities = models.CharField(max_length=255, blank=True)
+    runs = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    recent_seconds = models.FloatField(
+        default=0, help_text="Exponentially weighted mean favouring recent runs"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "required_capabilities"], name="unique_run_duration_key"
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.platform} [{self.required_capabilities}] "
+            f"~{self.recent_seconds:.0f}s over {self.runs} runs"
+        )
+
+    @property
+    def mean_seconds(self):
+        return self.total_seconds / self.runs if self.runs else 0.0
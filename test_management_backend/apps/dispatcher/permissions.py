@@ -0,0 +1,22 @@
+"""Checks that a caller may act for the TestPC named in an agent request."""
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions
+
+# Agents prove which TestPC they run on with that PC's auth_token in this header.
+TEST_PC_TOKEN_HEADER = "HTTP_X_TESTPC_TOKEN"
+
+
+def acts_for_test_pc(request, test_pc) -> bool:
+    """True for admins, and for callers sending the PC's non-empty auth_token."""
+    if getattr(request.user, "is_admin", False):
+        return True
+    token = request.META.get(TEST_PC_TOKEN_HEADER, "")
+    return bool(test_pc.auth_token) and constant_time_compare(token, test_pc.auth_token)
+
+
+def check_test_pc_access(request, test_pc):
+    """Raise PermissionDenied unless the caller may lease or read this TestPC's work."""
+    if not acts_for_test_pc(request, test_pc):
+        raise exceptions.PermissionDenied(
+            "Send this TestPC's auth token in the X-TestPC-Token header."
+        )
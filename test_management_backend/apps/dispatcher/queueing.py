@@ -0,0 +1,168 @@
+"""Queue ordering policies: strict priority, priority aging and weighted fair share."""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.core.utils import percentile
+from apps.dispatcher.models import TestRequest
+
+QUEUE_POLICIES = ("priority", "fair_share")
+UNASSIGNED_SHARE = "unassigned"
+WAIT_PERCENTILES = (50, 90, 99)
+
+
+def parse_share_weights(raw: str) -> Dict[str, float]:
+    """Parse ``"HLOS:3,RTOS:1"`` into a weight per share; shares not listed weigh 1."""
+    weights = {}
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        share, _sep, weight = item.partition(":")
+        try:
+            weights[share.strip()] = float(weight)
+        except ValueError as exc:
+            raise ImproperlyConfigured(f"Invalid fair share weight {item!r}") from exc
+    return weights
+
+
+class QueuePolicy:
+    """Decides which queued request a free board should take next.
+
+    With aging, a request gains one priority level per ``aging_seconds`` it waits. All requests
+    age at the same rate, so ordering by ``priority + (now - created_at) / aging_seconds`` gives
+    the same order at every instant as the fixed key ``created_at / aging_seconds - priority``;
+    heaps keyed on it stay valid while requests wait and are never re-sorted.
+
+    With fair share, requests are grouped by submitter or test farm and the share with the
+    fewest running requests per unit of weight goes first; priority order applies within a share
+    and between equally served shares. Usage is counted per platform partition, as each pass
+    only sees one platform.
+
+    With a reflash penalty, a request pinned to an SDK other than the board's ranks as if its
+    priority were ``reflash_penalty`` levels lower, so boards keep their flashed SDK unless the
+    wait would cost more than the reflash.
+    """
+
+    SHARE_FIELDS = {"submitter": "submitted_by_id", "test_farm": "test_farm"}
+
+    def __init__(
+        self,
+        mode: str = "priority",
+        aging_seconds: int = 0,
+        share_key: str = "submitter",
+        share_weights: Optional[Dict[str, float]] = None,
+        reflash_penalty: int = 0,
+        now: Optional[datetime] = None,
+    ):
+        if mode not in QUEUE_POLICIES:
+            raise ImproperlyConfigured(f"Unknown dispatcher queue policy {mode!r}")
+        if share_key not in self.SHARE_FIELDS:
+            raise ImproperlyConfigured(f"Unknown dispatcher fair share key {share_key!r}")
+        self.mode = mode
+        self.aging_seconds = aging_seconds
+        self.share_field = self.SHARE_FIELDS[share_key] if mode == "fair_share" else None
+        self.share_weights = share_weights or {}
+        self.reflash_penalty = reflash_penalty
+        self.reflashes_avoided = 0
+        self.now = now or timezone.now()
+        self.usage: Dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def from_settings(cls) -> "QueuePolicy":
+        return cls(
+            mode=settings.DISPATCHER_QUEUE_POLICY,
+            aging_seconds=settings.DISPATCHER_AGING_SECONDS,
+            share_key=settings.DISPATCHER_FAIR_SHARE_KEY,
+            share_weights=parse_share_weights(settings.DISPATCHER_FAIR_SHARE_WEIGHTS),
+            reflash_penalty=settings.DISPATCHER_REFLASH_PENALTY,
+        )
+
+    @property
+    def is_strict_priority(self) -> bool:
+        """True when every board sees the plain (-priority, created_at) order.
+
+        That is the order the queue index already keeps.
+        """
+        return not self.aging_seconds and not self.share_field and not self.reflash_penalty
+
+    def order_key(self, priority: int, created_at: datetime):
+        if self.aging_seconds:
+            return (created_at.timestamp() / self.aging_seconds - priority, created_at)
+        return (-priority, created_at)
+
+    def sort_key(self, req: TestRequest):
+        return self.order_key(req.priority, req.created_at)
+
+    def effective_priority(self, req: TestRequest) -> int:
+        """Priority including the levels gained by waiting until the start of this pass."""
+        if not self.aging_seconds:
+            return req.priority
+        return req.priority + int((self.now - req.created_at).total_seconds() // self.aging_seconds)
+
+    def sdk_of(self, sdk_version: str) -> str:
+        """SDK dimension for bucketing; collapsed when affinity is off so it adds no buckets."""
+        return sdk_version if self.reflash_penalty else ""
+
+    @staticmethod
+    def needs_reflash(request_sdk: str, board_sdk: str) -> bool:
+        return bool(request_sdk) and request_sdk != board_sdk
+
+    def placement_key(self, key: tuple, request_sdk: str, board_sdk: str) -> tuple:
+        """Order key of a request as seen by one board, demoted when it would force a reflash."""
+        if self.reflash_penalty and self.needs_reflash(request_sdk, board_sdk):
+            return (key[0] + self.reflash_penalty, *key[1:])
+        return key
+
+    def share_of(self, req: TestRequest) -> Optional[str]:
+        if not self.share_field:
+            return None
+        return self.share_label(getattr(req, self.share_field))
+
+    @staticmethod
+    def share_label(value) -> str:
+        return str(value) if value else UNASSIGNED_SHARE
+
+    def share_rank(self, share: Optional[str]) -> float:
+        """Running requests per unit of weight; lower is served first."""
+        if share is None:
+            return 0.0
+        return self.usage[share] / self.share_weights.get(share, 1.0)
+
+    def charge(self, share: Optional[str]):
+        if share is not None:
+            self.usage[share] += 1
+
+    def load_usage(self, platform: str):
+        """Count the platform's RUNNING requests per share in one grouped query."""
+        if not self.share_field:
+            return
+        rows = (
+            TestRequest.objects.filter(status="RUNNING", platform=platform)
+            .order_by()
+            .values(self.share_field)
+            .annotate(running=Count("pk"))
+        )
+        for row in rows:
+            self.usage[self.share_label(row[self.share_field])] = row["running"]
+
+    def wait_percentiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Wait-time percentiles in seconds of every queued request, per share.
+
+        Without a share field every request falls under "all".
+        """
+        waits: Dict[str, list] = defaultdict(list)
+        rows = TestRequest.objects.filter(status="QUEUED").order_by().values_list(
+            self.share_field or "platform", "created_at"
+        )
+        for share, created_at in rows:
+            label = self.share_label(share) if self.share_field else "all"
+            waits[label].append((self.now - created_at).total_seconds())
+        return {
+            share: {f"p{pct}": percentile(values, pct) for pct in WAIT_PERCENTILES}
+            for share, values in sorted(waits.items())
+        }
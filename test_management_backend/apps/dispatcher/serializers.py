@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from apps.boards.models import Board, TestPC
 from apps.dispatcher.models import TestRequest
 
 
@@ -8,6 +10,15 @@ class DispatchRequestSerializer(serializers.Serializer):
     required_capabilities = serializers.ListField(child=serializers.CharField(), allow_empty=True)
     priority = serializers.IntegerField(required=False, default=0)
     timeout = serializers.IntegerField(required=False, default=600)
+    test_farm = serializers.ChoiceField(
+        choices=Board.TEST_FARM_CHOICES, required=False, allow_blank=True, default=""
+    )
+    sdk_version = serializers.CharField(
+        required=False, allow_blank=True, default="", max_length=100
+    )
+    client_key = serializers.CharField(
+        required=False, allow_null=True, default=None, max_length=128
+    )
 
     def validate(self, attrs):
         caps = {cap.strip() for cap in attrs.get("required_capabilities", []) if cap.strip()}
@@ -28,11 +39,20 @@ class TestRequestSerializer(serializers.ModelSerializer):
             "capability_list",
             "status",
             "timeout",
+            "submitted_by",
+            "test_farm",
+            "sdk_version",
+            "client_key",
+            "test_run",
+            "test_case",
             "executed_on_board",
             "executed_on_pc",
             "created_at",
             "started_at",
             "completed_at",
+            "leased_until",
+            "reserved_for_board",
+            "reserved_until",
         ]
         read_only_fields = fields
 
@@ -45,3 +65,25 @@ class TestRequestSerializer(serializers.ModelSerializer):
 class CompleteRequestSerializer(serializers.Serializer):
     request_id = serializers.IntegerField()
     success = serializers.BooleanField(required=False, default=True)
+
+
+class CompleteBatchSerializer(serializers.Serializer):
+    results = CompleteRequestSerializer(many=True, allow_empty=False)
+
+
+class LeaseRequestSerializer(serializers.Serializer):
+    test_pc = serializers.PrimaryKeyRelatedField(queryset=TestPC.objects.all())
+    wait = serializers.FloatField(required=False, default=0, min_value=0)
+    limit = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+
+    def validate_wait(self, value):
+        return min(value, settings.DISPATCHER_LEASE_MAX_WAIT)
+
+
+class ReservedWorkSerializer(serializers.Serializer):
+    test_pc = serializers.PrimaryKeyRelatedField(queryset=TestPC.objects.all())
+
+
+class LeaseRenewSerializer(serializers.Serializer):
+    test_pc = serializers.PrimaryKeyRelatedField(queryset=TestPC.objects.all())
+    request_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
@@ -1,119 +1,904 @@
 import logging
-import threading
-from typing import Iterable, List, Set
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction
+from django.db.models import Case, F, Min, QuerySet, UUIDField, Value, When
 from django.utils import timezone
 
-from apps.boards.models import Board
+from apps.boards import health
+from apps.boards.models import Board, BoardLog, Capability
+from apps.core.utils import chunked
+from apps.dispatcher import counters, leases, wakeup
+from apps.dispatcher.assignment import ASSIGNMENT_MODES
+from apps.dispatcher.estimates import DurationModel, estimate, record_durations
+from apps.dispatcher.hosts import HostCapacity
+from apps.dispatcher.locks import client_key_lock, platform_lock, sqlite_write_lock
+from apps.dispatcher.matching import CapabilityCatalog, RequestIndex, able_to_serve, servable_by
 from apps.dispatcher.models import TestRequest
+from apps.dispatcher.queueing import QueuePolicy
+from apps.dispatcher.signals import FinishedRequest, requests_finished
 
 logger = logging.getLogger(__name__)
 
-
-def _cap_set_from_str(cap_str: str) -> Set[str]:
-    if not cap_str:
-        return set()
-    return {cap for cap in cap_str.split(",") if cap}
+DISPATCH_BATCH_SIZE = 500
+PASS_REPORT_CACHE_KEY = "dispatcher:pass:{platform}"
+WAIT_PERCENTILES_CACHE_KEY = "dispatcher:wait_percentiles"
+WAIT_PERCENTILES_TTL = 15
+DAEMON_STATS_CACHE_KEY = "dispatcher:daemon"
 
 
 def _cap_str_from_iterable(caps: Iterable[str]) -> str:
     return ",".join(sorted({cap.strip() for cap in caps if cap.strip()}))
 
 
+def _capability_ids(names: Iterable[str]) -> Dict[str, object]:
+    """Capability ids by name.
+
+    Unknown names are created inactive so their requests wait for them.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    known = dict(Capability.objects.filter(name__in=names).values_list("name", "pk"))
+    missing = names - set(known)
+    if missing:
+        Capability.objects.bulk_create(
+            [Capability(name=name, is_active=False) for name in sorted(missing)],
+            ignore_conflicts=True,
+        )
+        known = dict(Capability.objects.filter(name__in=names).values_list("name", "pk"))
+    return known
+
+
+class DispatchConflict(Exception):
+    """Planned boards or requests were claimed outside the platform lock."""
+
+
+@dataclass
+class PassReport:
+    """Volume and timing of one scheduling pass over a platform."""
+
+    platform: str
+    trigger: str
+    assignment_mode: str = "greedy"
+    idle_boards: int = 0
+    queued_requests: int = 0
+    assigned: int = 0
+    reflashes: int = 0
+    reflashes_avoided: int = 0
+    held_back_boards: int = 0
+    plan_ms: float = 0.0
+    persist_ms: float = 0.0
+    finished_at: datetime = field(default_factory=timezone.now)
+
+    @property
+    def total_ms(self) -> float:
+        return self.plan_ms + self.persist_ms
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "finished_at": self.finished_at.isoformat(),
+            "total_ms": self.total_ms,
+        }
+
+
+Plan = List[Tuple[Board, TestRequest]]
+
+
+@dataclass
+class EnqueueResult:
+    """Outcome of queue_requests: new rows, plus the ids of resubmitted client keys."""
+
+    created: List[TestRequest] = field(default_factory=list)
+    # One id per submitted request, in submission order, whether new or a duplicate.
+    request_ids: List[int] = field(default_factory=list)
+    duplicates: Dict[str, int] = field(default_factory=dict)
+
+
 class DispatcherService:
     """Scheduler that assigns queued TestRequests to available boards."""
 
-    def __init__(self):
-        self.lock = threading.Lock()
+    def __init__(self, assignment_mode: Optional[str] = None):
+        self.assignment_mode = assignment_mode or settings.DISPATCHER_ASSIGNMENT_MODE
+        if self.assignment_mode not in ASSIGNMENT_MODES:
+            raise ImproperlyConfigured(
+                f"Unknown dispatcher assignment mode {self.assignment_mode!r}"
+            )
 
-    def queue_requests(self, requests: List[dict]) -> List[TestRequest]:
-        """Persist incoming requests and trigger scheduling."""
-        to_create: List[TestRequest] = []
-        for req in requests:
-            to_create.append(
-                TestRequest(
+    def queue_requests(self, requests: List[dict], submitted_by=None) -> EnqueueResult:
+        """Persist incoming requests and trigger scheduling.
+
+        Requests carrying a ``client_key`` that already exists, in the database or earlier in
+        the same batch, are not created again; their existing id is reported instead. Each
+        chunk of DISPATCHER_ENQUEUE_CHUNK_SIZE requests commits on its own, so a failed batch
+        can be resubmitted with the same keys to finish it; that needs a caller outside any
+        transaction, which is why the enqueue view opts out of ATOMIC_REQUESTS. Submissions
+        racing on a key are serialized: one creates the row and the others report it as a
+        duplicate.
+        """
+        if submitted_by is not None and not submitted_by.is_authenticated:
+            submitted_by = None
+        result = EnqueueResult()
+        for chunk in chunked(list(requests), settings.DISPATCHER_ENQUEUE_CHUNK_SIZE):
+            self._queue_chunk(chunk, submitted_by, result)
+        if result.duplicates:
+            logger.info("Skipped %s requests with existing client keys", len(result.duplicates))
+        logger.info("Queued %s requests", len(result.created))
+        if result.created:
+            self.wake(platforms={req.platform for req in result.created})
+        return result
+
+    def _queue_chunk(self, requests: List[dict], submitted_by, result: EnqueueResult):
+        keys = {req["client_key"] for req in requests if req.get("client_key")}
+        with transaction.atomic():
+            client_key_lock(keys)
+            existing = dict(
+                TestRequest.objects.filter(client_key__in=keys).values_list("client_key", "pk")
+            )
+            to_create: Dict[Optional[str], TestRequest] = {}
+            unkeyed: List[TestRequest] = []
+            for req in requests:
+                key = req.get("client_key") or None
+                if key in existing or key in to_create:
+                    continue
+                test_request = TestRequest(
                     platform=req["platform"],
                     priority=req.get("priority", 0),
                     timeout=req.get("timeout", 600),
                     required_capabilities=_cap_str_from_iterable(req.get("required_capabilities", [])),
+                    submitted_by=submitted_by,
+                    test_farm=req.get("test_farm", ""),
+                    sdk_version=req.get("sdk_version", ""),
+                    client_key=key,
+                    test_run_id=req.get("test_run_id"),
+                    test_case_id=req.get("test_case_id"),
                 )
+                if key is None:
+                    unkeyed.append(test_request)
+                else:
+                    to_create[key] = test_request
+
+            # The key lock makes ``existing`` complete, so every row inserted here is new.
+            created = TestRequest.objects.bulk_create(
+                [*unkeyed, *to_create.values()], batch_size=DISPATCH_BATCH_SIZE
             )
-        created = TestRequest.objects.bulk_create(to_create)
-        logger.info("Queued %s requests", len(created))
-        self.schedule()
-        return created
-
-    def schedule(self):
-        """Assign queued requests to idle boards."""
-        with self.lock:
-            with transaction.atomic():
-                idle_boards = list(
-                    Board.objects.select_for_update(skip_locked=True)
-                    .filter(status="IDLE", is_locked=False)
-                    .prefetch_related("capabilities")
-                )
-                queued_requests = list(
-                    TestRequest.objects.select_for_update(skip_locked=True)
-                    .filter(status="QUEUED")
-                    .order_by("-priority", "created_at")
+
+            cap_ids = _capability_ids(
+                name for req in created for name in req.required_capabilities.split(",") if name
+            )
+            TestRequest.capabilities.through.objects.bulk_create(
+                [
+                    TestRequest.capabilities.through(
+                        testrequest_id=req.pk, capability_id=cap_ids[name]
+                    )
+                    for req in created
+                    for name in req.required_capabilities.split(",")
+                    if name
+                ],
+                batch_size=DISPATCH_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            counters.adjust(queued_requests=len(created))
+
+        ids_by_key = {**existing, **{key: req.pk for key, req in to_create.items()}}
+        unkeyed_ids = iter(req.pk for req in unkeyed)
+        seen = set(existing)
+        for req in requests:
+            key = req.get("client_key") or None
+            if key is None:
+                result.request_ids.append(next(unkeyed_ids))
+                continue
+            result.request_ids.append(ids_by_key[key])
+            if key in seen:
+                result.duplicates[key] = ids_by_key[key]
+            seen.add(key)
+        result.created.extend(created)
+
+    def wake(self, full: bool = False, platforms: Iterable[str] = (), board_ids: Iterable = ()):
+        """Schedule now, or notify the run_dispatcher daemon when it owns scheduling."""
+        if not settings.DISPATCHER_INLINE_SCHEDULING:
+            wakeup.notify(full=full, platforms=platforms, board_ids=board_ids)
+        elif full:
+            self.schedule()
+        else:
+            if platforms:
+                self.schedule(platforms=platforms)
+            if board_ids:
+                self.schedule_boards(board_ids)
+
+    def schedule(self, platforms: Optional[Iterable[str]] = None):
+        """Assign queued requests to idle boards, one platform partition at a time.
+
+        Called without ``platforms`` this is the full reconciliation pass. Afterwards, busy boards
+        about to finish get their next request reserved when DISPATCHER_RESERVE_AHEAD_SECONDS is
+        set.
+        """
+        requested = None if platforms is None else set(platforms)
+        trigger = "full" if platforms is None else "arrival"
+        if platforms is None:
+            platforms = (
+                Board.objects.filter(
+                    status="IDLE",
+                    is_locked=False,
+                    health_score__gte=settings.DISPATCHER_QUARANTINE_SCORE,
                 )
+                .order_by()
+                .values_list("platform", flat=True)
+                .distinct()
+            )
+        catalog = CapabilityCatalog.load()
+        for platform in sorted(set(platforms)):
+            self._run_pass(
+                platform, trigger, lambda report: self._plan_platform(platform, catalog, report)
+            )
+        self.reserve_next(platforms=requested)
+
+    def _plan_platform(self, platform: str, catalog: CapabilityCatalog, report: PassReport) -> Plan:
+        idle_boards = list(
+            Board.objects.select_for_update(skip_locked=True).filter(
+                platform=platform,
+                status="IDLE",
+                is_locked=False,
+                health_score__gte=settings.DISPATCHER_QUARANTINE_SCORE,
+            )
+        )
+        report.idle_boards = len(idle_boards)
+        if not idle_boards:
+            return []
+        now = timezone.now()
+        hosts = HostCapacity.for_boards(idle_boards)
+        reserved_plan = self._take_reservations(idle_boards, now, hosts)
+        if reserved_plan:
+            taken = {board.pk for board, _req in reserved_plan}
+            idle_boards = [board for board in idle_boards if board.pk not in taken]
+        # Requests reserved for busy boards wait for them until the reservation lapses.
+        queued = TestRequest.objects.filter(status="QUEUED", platform=platform).exclude(
+            reserved_until__gt=now
+        )
+        queued_requests = queued.select_for_update(skip_locked=True).order_by(
+            "-priority", "created_at", "pk"
+        )
+
+        policy = QueuePolicy.from_settings()
+        policy.load_usage(platform)
+        board_masks = catalog.board_masks(board.pk for board in idle_boards)
+        request_masks = catalog.request_masks(queued.values("pk"))
+        index = RequestIndex(catalog, policy)
+        index.extend((req, request_masks.get(req.pk, 0)) for req in queued_requests)
+        report.queued_requests = len(index)
+
+        plan = reserved_plan + ASSIGNMENT_MODES[self.assignment_mode](
+            platform, hosts.rank(idle_boards), board_masks, index, hosts
+        )
+        report.reflashes_avoided = policy.reflashes_avoided
+        report.held_back_boards = hosts.held_back
+        return plan
+
+    def schedule_boards(self, board_ids: Iterable):
+        """Find the best queued request for each freed board without loading the whole queue."""
+        board_ids = list(board_ids)
+        platforms = (
+            Board.objects.filter(pk__in=board_ids)
+            .order_by()
+            .values_list("platform", flat=True)
+            .distinct()
+        )
+        for platform in sorted(set(platforms)):
+            self._run_pass(
+                platform,
+                "boards",
+                lambda report: self._plan_freed_boards(platform, board_ids, report),
+            )
+
+    def _plan_freed_boards(self, platform: str, board_ids: List, report: PassReport) -> Plan:
+        boards = list(
+            Board.objects.select_for_update(skip_locked=True).filter(
+                pk__in=board_ids,
+                platform=platform,
+                status="IDLE",
+                is_locked=False,
+                health_score__gte=settings.DISPATCHER_QUARANTINE_SCORE,
+            )
+        )
+        report.idle_boards = len(boards)
+        if not boards:
+            return []
+
+        policy = QueuePolicy.from_settings()
+        policy.load_usage(platform)
+        hosts = HostCapacity.for_boards(boards)
+        now = timezone.now()
+
+        plan: Plan = self._take_reservations(boards, now, hosts)
+        reserved_boards = {board.pk for board, _req in plan}
+        for board in hosts.rank(boards):
+            if board.pk in reserved_boards or not hosts.admits(board):
+                continue
+            candidates = (
+                TestRequest.objects.filter(status="QUEUED", platform=platform)
+                .filter(servable_by(board.pk))
+                .exclude(reserved_until__gt=now)
+                .exclude(pk__in=[req.pk for _board, req in plan])
+            )
+            match = self._next_queued(candidates, policy, board.sdk_version)
+            if match:
+                policy.charge(policy.share_of(match))
+                hosts.charge(board)
+                plan.append((board, match))
+        report.reflashes_avoided = policy.reflashes_avoided
+        report.held_back_boards = hosts.held_back
+        return plan
 
-                for board in idle_boards:
-                    board_caps = set(board.capabilities.filter(is_active=True).values_list("name", flat=True))
-                    match = self._find_best_request(board, board_caps, queued_requests)
-                    if match:
-                        queued_requests.remove(match)
-                        self._dispatch(board, match)
-
-    def _find_best_request(
-        self, board: Board, board_caps: Set[str], queued_requests: List[TestRequest]
-    ) -> TestRequest | None:
-        for req in queued_requests:
-            if req.platform != board.platform:
+    def _take_reservations(self, boards: List[Board], now: datetime, hosts: HostCapacity) -> Plan:
+        """Pair idle boards with the requests reserved for them, while the reservations hold.
+
+        A reservation whose board sits on a TestPC with no free slot stays queued for later.
+        """
+        by_board = {board.pk: board for board in boards}
+        reserved = (
+            TestRequest.objects.select_for_update(skip_locked=True)
+            .filter(status="QUEUED", reserved_for_board__in=list(by_board), reserved_until__gt=now)
+            .order_by("-priority", "created_at", "pk")
+        )
+        plan: Plan = []
+        for req in reserved:
+            board = by_board.get(req.reserved_for_board_id)
+            if board is None or not hosts.admits(board):
                 continue
-            required = _cap_set_from_str(req.required_capabilities)
-            if required.issubset(board_caps):
-                return req
-        return None
+            del by_board[board.pk]
+            hosts.charge(board)
+            plan.append((board, req))
+        return plan
+
+    def reserve_next(self, platforms: Optional[Iterable[str]] = None) -> int:
+        """Reserve the next queued request for busy boards expected to finish soon.
+
+        A board whose current run should end within DISPATCHER_RESERVE_AHEAD_SECONDS gets the
+        request it would be given on finishing, so its TestPC agent can stage that run ahead of
+        time and the board takes it the moment it is freed. The reservation lapses the same
+        number of seconds after the expected finish, so an overrunning board does not hold work.
+        Returns how many requests were reserved.
+        """
+        window = settings.DISPATCHER_RESERVE_AHEAD_SECONDS
+        if window <= 0:
+            return 0
+        if platforms is None:
+            platforms = (
+                Board.objects.filter(status="BUSY")
+                .order_by()
+                .values_list("platform", flat=True)
+                .distinct()
+            )
+        return sum(self._reserve_platform(platform, window) for platform in sorted(set(platforms)))
+
+    def _reserve_platform(self, platform: str, window: int) -> int:
+        now = timezone.now()
+        with transaction.atomic(), platform_lock(platform):
+            holding = set(
+                TestRequest.objects.filter(
+                    status="QUEUED", platform=platform, reserved_until__gt=now
+                ).values_list("reserved_for_board_id", flat=True)
+            )
+            durations = DurationModel.for_platform(platform)
+            horizon = now + timedelta(seconds=window)
+            due = []
+            running = TestRequest.objects.filter(
+                status="RUNNING",
+                platform=platform,
+                started_at__isnull=False,
+                executed_on_board__status="BUSY",
+                executed_on_board__health_score__gte=settings.DISPATCHER_QUARANTINE_SCORE,
+            ).select_related("executed_on_board")
+            for req in running:
+                finish = req.started_at + timedelta(seconds=durations.expected(req))
+                if finish <= horizon and req.executed_on_board_id not in holding:
+                    due.append((finish, req.executed_on_board))
+
+            policy = QueuePolicy.from_settings()
+            policy.load_usage(platform)
+            reservations = []
+            for finish, board in sorted(due, key=lambda item: item[0]):
+                candidates = (
+                    TestRequest.objects.filter(status="QUEUED", platform=platform)
+                    .filter(servable_by(board.pk))
+                    .exclude(reserved_until__gt=now)
+                    .exclude(pk__in=[req.pk for _board, req, _until in reservations])
+                )
+                match = self._next_queued(candidates, policy, board.sdk_version)
+                if match:
+                    policy.charge(policy.share_of(match))
+                    reservations.append(
+                        (board, match, max(finish, now) + timedelta(seconds=window))
+                    )
+            for board, req, until in reservations:
+                TestRequest.objects.filter(pk=req.pk, status="QUEUED").update(
+                    reserved_for_board=board, reserved_until=until
+                )
+            if reservations:
+                transaction.on_commit(
+                    lambda: counters.record_idle_gaps(reservations=len(reservations))
+                )
 
-    def _dispatch(self, board: Board, req: TestRequest):
-        """Mark board busy and request running."""
+        if reservations:
+            logger.info(
+                "Reserved %s requests for %s boards about to finish", len(reservations), platform
+            )
+        return len(reservations)
+
+    def reserved_for(self, test_pc_id) -> List[TestRequest]:
+        """Requests reserved for boards of one TestPC, for its agent to stage ahead of time."""
+        return list(
+            TestRequest.objects.filter(
+                status="QUEUED",
+                reserved_for_board__test_pc_id=test_pc_id,
+                reserved_until__gt=timezone.now(),
+            )
+            .select_related("reserved_for_board")
+            .order_by("reserved_until")
+        )
+
+    def _next_queued(
+        self, candidates: QuerySet, policy: QueuePolicy, board_sdk: str
+    ) -> Optional[TestRequest]:
+        """Lock and return the best of ``candidates`` for a board under the queue policy.
+
+        Strict priority is the index order, so one ordered row is enough. Otherwise the best
+        request is the oldest of some (priority, share, SDK) group: rank the groups' oldest rows
+        from one aggregate, then fetch the winner.
+        """
+        if policy.is_strict_priority:
+            return (
+                candidates.select_for_update(skip_locked=True)
+                .order_by("-priority", "created_at", "pk")
+                .first()
+            )
+
+        group_fields = ["priority"] + ([policy.share_field] if policy.share_field else [])
+        if policy.reflash_penalty:
+            group_fields.append("sdk_version")
+        groups = list(
+            candidates.order_by().values(*group_fields).annotate(oldest=Min("created_at"))
+        )
+        if not groups:
+            return None
+
+        def rank(group, pinned=True):
+            share = policy.share_label(group[policy.share_field]) if policy.share_field else None
+            key = policy.order_key(group["priority"], group["oldest"])
+            if pinned:
+                key = policy.placement_key(key, group.get("sdk_version", ""), board_sdk)
+            return (policy.share_rank(share), key)
+
+        best = min(groups, key=rank)
+        if policy.reflash_penalty:
+            unpinned = min(groups, key=lambda group: rank(group, pinned=False))
+            unpinned_reflash = policy.needs_reflash(unpinned["sdk_version"], board_sdk)
+            if unpinned_reflash and not policy.needs_reflash(best["sdk_version"], board_sdk):
+                policy.reflashes_avoided += 1
+        return (
+            candidates.select_for_update(skip_locked=True)
+            .filter(**{name: best[name] for name in group_fields})
+            .order_by("created_at")
+            .first()
+        )
+
+    def _run_pass(
+        self, platform: str, trigger: str, planner: Callable[[PassReport], Plan]
+    ) -> PassReport:
+        """Plan and persist one platform partition under its lock, recording timings."""
+        report = PassReport(
+            platform=platform, trigger=trigger, assignment_mode=self.assignment_mode
+        )
+        started = time.perf_counter()
+        try:
+            with transaction.atomic(), platform_lock(platform):
+                plan = planner(report)
+                planned = time.perf_counter()
+                report.reflashes = self._persist_plan(plan)
+            report.assigned = len(plan)
+            report.plan_ms = (planned - started) * 1000
+            report.persist_ms = (time.perf_counter() - planned) * 1000
+            counters.record_sdk_placements(
+                reflashes=report.reflashes, reflashes_avoided=report.reflashes_avoided
+            )
+        except DispatchConflict as exc:
+            logger.warning("Scheduling pass for %s rolled back: %s", platform, exc)
+            report.plan_ms = (time.perf_counter() - started) * 1000
+
+        logger.info(
+            "Scheduling pass %s/%s assigned %s of %s idle boards in %.1f ms "
+            "(plan %.1f ms, persist %.1f ms)",
+            platform,
+            trigger,
+            report.assigned,
+            report.idle_boards,
+            report.total_ms,
+            report.plan_ms,
+            report.persist_ms,
+        )
+        cache.set(PASS_REPORT_CACHE_KEY.format(platform=platform), report.as_dict(), timeout=None)
+        return report
+
+    def _persist_plan(self, plan: Plan) -> int:
+        """Mark planned boards busy and requests running with a few set-based statements.
+
+        Both updates are conditional on the rows still being free; if anything was claimed
+        outside the platform lock the whole pass is rolled back rather than double-booking.
+        Boards handed a request for another SDK take that SDK version; returns how many did.
+        """
         now = timezone.now()
-        logger.info("Dispatching request %s to board %s", req.pk, board.pk)
-        board.status = "BUSY"
-        board.is_locked = True
-        board.last_used_at = now
-        board.save(update_fields=["status", "is_locked", "last_used_at"])
-        req.status = "RUNNING"
-        req.started_at = now
-        req.executed_on_board = board
-        req.save(update_fields=["status", "started_at", "executed_on_board"])
+        reflashes = 0
+        reserved_gaps, unreserved_gaps = [], []
+        for chunk in chunked(plan, DISPATCH_BATCH_SIZE):
+            updates = {"status": "BUSY", "is_locked": True, "last_used_at": now}
+            reflashed = [
+                (board, req)
+                for board, req in chunk
+                if QueuePolicy.needs_reflash(req.sdk_version, board.sdk_version)
+            ]
+            if reflashed:
+                updates["sdk_version"] = Case(
+                    *[When(pk=board.pk, then=Value(req.sdk_version)) for board, req in reflashed],
+                    default=F("sdk_version"),
+                )
+            claimed = Board.objects.filter(
+                pk__in=[board.pk for board, _req in chunk], status="IDLE", is_locked=False
+            ).update(**updates)
+            if claimed != len(chunk):
+                raise DispatchConflict(
+                    f"{len(chunk) - claimed} planned boards were claimed concurrently"
+                )
+
+            started = TestRequest.objects.filter(
+                pk__in=[req.pk for _board, req in chunk], status="QUEUED"
+            ).update(
+                status="RUNNING",
+                started_at=now,
+                reserved_for_board=None,
+                reserved_until=None,
+                executed_on_board=Case(
+                    *[
+                        When(pk=req.pk, then=Value(board.pk, output_field=UUIDField()))
+                        for board, req in chunk
+                    ],
+                    output_field=UUIDField(),
+                ),
+                executed_on_pc=Case(
+                    *[
+                        When(pk=req.pk, then=Value(board.test_pc_id, output_field=UUIDField()))
+                        for board, req in chunk
+                        if board.test_pc_id
+                    ],
+                    default=None,
+                    output_field=UUIDField(),
+                ),
+            )
+            if started != len(chunk):
+                raise DispatchConflict(
+                    f"{len(chunk) - started} planned requests were dispatched concurrently"
+                )
+
+            for board, req in chunk:
+                logger.debug("Dispatched request %s to board %s", req.pk, board.pk)
+                # Only gaps where work was already waiting say anything about dispatch latency.
+                if board.last_released_at and req.created_at <= board.last_released_at:
+                    gaps = (
+                        reserved_gaps if req.reserved_for_board_id == board.pk else unreserved_gaps
+                    )
+                    gaps.append((now - board.last_released_at).total_seconds())
+                req.reserved_for_board, req.reserved_until = None, None
+                board.status, board.is_locked, board.last_used_at = "BUSY", True, now
+                req.status, req.started_at, req.executed_on_board = "RUNNING", now, board
+                req.executed_on_pc_id = board.test_pc_id
+            for board, req in reflashed:
+                board.sdk_version = req.sdk_version
+            reflashes += len(reflashed)
+        counters.adjust(
+            queued_requests=-len(plan),
+            running_requests=len(plan),
+            idle_boards=-len(plan),
+            busy_boards=len(plan),
+        )
+        leases.announce(board.test_pc_id for board, _req in plan)
+        if reserved_gaps or unreserved_gaps:
+            transaction.on_commit(lambda: counters.record_idle_gaps(reserved_gaps, unreserved_gaps))
+        return reflashes
 
     def complete_request(self, request_id: int, success: bool = True):
         """Mark a request complete/failed and free the board."""
-        with self.lock:
-            with transaction.atomic():
-                req = TestRequest.objects.select_for_update().get(pk=request_id)
-                req.status = "DONE" if success else "FAILED"
-                req.completed_at = timezone.now()
-                req.save(update_fields=["status", "completed_at"])
-
-                if req.executed_on_board_id:
-                    Board.objects.filter(pk=req.executed_on_board_id).update(status="IDLE", is_locked=False)
-
-        self.schedule()
-
-    def status(self):
-        queued = TestRequest.objects.filter(status="QUEUED").count()
-        running = TestRequest.objects.filter(status="RUNNING").count()
-        busy_boards = Board.objects.filter(status="BUSY").count()
-        idle_boards = Board.objects.filter(status="IDLE", is_locked=False).count()
+        self.complete_requests([(request_id, success)])
+
+    def complete_requests(self, results: Iterable[Tuple[int, bool]]) -> Dict[str, object]:
+        """Record many (request_id, success) results in one transaction and reschedule once.
+
+        Only QUEUED or RUNNING requests are completed; ids that already finished are reported
+        back untouched, since their boards may be running something else by now.
+        """
+        outcome = dict(results)
+        now = timezone.now()
+        board_ids: List = []
+        with transaction.atomic():
+            sqlite_write_lock()
+            # Lock the rows this call finishes before writing, so a concurrent call completing
+            # the same ids waits and then finds them finished instead of claiming them too.
+            rows = []
+            for chunk in chunked(list(outcome), DISPATCH_BATCH_SIZE):
+                rows.extend(
+                    TestRequest.objects.select_for_update()
+                    .filter(pk__in=chunk, status__in=["QUEUED", "RUNNING"])
+                    .values_list(
+                        "pk",
+                        "status",
+                        "executed_on_board_id",
+                        "platform",
+                        "required_capabilities",
+                        "started_at",
+                        "test_run_id",
+                        "test_case_id",
+                    )
+                )
+            for success in (True, False):
+                ids = [row[0] for row in rows if outcome[row[0]] is success]
+                for chunk in chunked(ids, DISPATCH_BATCH_SIZE):
+                    TestRequest.objects.filter(pk__in=chunk).update(
+                        status="DONE" if success else "FAILED", completed_at=now
+                    )
+            completed = []
+            runs = []
+            finished = []
+            board_results = []
+            was_running = 0
+            for pk, status, board_id, platform, cap_str, started_at, *origin in rows:
+                completed.append(pk)
+                was_running += status == "RUNNING"
+                if board_id:
+                    board_ids.append(board_id)
+                    board_results.append((board_id, outcome[pk]))
+                runs.append((platform, cap_str, started_at))
+                finished.append(FinishedRequest(pk, *origin, started_at, now, outcome[pk]))
+            record_durations(runs, now)
+            health.record_results(board_results)
+            requests_finished.send(sender=self.__class__, requests=finished)
+            for chunk in chunked(board_ids, DISPATCH_BATCH_SIZE):
+                Board.objects.filter(pk__in=chunk).update(
+                    status="IDLE", is_locked=False, last_released_at=now
+                )
+            # Count by prior status: a RUNNING request may have lost its board (e.g. deleted).
+            counters.adjust(
+                queued_requests=-(len(completed) - was_running),
+                running_requests=-was_running,
+                busy_boards=-len(board_ids),
+                idle_boards=len(board_ids),
+            )
+
+        ignored = sorted(set(outcome) - set(completed))
+        if ignored:
+            logger.info("Requests %s were already completed or do not exist", ignored)
+        logger.info("Completed %s requests, freed %s boards", len(completed), len(board_ids))
+        # Board passes start a freed board's reserved next request before anything else, so a
+        # handover goes through wake() too and the daemon owns it when scheduling is not inline.
+        if board_ids:
+            self.wake(board_ids=board_ids)
+        return {"completed": len(completed), "ignored": ignored}
+
+    def estimate(self, test_request: TestRequest) -> Dict[str, object]:
+        """When the request is expected to start and finish, from queue position and run history."""
+        return estimate(test_request)
+
+    def boards_for(self, test_request: TestRequest):
+        """Boards on the request's platform with every active capability it needs, in any status."""
+        return (
+            Board.objects.filter(platform=test_request.platform)
+            .filter(able_to_serve(test_request.pk))
+            .order_by("name")
+        )
+
+    def lease_work(self, test_pc_id, limit: int = 10) -> List[TestRequest]:
+        """Lease up to ``limit`` requests dispatched to boards of one TestPC and not yet leased.
+
+        Each lease lasts DISPATCHER_LEASE_SECONDS; the agent renews it while the run is in
+        progress, and expire_leases puts requests with lapsed leases back in the queue.
+        """
+        leased_until = timezone.now() + timedelta(seconds=settings.DISPATCHER_LEASE_SECONDS)
+        with transaction.atomic():
+            ids = list(
+                TestRequest.objects.select_for_update(skip_locked=True)
+                .filter(status="RUNNING", executed_on_pc_id=test_pc_id, leased_until__isnull=True)
+                .order_by("started_at")
+                .values_list("pk", flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            # Re-check the lease in the update and read back by its stamp, so two agents racing
+            # on a backend without row locks (SQLite) never both get the same request.
+            TestRequest.objects.filter(pk__in=ids, leased_until__isnull=True).update(
+                leased_until=leased_until
+            )
+            leased = list(
+                TestRequest.objects.filter(pk__in=ids, leased_until=leased_until)
+                .select_related("executed_on_board")
+                .order_by("started_at")
+            )
+        logger.info(
+            "Leased %s requests to TestPC %s until %s",
+            len(leased),
+            test_pc_id,
+            leased_until.isoformat(),
+        )
+        return leased
+
+    def renew_leases(self, test_pc_id, request_ids: Iterable[int]) -> Dict[str, object]:
+        """Extend this TestPC's leases on the given requests.
+
+        Ids it no longer holds are reported lost.
+        """
+        request_ids = set(request_ids)
+        leased_until = timezone.now() + timedelta(seconds=settings.DISPATCHER_LEASE_SECONDS)
+        TestRequest.objects.filter(
+            pk__in=request_ids,
+            status="RUNNING",
+            executed_on_pc_id=test_pc_id,
+            leased_until__isnull=False,
+        ).update(leased_until=leased_until)
+        renewed = TestRequest.objects.filter(pk__in=request_ids, leased_until=leased_until)
+        renewed = sorted(renewed.values_list("pk", flat=True))
+        return {
+            "renewed": renewed,
+            "lost": sorted(request_ids - set(renewed)),
+            "leased_until": leased_until,
+        }
+
+    def reap_expired(self, dry_run: bool = False) -> List[int]:
+        """Fail RUNNING requests that outlived their timeout and free their boards.
+
+        RUNNING rows are bounded by fleet size, so the (status, started_at) index keeps this one
+        short range scan no matter how much history the table holds. Returns the reaped ids.
+        """
+        now = timezone.now()
+        grace = timedelta(seconds=settings.DISPATCHER_REAPER_GRACE)
+        with transaction.atomic():
+            candidates = (
+                TestRequest.objects.select_for_update(skip_locked=True)
+                .filter(status="RUNNING", started_at__lte=now - grace)
+                .values_list(
+                    "pk",
+                    "started_at",
+                    "timeout",
+                    "executed_on_board_id",
+                    "platform",
+                    "required_capabilities",
+                    "test_run_id",
+                    "test_case_id",
+                )
+            )
+            expired, runs, finished = [], [], []
+            # ``origin`` is the (test_run_id, test_case_id) pair FinishedRequest carries.
+            for pk, started_at, timeout, board_id, platform, cap_str, *origin in candidates:
+                if started_at + timedelta(seconds=timeout) + grace <= now:
+                    expired.append((pk, timeout, board_id))
+                    runs.append((platform, cap_str, started_at))
+                    finished.append(FinishedRequest(pk, *origin, started_at, now, False))
+            if not expired or dry_run:
+                return [pk for pk, _timeout, _board_id in expired]
+
+            TestRequest.objects.filter(pk__in=[pk for pk, _timeout, _board_id in expired]).update(
+                status="FAILED", completed_at=now
+            )
+            board_ids = [board_id for _pk, _timeout, board_id in expired if board_id]
+            Board.objects.filter(pk__in=board_ids).update(
+                status="IDLE", is_locked=False, last_released_at=now
+            )
+            # Timed-out runs held their boards this long too, so they count towards the estimates.
+            record_durations(runs, now)
+            health.record_results((board_id, False) for board_id in board_ids)
+            requests_finished.send(sender=self.__class__, requests=finished)
+            BoardLog.objects.bulk_create(
+                [
+                    BoardLog(
+                        board_id=board_id,
+                        level="ERROR",
+                        message=f"Request {pk} timed out after {timeout}s",
+                    )
+                    for pk, timeout, board_id in expired
+                    if board_id
+                ]
+            )
+            counters.adjust(
+                running_requests=-len(expired),
+                busy_boards=-len(board_ids),
+                idle_boards=len(board_ids),
+            )
+
+        logger.warning(
+            "Reaped %s timed out requests, freed %s boards", len(expired), len(board_ids)
+        )
+        if board_ids:
+            self.wake(board_ids=board_ids)
+        return [pk for pk, _timeout, _board_id in expired]
+
+    def expire_leases(self, dry_run: bool = False) -> List[int]:
+        """Put RUNNING requests whose lease lapsed back in the queue and free their boards.
+
+        The agent holding the lease stopped renewing it, so the run is presumed lost rather than
+        failed: the request keeps its place by priority and age and is dispatched again.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            lapsed = list(
+                TestRequest.objects.select_for_update(skip_locked=True)
+                .filter(status="RUNNING", leased_until__lt=now)
+                .values_list("pk", "platform", "executed_on_board_id")
+            )
+            if not lapsed or dry_run:
+                return [pk for pk, _platform, _board_id in lapsed]
+
+            TestRequest.objects.filter(pk__in=[pk for pk, _platform, _board_id in lapsed]).update(
+                status="QUEUED",
+                started_at=None,
+                executed_on_board=None,
+                executed_on_pc=None,
+                leased_until=None,
+            )
+            board_ids = [board_id for _pk, _platform, board_id in lapsed if board_id]
+            Board.objects.filter(pk__in=board_ids).update(
+                status="IDLE", is_locked=False, last_released_at=now
+            )
+            BoardLog.objects.bulk_create(
+                [
+                    BoardLog(
+                        board_id=board_id,
+                        level="WARN",
+                        message=f"Lease on request {pk} expired; requeued",
+                    )
+                    for pk, _platform, board_id in lapsed
+                    if board_id
+                ]
+            )
+            health.record_logs(board_ids, "WARN")
+            counters.adjust(
+                running_requests=-len(lapsed),
+                queued_requests=len(lapsed),
+                busy_boards=-len(board_ids),
+                idle_boards=len(board_ids),
+            )
+
+        logger.warning(
+            "Requeued %s requests with expired leases, freed %s boards", len(lapsed), len(board_ids)
+        )
+        self.wake(platforms={platform for _pk, platform, _board_id in lapsed})
+        return [pk for pk, _platform, _board_id in lapsed]
+
+    def wait_percentiles(self, fresh: bool = False) -> Dict[str, Dict[str, Optional[float]]]:
+        """Queue wait-time percentiles per share, recomputed at most every few seconds."""
+        stats = None if fresh else cache.get(WAIT_PERCENTILES_CACHE_KEY)
+        if stats is None:
+            stats = QueuePolicy.from_settings().wait_percentiles()
+            cache.set(WAIT_PERCENTILES_CACHE_KEY, stats, timeout=WAIT_PERCENTILES_TTL)
+        return stats
+
+    def status(self, fresh: bool = False):
+        """Queue and fleet counters from the cache; ``fresh`` recounts them from the database."""
         return {
-            "queued_requests": queued,
-            "running_requests": running,
-            "busy_boards": busy_boards,
-            "idle_boards": idle_boards,
+            **counters.read(fresh=fresh),
+            "wait_percentiles": self.wait_percentiles(fresh=fresh),
+            "daemon": cache.get(DAEMON_STATS_CACHE_KEY),
+            "sdk_affinity": counters.sdk_placements(),
+            "pipelining": counters.idle_gaps(),
+            "last_passes": list(
+                cache.get_many(
+                    [
+                        PASS_REPORT_CACHE_KEY.format(platform=platform)
+                        for platform, _label in Board.PLATFORM_CHOICES
+                    ]
+                ).values()
+            ),
         }
 
 
@@ -0,0 +1,40 @@
+"""Signals sent by the dispatcher, and its receivers for board changes made elsewhere."""
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.dispatch import Signal, receiver
+
+from apps.boards.signals import boards_changed
+from apps.dispatcher import counters
+
+
+class FinishedRequest(NamedTuple):
+    request_id: int
+    test_run_id: Optional[int]
+    test_case_id: Optional[int]
+    started_at: Optional[datetime]
+    completed_at: datetime
+    success: bool
+
+
+# Sent inside the completing transaction with ``requests``, a list of FinishedRequest.
+requests_finished = Signal()
+
+
+@receiver(boards_changed)
+def schedule_changed_boards(sender, changes, **kwargs):
+    """Keep the idle-board counter in step and offer boards that came back to the scheduler."""
+    from apps.dispatcher.services import dispatcher_service
+
+    became_idle = [
+        change.board_id
+        for change in changes
+        if change.status == "IDLE" and change.was_status != "IDLE"
+    ]
+    went_away = sum(
+        1 for change in changes if change.was_status == "IDLE" and change.status != "IDLE"
+    )
+    counters.adjust(idle_boards=len(became_idle) - went_away)
+    if became_idle:
+        transaction.on_commit(lambda: dispatcher_service.wake(board_ids=became_idle))
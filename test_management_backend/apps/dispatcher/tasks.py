@@ -0,0 +1,35 @@
+"""Celery tasks for the dispatcher."""
+from celery import shared_task
+
+from apps.dispatcher import counters
+from apps.dispatcher.services import dispatcher_service
+
+
+@shared_task
+def reconcile_dispatcher():
+    """Full scheduling pass that catches anything the incremental paths missed."""
+    dispatcher_service.schedule()
+
+
+@shared_task
+def reap_expired_requests():
+    """Fail RUNNING requests past their timeout and hand their boards back to the scheduler."""
+    return len(dispatcher_service.reap_expired())
+
+
+@shared_task
+def expire_request_leases():
+    """Requeue RUNNING requests whose TestPC agent stopped renewing its lease."""
+    return len(dispatcher_service.expire_leases())
+
+
+@shared_task
+def reserve_next_requests():
+    """Reserve the next request for busy boards about to finish, so their agents can stage it."""
+    return dispatcher_service.reserve_next()
+
+
+@shared_task
+def recount_status_counters():
+    """Reset the cached status counters to exact database counts."""
+    return counters.recount()
@@ -0,0 +1,88 @@
+"""Async long-poll endpoint through which TestPC agents lease work dispatched to their boards.
+
+DRF views are synchronous, so this is a plain Django async view: authentication, validation
+and the lease claim run on pooled threads that release their database connection afterwards,
+and only the wait in between is awaited. Serve it from the ASGI server so a waiting agent
+holds a coroutine, not a worker, thread or connection.
+"""
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from apps.dispatcher.leases import LeaseInbox
+from apps.dispatcher.permissions import check_test_pc_access
+from apps.dispatcher.serializers import LeaseRequestSerializer, TestRequestSerializer
+from apps.dispatcher.services import dispatcher_service
+
+
+def _validated_lease_request(request) -> dict:
+    """Authenticate like the DRF API does and validate the body; raises DRF API exceptions.
+
+    Only agents holding the TestPC's auth token (or admins) may lease its work.
+    """
+    drf_request = Request(
+        request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    if not drf_request.user or not drf_request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        raise exceptions.ParseError("Request body must be JSON.")
+    serializer = LeaseRequestSerializer(data=payload)
+    serializer.is_valid(raise_exception=True)
+    check_test_pc_access(drf_request, serializer.validated_data["test_pc"])
+    return serializer.validated_data
+
+
+def _lease(test_pc_id, limit: int) -> list:
+    leased = dispatcher_service.lease_work(test_pc_id, limit=limit)
+    return TestRequestSerializer(leased, many=True).data
+
+
+def _on_pool(func):
+    """Run ``func`` on the shared thread pool, closing the connection it opened when done."""
+
+    def call(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False)
+
+
+@csrf_exempt
+@require_POST
+@transaction.non_atomic_requests
+async def lease_work(request):
+    """Lease requests dispatched to boards of ``test_pc``, waiting up to ``wait`` seconds for some.
+
+    Returns as soon as anything is leased, or with an empty list when the wait runs out.
+    """
+    try:
+        data = await _on_pool(_validated_lease_request)(request)
+    except exceptions.APIException as exc:
+        body = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return JsonResponse(body, status=exc.status_code)
+
+    test_pc_id = data["test_pc"].pk
+    deadline = time.monotonic() + data["wait"]
+    # Subscribe before the first claim, so work dispatched in between still wakes the agent.
+    async with LeaseInbox(test_pc_id) as inbox:
+        while True:
+            leased = await _on_pool(_lease)(test_pc_id, data["limit"])
+            remaining = deadline - time.monotonic()
+            if leased or remaining <= 0:
+                break
+            await inbox.wait(remaining)
+    return JsonResponse({"leases": leased, "lease_seconds": settings.DISPATCHER_LEASE_SECONDS})
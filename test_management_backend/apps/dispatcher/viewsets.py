@@ -1,25 +1,57 @@
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from apps.dispatcher.models import TestRequest
+from apps.dispatcher.permissions import check_test_pc_access
 from apps.dispatcher.serializers import (
+    CompleteBatchSerializer,
     CompleteRequestSerializer,
     DispatchRequestSerializer,
+    LeaseRenewSerializer,
+    ReservedWorkSerializer,
     TestRequestSerializer,
 )
 from apps.dispatcher.services import dispatcher_service
 
+# Bounds on the Retry-After hint of the eta action, in seconds.
+ETA_MIN_RETRY_AFTER = 5
+ETA_MAX_RETRY_AFTER = 300
+
+
+def _wants_fresh(request) -> bool:
+    """``?fresh=1`` asks for exact counts instead of the cached counters."""
+    return request.query_params.get("fresh", "").lower() in ("1", "true", "yes")
+
 
 class DispatcherViewSet(viewsets.ViewSet):
     """Submit dispatch requests and inspect dispatcher state."""
 
     permission_classes = [permissions.IsAuthenticated]
 
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        """Keep the enqueue route out of ATOMIC_REQUESTS, so each enqueue chunk commits on its own.
+
+        The list and create actions share one route, so the read-only list opts out too.
+        """
+        view = super().as_view(actions, **initkwargs)
+        if actions and "create" in actions.values():
+            view = transaction.non_atomic_requests(view)
+        return view
+
     def list(self, request):
         """Return current dispatcher status and recent requests."""
         qs = TestRequest.objects.order_by("-created_at")[:50]
-        return Response({"status": dispatcher_service.status(), "recent_requests": TestRequestSerializer(qs, many=True).data})
+        return Response(
+            {
+                "status": dispatcher_service.status(fresh=_wants_fresh(request)),
+                "recent_requests": TestRequestSerializer(qs, many=True).data,
+            }
+        )
 
     def create(self, request):
         """Submit a batch of requests for scheduling."""
@@ -33,12 +65,18 @@ class DispatcherViewSet(viewsets.ViewSet):
         serializer = DispatchRequestSerializer(data=payload, many=True)
         serializer.is_valid(raise_exception=True)
 
-        created = dispatcher_service.queue_requests(serializer.validated_data)
+        result = dispatcher_service.queue_requests(
+            serializer.validated_data, submitted_by=request.user
+        )
         return Response(
             {
-                "queued": len(created),
-                "request_ids": [req.pk for req in created],
-                "status": dispatcher_service.status(),
+                "queued": len(result.created),
+                "request_ids": result.request_ids,
+                "duplicates": [
+                    {"client_key": key, "request_id": request_id}
+                    for key, request_id in result.duplicates.items()
+                ],
+                "status": dispatcher_service.status(fresh=_wants_fresh(request)),
             },
             status=status.HTTP_202_ACCEPTED,
         )
@@ -52,10 +90,72 @@ class DispatcherViewSet(viewsets.ViewSet):
             request_id=serializer.validated_data["request_id"],
             success=serializer.validated_data.get("success", True),
         )
-        return Response(dispatcher_service.status())
+        return Response(dispatcher_service.status(fresh=_wants_fresh(request)))
+
+    @action(detail=False, methods=["post"], url_path="complete-batch")
+    def complete_batch(self, request):
+        """Mark many requests done/failed in one transaction, then reschedule their boards once."""
+        serializer = CompleteBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcome = dispatcher_service.complete_requests(
+            (item["request_id"], item.get("success", True))
+            for item in serializer.validated_data["results"]
+        )
+        return Response(
+            {**outcome, "status": dispatcher_service.status(fresh=_wants_fresh(request))}
+        )
+
+    @action(detail=True, methods=["get"])
+    def boards(self, request, pk=None):
+        """List boards that can serve this request."""
+        test_request = get_object_or_404(TestRequest, pk=pk)
+        boards = dispatcher_service.boards_for(test_request).values(
+            "id", "name", "status", "is_locked", "test_pc"
+        )
+        return Response(list(boards))
+
+    @action(detail=True, methods=["get"])
+    def eta(self, request, pk=None):
+        """Estimated start and finish; Retry-After says when polling again is worthwhile."""
+        test_request = get_object_or_404(TestRequest, pk=pk)
+        estimate = dispatcher_service.estimate(test_request)
+        response = Response(estimate)
+        if test_request.status in ("QUEUED", "RUNNING"):
+            remaining = estimate["estimated_wait_seconds"] or 0
+            if test_request.status == "RUNNING" and estimate["estimated_finish"]:
+                remaining = (estimate["estimated_finish"] - timezone.now()).total_seconds()
+            retry_after = min(max(remaining / 2, ETA_MIN_RETRY_AFTER), ETA_MAX_RETRY_AFTER)
+            response["Retry-After"] = str(int(retry_after))
+        return response
+
+    @action(detail=False, methods=["post"], url_path="renew-leases")
+    def renew_leases(self, request):
+        """Extend a TestPC agent's leases.
+
+        Leases it lost are listed so it can abandon those runs.
+        """
+        serializer = LeaseRenewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        check_test_pc_access(request, serializer.validated_data["test_pc"])
+        outcome = dispatcher_service.renew_leases(
+            serializer.validated_data["test_pc"].pk, serializer.validated_data["request_ids"]
+        )
+        return Response(outcome)
+
+    @action(detail=False, methods=["get"])
+    def reserved(self, request):
+        """Requests reserved for a TestPC's busy boards.
+
+        Its agent may stage them before they start.
+        """
+        serializer = ReservedWorkSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        check_test_pc_access(request, serializer.validated_data["test_pc"])
+        reserved = dispatcher_service.reserved_for(serializer.validated_data["test_pc"].pk)
+        return Response(TestRequestSerializer(reserved, many=True).data)
 
     @action(detail=False, methods=["post"])
-    def reschedule(self, _request):
-        """Manually trigger scheduling."""
-        dispatcher_service.schedule()
-        return Response(dispatcher_service.status())
+    def reschedule(self, request):
+        """Manually trigger a full scheduling pass."""
+        dispatcher_service.wake(full=True)
+        return Response(dispatcher_service.status(fresh=_wants_fresh(request)))
@@ -0,0 +1,154 @@
+"""Wakeup notifications from the API to the dispatcher daemon.
+
+PostgreSQL deployments use LISTEN/NOTIFY, which is delivered only when the notifying
+transaction commits. Otherwise a Redis channel layer carries the message; with neither, the
+daemon falls back to polling and notifications are dropped.
+"""
+import asyncio
+import json
+import logging
+import select
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+WAKEUP_CHANNEL = "dispatcher_wakeup"
+# NOTIFY payloads must stay under 8000 bytes; larger wakeups ask for a full pass instead.
+MAX_PAYLOAD_BYTES = 7900
+
+
+@dataclass
+class Wakeup:
+    """What changed since the last pass: a full pass, some platforms, or some freed boards."""
+
+    full: bool = False
+    platforms: Set[str] = field(default_factory=set)
+    board_ids: Set[str] = field(default_factory=set)
+
+    def merge(self, other: "Wakeup"):
+        self.full = self.full or other.full
+        self.platforms |= other.platforms
+        self.board_ids |= other.board_ids
+
+    def encode(self) -> str:
+        payload = json.dumps(
+            {
+                "full": self.full,
+                "platforms": sorted(self.platforms),
+                "boards": sorted(self.board_ids),
+            }
+        )
+        if len(payload) > MAX_PAYLOAD_BYTES:
+            payload = json.dumps({"full": True, "platforms": [], "boards": []})
+        return payload
+
+    @classmethod
+    def decode(cls, payload: str) -> "Wakeup":
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed dispatcher wakeup %r", payload[:200])
+            return cls(full=True)
+        return cls(
+            full=bool(data.get("full")),
+            platforms=set(data.get("platforms", ())),
+            board_ids=set(data.get("boards", ())),
+        )
+
+
+def backend() -> str:
+    """Resolve DISPATCHER_WAKEUP_BACKEND: "postgres", "channels" or "poll"."""
+    configured = settings.DISPATCHER_WAKEUP_BACKEND
+    if configured != "auto":
+        return configured
+    if connection.vendor == "postgresql":
+        return "postgres"
+    if not isinstance(get_channel_layer(), (InMemoryChannelLayer, type(None))):
+        return "channels"
+    return "poll"
+
+
+def notify(full: bool = False, platforms: Iterable[str] = (), board_ids: Iterable = ()):
+    """Wake the dispatcher daemon once the current transaction commits."""
+    wakeup = Wakeup(full=full, platforms=set(platforms), board_ids={str(pk) for pk in board_ids})
+    payload = wakeup.encode()
+    kind = backend()
+    if kind == "postgres":
+        # NOTIFY is transactional itself, so the daemon never sees rows it cannot read yet.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [WAKEUP_CHANNEL, payload])
+    elif kind == "channels":
+        transaction.on_commit(lambda: _send(payload))
+
+
+def _send(payload: str):
+    try:
+        async_to_sync(get_channel_layer().send)(
+            WAKEUP_CHANNEL, {"type": "dispatcher.wakeup", "payload": payload}
+        )
+    except Exception:
+        # The daemon's idle pass picks the work up; losing a wakeup must not fail the API call.
+        logger.exception("Could not send dispatcher wakeup")
+
+
+class WakeupListener:
+    """Blocks until wakeups arrive, merging everything received within a short window."""
+
+    def __init__(self, kind: Optional[str] = None):
+        self.kind = kind or backend()
+        self._pg = None
+
+    def _postgres(self):
+        if self._pg is None or self._pg.closed:
+            # A dedicated autocommit connection, so scheduling transactions never hold up LISTEN.
+            self._pg = connection.Database.connect(**connection.get_connection_params())
+            self._pg.autocommit = True
+            with self._pg.cursor() as cursor:
+                cursor.execute(f"LISTEN {WAKEUP_CHANNEL}")
+        return self._pg
+
+    def _receive(self, timeout: float) -> List[Wakeup]:
+        if timeout <= 0 and self.kind != "postgres":
+            return []
+        if self.kind == "postgres":
+            conn = self._postgres()
+            if not conn.notifies and timeout > 0:
+                select.select([conn], [], [], timeout)
+            conn.poll()
+            wakeups = [Wakeup.decode(notice.payload) for notice in conn.notifies]
+            conn.notifies.clear()
+            return wakeups
+        if self.kind == "channels":
+            message = async_to_sync(self._receive_channel)(timeout)
+            return [Wakeup.decode(message["payload"])] if message else []
+        return []
+
+    @staticmethod
+    async def _receive_channel(timeout: float) -> Optional[dict]:
+        try:
+            return await asyncio.wait_for(get_channel_layer().receive(WAKEUP_CHANNEL), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def wait(self, timeout: float, coalesce: float) -> List[Wakeup]:
+        """Wait up to ``timeout`` for a wakeup, then keep collecting for ``coalesce`` seconds."""
+        if self.kind == "poll":
+            time.sleep(timeout)
+            return []
+        wakeups = self._receive(timeout)
+        if wakeups:
+            deadline = time.monotonic() + coalesce
+            while (remaining := deadline - time.monotonic()) > 0:
+                wakeups.extend(self._receive(remaining))
+        return wakeups
+
+    def close(self):
+        if self._pg is not None and not self._pg.closed:
+            self._pg.close()
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import TestResult, TestRun, TestScenario
+from .models import TestCaseDuration, TestResult, TestRun, TestScenario
 
 
 @admin.register(TestScenario)
@@ -12,7 +12,16 @@ class TestScenarioAdmin(admin.ModelAdmin):
 
 @admin.register(TestRun)
 class TestRunAdmin(admin.ModelAdmin):
-    list_display = ("name", "created_by", "updated_by", "created_at", "updated_at")
+    list_display = (
+        "name",
+        "created_by",
+        "updated_by",
+        "created_at",
+        "updated_at",
+        "work_order",
+        "predicted_makespan_seconds",
+        "actual_makespan_seconds",
+    )
     search_fields = ("name", "description")
     filter_horizontal = ("scenarios", "labels")
 
@@ -22,3 +31,9 @@ class TestResultAdmin(admin.ModelAdmin):
     list_display = ("test_run", "status", "created_at")
     list_filter = ("status",)
     search_fields = ("message",)
+
+
+@admin.register(TestCaseDuration)
+class TestCaseDurationAdmin(admin.ModelAdmin):
+    list_display = ("test_case", "runs", "recent_seconds", "updated_at")
+    search_fields = ("test_case__title",)
@@ -6,3 +6,5 @@ class TestExecutionConfig(AppConfig):
     name = "apps.test_execution"
     verbose_name = "Test Execution"
 
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,74 @@
+# Generated by Django 5.0.14 on 2026-10-16 23:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("test_cases", "0002_rename_tag_label"),
+        ("test_execution", "0003_alter_testrun_description_alter_testrun_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testrun",
+            name="actual_makespan_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="testrun",
+            name="dispatched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="testrun",
+            name="predicted_makespan_seconds",
+            field=models.FloatField(
+                blank=True,
+                help_text="Expected seconds from dispatch until the last test case finishes",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="testrun",
+            name="work_order",
+            field=models.CharField(
+                choices=[("declared", "Declared order"), ("longest_first", "Longest first")],
+                default="declared",
+                help_text=(
+                    "Order the run's test cases are queued in; longest first shortens the makespan"
+                ),
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="TestCaseDuration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("runs", models.PositiveIntegerField(default=0)),
+                ("total_seconds", models.FloatField(default=0)),
+                (
+                    "recent_seconds",
+                    models.FloatField(
+                        default=0, help_text="Exponentially weighted mean favouring recent runs"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "test_case",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="duration",
+                        to="test_cases.testcase",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -30,6 +30,11 @@ class TestScenario(models.Model):
 class TestRun(models.Model):
     """Represents a single execution run that can contain multiple scenarios."""
 
+    WORK_ORDER_CHOICES = [
+        ("declared", "Declared order"),
+        ("longest_first", "Longest first"),
+    ]
+
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     scenarios = models.ManyToManyField(TestScenario, related_name="test_runs", blank=True)
@@ -43,6 +48,21 @@ class TestRun(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # dispatching
+    work_order = models.CharField(
+        max_length=20,
+        choices=WORK_ORDER_CHOICES,
+        default="declared",
+        help_text="Order the run's test cases are queued in; longest first shortens the makespan",
+    )
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    predicted_makespan_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Expected seconds from dispatch until the last test case finishes",
+    )
+    actual_makespan_seconds = models.FloatField(null=True, blank=True)
+
     class Meta:
         ordering = ["-created_at"]
 
@@ -66,3 +86,20 @@ class TestResult(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+
+
+class TestCaseDuration(models.Model):
+    """How long a test case keeps a board, updated as its dispatched runs finish."""
+
+    test_case = models.OneToOneField(
+        "test_cases.TestCase", on_delete=models.CASCADE, related_name="duration"
+    )
+    runs = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    recent_seconds = models.FloatField(
+        default=0, help_text="Exponentially weighted mean favouring recent runs"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.test_case_id} ~{self.recent_seconds:.0f}s over {self.runs} runs"
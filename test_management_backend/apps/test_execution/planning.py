@@ -0,0 +1,209 @@
+"""Expanding a TestRun into dispatcher requests, ordered to shorten the time until it finishes."""
+import heapq
+import logging
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from apps.boards.models import Board
+from apps.dispatcher.estimates import UNAVAILABLE_BOARD_STATUSES
+from apps.dispatcher.matching import CapabilityCatalog
+from apps.dispatcher.services import dispatcher_service
+from apps.dispatcher.signals import FinishedRequest
+
+from .models import TestCaseDuration, TestResult, TestRun, TestScenario
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkItem:
+    """One test case of one scenario, as a single dispatcher request."""
+
+    scenario_id: int
+    test_case_id: int
+    expected_seconds: float
+    # No finished runs yet; expected_seconds is the run's average or the request timeout.
+    estimated: bool = False
+
+
+def expand(test_run: TestRun, default_seconds: float) -> List[WorkItem]:
+    """Active test cases of the run's scenarios, in declared order, with expected durations."""
+    rows = (
+        TestScenario.test_cases.through.objects.filter(
+            testscenario__test_runs=test_run, testcase__is_active=True
+        )
+        .order_by("testscenario__name", "testscenario_id", "testcase__title", "testcase_id")
+        .values_list(
+            "testscenario_id",
+            "testcase_id",
+            "testcase__duration__recent_seconds",
+            "testcase__duration__runs",
+        )
+    )
+    items = [
+        WorkItem(scenario_id, test_case_id, seconds if runs else 0.0, estimated=not runs)
+        for scenario_id, test_case_id, seconds, runs in rows
+    ]
+    known = [item.expected_seconds for item in items if not item.estimated]
+    fallback = sum(known) / len(known) if known else default_seconds
+    for item in items:
+        if item.estimated:
+            item.expected_seconds = fallback
+    return items
+
+
+def order_work(items: List[WorkItem], work_order: str) -> List[WorkItem]:
+    """Declared order, or longest expected duration first (LPT).
+
+    LPT bounds the makespan at 4/3 of optimal.
+    """
+    if work_order == "longest_first":
+        return sorted(items, key=lambda item: -item.expected_seconds)
+    return list(items)
+
+
+def predict_makespan(items: Iterable[WorkItem], boards: int) -> float:
+    """Seconds until the last item finishes when each goes, in order, to the board free first."""
+    free_at = [0.0] * max(boards, 1)
+    for item in items:
+        heapq.heappush(free_at, heapq.heappop(free_at) + item.expected_seconds)
+    return max(free_at)
+
+
+def matching_boards(platform: str, required_capabilities: List[str]) -> int:
+    """Boards on the platform that could take the run's requests now or after their current job."""
+    catalog = CapabilityCatalog.load()
+    mask = catalog.mask_for_names(",".join(sorted(required_capabilities)))
+    if mask is None:
+        return 0
+    board_ids = Board.objects.filter(
+        platform=platform, health_score__gte=settings.DISPATCHER_QUARANTINE_SCORE
+    ).exclude(status__in=UNAVAILABLE_BOARD_STATUSES)
+    masks = catalog.board_masks(board_ids.values_list("pk", flat=True))
+    return sum(1 for board_mask in masks.values() if mask & ~board_mask == 0)
+
+
+def dispatch_test_run(test_run: TestRun, options: dict, submitted_by=None) -> dict:
+    """Queue one dispatcher request per (scenario, test case) in the run's work order.
+
+    The dispatcher serves equal-priority requests oldest first, so the queue order set here is
+    the order boards pick the work up. Client keys carry the dispatch time, so dispatching again
+    before the current dispatch has finished is a retry that returns its existing requests. Once
+    its actual makespan is recorded, dispatching starts a new dispatch that queues the work again.
+    """
+    items = order_work(
+        expand(test_run, default_seconds=options.get("timeout", 600)), test_run.work_order
+    )
+    boards = matching_boards(options["platform"], options.get("required_capabilities", []))
+    predicted = predict_makespan(items, boards) if items and boards else None
+
+    with transaction.atomic():
+        test_run = TestRun.objects.select_for_update().get(pk=test_run.pk)
+        in_progress = test_run.dispatched_at and test_run.actual_makespan_seconds is None
+        if items and not in_progress:
+            test_run.dispatched_at = timezone.now()
+            test_run.predicted_makespan_seconds = predicted
+            test_run.actual_makespan_seconds = None
+            test_run.save(
+                update_fields=[
+                    "dispatched_at",
+                    "predicted_makespan_seconds",
+                    "actual_makespan_seconds",
+                ]
+            )
+    result = dispatcher_service.queue_requests(
+        [
+            {
+                **options,
+                "client_key": (
+                    f"test-run:{test_run.pk}:{test_run.dispatched_at:%Y%m%d%H%M%S%f}:"
+                    f"{item.scenario_id}:{item.test_case_id}"
+                ),
+                "test_run_id": test_run.pk,
+                "test_case_id": item.test_case_id,
+            }
+            for item in items
+        ],
+        submitted_by=submitted_by,
+    )
+    logger.info(
+        "Dispatched test run %s as %s requests (%s new) over %s boards, predicted makespan %s s",
+        test_run.pk,
+        len(items),
+        len(result.created),
+        boards,
+        predicted,
+    )
+    return {
+        "queued": len(result.created),
+        "request_ids": result.request_ids,
+        "duplicates": len(result.duplicates),
+        "work_order": test_run.work_order,
+        "matching_boards": boards,
+        "predicted_makespan_seconds": test_run.predicted_makespan_seconds,
+        "work": [asdict(item) for item in items],
+    }
+
+
+def record_test_case_durations(requests: Iterable[FinishedRequest]):
+    """Fold successful runs of test cases into their TestCaseDuration rows.
+
+    Failed runs are left out: a test that errors early says little about how long it takes.
+    """
+    samples: Dict[int, List[float]] = defaultdict(list)
+    for req in requests:
+        if req.test_case_id and req.success and req.started_at is not None:
+            samples[req.test_case_id].append(
+                max((req.completed_at - req.started_at).total_seconds(), 0.0)
+            )
+    if not samples:
+        return
+
+    TestCaseDuration.objects.bulk_create(
+        [TestCaseDuration(test_case_id=test_case_id) for test_case_id in samples],
+        ignore_conflicts=True,
+    )
+    alpha = settings.DISPATCHER_DURATION_EWMA_ALPHA
+    for stat in TestCaseDuration.objects.select_for_update().filter(test_case_id__in=list(samples)):
+        for seconds in samples[stat.test_case_id]:
+            if stat.runs:
+                stat.recent_seconds += alpha * (seconds - stat.recent_seconds)
+            else:
+                stat.recent_seconds = seconds
+            stat.runs += 1
+            stat.total_seconds += seconds
+        stat.save(update_fields=["runs", "total_seconds", "recent_seconds", "updated_at"])
+
+
+def finish_test_runs(test_run_ids: Iterable[int]) -> List[int]:
+    """Record the actual makespan of dispatched runs whose requests have all finished."""
+    runs = (
+        TestRun.objects.filter(
+            pk__in=set(test_run_ids),
+            dispatched_at__isnull=False,
+            actual_makespan_seconds__isnull=True,
+        )
+        .annotate(
+            open_requests=Count(
+                "test_requests", filter=Q(test_requests__status__in=["QUEUED", "RUNNING"])
+            ),
+            last_completed_at=Max("test_requests__completed_at"),
+        )
+        .filter(open_requests=0, last_completed_at__isnull=False)
+    )
+    finished = []
+    for run in runs:
+        run.actual_makespan_seconds = (run.last_completed_at - run.dispatched_at).total_seconds()
+        run.save(update_fields=["actual_makespan_seconds"])
+        message = f"All dispatched test cases finished after {run.actual_makespan_seconds:.0f}s"
+        if run.predicted_makespan_seconds is not None:
+            message += f" (predicted {run.predicted_makespan_seconds:.0f}s)"
+        TestResult.objects.create(test_run=run, message=message)
+        finished.append(run.pk)
+    return finished
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from apps.dispatcher.serializers import DispatchRequestSerializer
 from apps.test_cases.models import Label, TestCase
 from apps.test_cases.serializers import LabelSerializer
 from .models import TestResult, TestRun, TestScenario
@@ -104,12 +105,28 @@ class TestRunSerializer(serializers.ModelSerializer):
             "labels",
             "label_ids",
             "results",
+            "work_order",
+            "dispatched_at",
+            "predicted_makespan_seconds",
+            "actual_makespan_seconds",
+            "created_by",
+            "updated_by",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "scenarios",
+            "labels",
+            "results",
+            "dispatched_at",
+            "predicted_makespan_seconds",
+            "actual_makespan_seconds",
             "created_by",
             "updated_by",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "scenarios", "labels", "results", "created_by", "updated_by", "created_at", "updated_at"]
 
     def create(self, validated_data):
         scenarios = validated_data.pop("scenarios", [])
@@ -130,3 +147,10 @@ class TestRunSerializer(serializers.ModelSerializer):
         if labels is not None:
             run.labels.set(labels)
         return run
+
+
+class TestRunDispatchSerializer(DispatchRequestSerializer):
+    """Where and how to run every test case of a run; ``work_order`` overrides the run's setting."""
+
+    client_key = None
+    work_order = serializers.ChoiceField(choices=TestRun.WORK_ORDER_CHOICES, required=False)
@@ -1,2 +1,13 @@
-"""Signals for test execution events (placeholder)."""
+"""Signals for test execution events."""
+from django.dispatch import receiver
 
+from apps.dispatcher.signals import requests_finished
+
+from . import planning
+
+
+@receiver(requests_finished)
+def record_dispatched_results(sender, requests, **kwargs):
+    """Learn test case durations and close out runs whose dispatched work has all finished."""
+    planning.record_test_case_durations(requests)
+    planning.finish_test_runs(req.test_run_id for req in requests if req.test_run_id)
@@ -1,9 +1,12 @@
-from rest_framework import permissions, viewsets
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
 from .filters import TestRunFilter
 from .models import TestRun
 from .permissions import IsTestRunner
-from .serializers import TestRunSerializer, TestScenarioSerializer
+from .planning import dispatch_test_run
+from .serializers import TestRunDispatchSerializer, TestRunSerializer, TestScenarioSerializer
 from .models import TestRun, TestScenario
 
 
@@ -28,3 +31,19 @@ class TestRunViewSet(viewsets.ModelViewSet):
     filterset_class = TestRunFilter
     search_fields = ["name", "description"]
     ordering_fields = ["created_at", "updated_at", "name"]
+
+    @action(detail=True, methods=["post"], url_path="dispatch")
+    def dispatch_work(self, request, pk=None):
+        """Queue one dispatcher request per scenario test case, in the run's work order."""
+        test_run = self.get_object()
+        serializer = TestRunDispatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        options = dict(serializer.validated_data)
+        work_order = options.pop("work_order", None)
+        if work_order and work_order != test_run.work_order:
+            test_run.work_order = work_order
+            test_run.save(update_fields=["work_order"])
+        return Response(
+            dispatch_test_run(test_run, options, submitted_by=request.user),
+            status=status.HTTP_202_ACCEPTED,
+        )
@@ -1,2 +1,4 @@
 # Configuration package marker
+from .celery import app as celery_app
 
+__all__ = ("celery_app",)
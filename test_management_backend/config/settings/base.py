@@ -46,7 +46,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "apps.core.middleware.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -229,6 +229,48 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+CELERY_BEAT_SCHEDULE = {
+    "dispatcher-reconcile": {
+        "task": "apps.dispatcher.tasks.reconcile_dispatcher",
+        "schedule": float(os.getenv("DISPATCHER_RECONCILE_INTERVAL", "60")),
+    },
+    "dispatcher-reap-expired": {
+        "task": "apps.dispatcher.tasks.reap_expired_requests",
+        "schedule": float(os.getenv("DISPATCHER_REAPER_INTERVAL", "30")),
+    },
+    "dispatcher-expire-leases": {
+        "task": "apps.dispatcher.tasks.expire_request_leases",
+        "schedule": float(os.getenv("DISPATCHER_LEASE_REAPER_INTERVAL", "15")),
+    },
+    "dispatcher-reserve-next": {
+        "task": "apps.dispatcher.tasks.reserve_next_requests",
+        "schedule": float(os.getenv("DISPATCHER_RESERVE_INTERVAL", "15")),
+    },
+    "dispatcher-recount-status": {
+        "task": "apps.dispatcher.tasks.recount_status_counters",
+        "schedule": float(os.getenv("DISPATCHER_COUNTERS_INTERVAL", "60")),
+    },
+    "boards-flush-heartbeats": {
+        "task": "apps.boards.tasks.flush_heartbeats",
+        "schedule": float(os.getenv("BOARD_HEARTBEAT_FLUSH_SECONDS", "10")),
+    },
+    "boards-rollup-pc-stats": {
+        "task": "apps.boards.tasks.rollup_pc_stats",
+        "schedule": float(os.getenv("PC_STATS_ROLLUP_INTERVAL", "60")),
+    },
+    "boards-prune-pc-stats": {
+        "task": "apps.boards.tasks.prune_pc_stats",
+        "schedule": float(os.getenv("PC_STATS_PRUNE_INTERVAL", "3600")),
+    },
+    "boards-maintain-partitions": {
+        "task": "apps.boards.tasks.maintain_partitions",
+        "schedule": float(os.getenv("PARTITION_MAINTAIN_INTERVAL", "3600")),
+    },
+    "boards-prune-board-logs": {
+        "task": "apps.boards.tasks.prune_board_logs",
+        "schedule": float(os.getenv("BOARD_LOG_PRUNE_INTERVAL", "3600")),
+    },
+}
 
 LOGGING = {
     "version": 1,
@@ -248,3 +290,96 @@ UART_MESSAGE_TIMEOUT = int(os.getenv("UART_MESSAGE_TIMEOUT", "60"))
 
 TEST_EXECUTION_TIMEOUT = int(os.getenv("TEST_EXECUTION_TIMEOUT", "3600"))
 TEST_LOG_MAX_SIZE = int(os.getenv("TEST_LOG_MAX_SIZE", str(10 * 1024 * 1024)))
+
+# "greedy" (first fit per board) or "optimal" (priority-weighted bipartite matching per pass).
+DISPATCHER_ASSIGNMENT_MODE = os.getenv("DISPATCHER_ASSIGNMENT_MODE", "greedy")
+# Seconds a RUNNING request may overrun its timeout before the reaper fails it.
+DISPATCHER_REAPER_GRACE = int(os.getenv("DISPATCHER_REAPER_GRACE", "30"))
+# "priority" (strict priority, then age) or "fair_share" (least-served share first, by weight).
+DISPATCHER_QUEUE_POLICY = os.getenv("DISPATCHER_QUEUE_POLICY", "priority")
+# Seconds of waiting that raise a queued request by one priority level; 0 disables aging.
+DISPATCHER_AGING_SECONDS = int(os.getenv("DISPATCHER_AGING_SECONDS", "0"))
+# Fair-share grouping: "submitter" (user id) or "test_farm".
+DISPATCHER_FAIR_SHARE_KEY = os.getenv("DISPATCHER_FAIR_SHARE_KEY", "submitter")
+# Relative share weights, e.g. "HLOS:3,RTOS:1"; unlisted shares weigh 1.
+DISPATCHER_FAIR_SHARE_WEIGHTS = os.getenv("DISPATCHER_FAIR_SHARE_WEIGHTS", "")
+# Seconds before cached status counters expire and are recounted, bounding drift if the
+# recount task stops.
+DISPATCHER_COUNTERS_TTL = int(os.getenv("DISPATCHER_COUNTERS_TTL", "300"))
+# Priority levels a request loses on boards flashed with a different SDK than it asks for;
+# 0 (the default) keeps strict priority/FIFO order and turns SDK affinity off.
+DISPATCHER_REFLASH_PENALTY = int(os.getenv("DISPATCHER_REFLASH_PENALTY", "0"))
+# Typical seconds a board spends in UPDATING_SDK, used to report board time saved by affinity.
+DISPATCHER_REFLASH_SECONDS = int(os.getenv("DISPATCHER_REFLASH_SECONDS", "600"))
+# Default most concurrently running boards per TestPC (TestPC.max_concurrent_runs overrides);
+# 0 means no limit.
+DISPATCHER_PC_MAX_CONCURRENT = int(os.getenv("DISPATCHER_PC_MAX_CONCURRENT", "0"))
+# Hosts at or above any of these usage percentages in their latest PCStats get no new work.
+DISPATCHER_PC_CPU_LIMIT = float(os.getenv("DISPATCHER_PC_CPU_LIMIT", "90"))
+DISPATCHER_PC_MEMORY_LIMIT = float(os.getenv("DISPATCHER_PC_MEMORY_LIMIT", "95"))
+DISPATCHER_PC_DISK_LIMIT = float(os.getenv("DISPATCHER_PC_DISK_LIMIT", "95"))
+# Seconds the latest PCStats per host stay cached, and the age after which they are ignored.
+DISPATCHER_PC_STATS_TTL = int(os.getenv("DISPATCHER_PC_STATS_TTL", "30"))
+DISPATCHER_PC_STATS_MAX_AGE = int(os.getenv("DISPATCHER_PC_STATS_MAX_AGE", "600"))
+# Run scheduling passes inside API requests; set to False when the run_dispatcher daemon owns
+# scheduling.
+DISPATCHER_INLINE_SCHEDULING = os.getenv("DISPATCHER_INLINE_SCHEDULING", "True") == "True"
+# How the API wakes run_dispatcher: "auto", "postgres" (LISTEN/NOTIFY), "channels" (Redis layer)
+# or "poll".
+DISPATCHER_WAKEUP_BACKEND = os.getenv("DISPATCHER_WAKEUP_BACKEND", "auto")
+# Seconds run_dispatcher keeps collecting wakeups after the first one before running a pass.
+DISPATCHER_DAEMON_COALESCE_SECONDS = float(os.getenv("DISPATCHER_DAEMON_COALESCE_SECONDS", "0.2"))
+# Seconds without wakeups after which run_dispatcher runs a full pass anyway.
+DISPATCHER_DAEMON_IDLE_SECONDS = float(os.getenv("DISPATCHER_DAEMON_IDLE_SECONDS", "30"))
+# Weight of the newest run in the per-(platform, capabilities) duration average behind queue
+# estimates.
+DISPATCHER_DURATION_EWMA_ALPHA = float(os.getenv("DISPATCHER_DURATION_EWMA_ALPHA", "0.2"))
+# Requests inserted per transaction when a large batch is submitted to the dispatcher.
+DISPATCHER_ENQUEUE_CHUNK_SIZE = int(os.getenv("DISPATCHER_ENQUEUE_CHUNK_SIZE", "1000"))
+# Seconds a TestPC agent's lease on a dispatched request lasts between renewals.
+DISPATCHER_LEASE_SECONDS = int(os.getenv("DISPATCHER_LEASE_SECONDS", "120"))
+# Longest long-poll wait the lease endpoint grants, and the re-check interval without a channel
+# layer.
+DISPATCHER_LEASE_MAX_WAIT = float(os.getenv("DISPATCHER_LEASE_MAX_WAIT", "60"))
+DISPATCHER_LEASE_POLL_SECONDS = float(os.getenv("DISPATCHER_LEASE_POLL_SECONDS", "5"))
+# Weight of the newest request result or BoardLog warning/error in a board's health score,
+# and of each heartbeat.
+BOARD_HEALTH_ALPHA = float(os.getenv("BOARD_HEALTH_ALPHA", "0.2"))
+BOARD_HEALTH_HEARTBEAT_ALPHA = float(os.getenv("BOARD_HEALTH_HEARTBEAT_ALPHA", "0.02"))
+# Seconds between board heartbeats beyond which the later one counts as a miss.
+BOARD_HEARTBEAT_MAX_GAP = int(os.getenv("BOARD_HEARTBEAT_MAX_GAP", "120"))
+# Buffer heartbeat stamps in the cache and persist them every BOARD_HEARTBEAT_FLUSH_SECONDS
+# (beat schedule); needs a cache shared with the Celery workers (Redis), and a flush interval
+# well under the max gap.
+BOARD_HEARTBEAT_WRITE_BEHIND = os.getenv("BOARD_HEARTBEAT_WRITE_BEHIND", "False") == "True"
+# Most PCStats samples accepted per ingest call, and rows per bulk INSERT.
+PC_STATS_INGEST_MAX_SAMPLES = int(os.getenv("PC_STATS_INGEST_MAX_SAMPLES", "10000"))
+PC_STATS_INGEST_CHUNK_SIZE = int(os.getenv("PC_STATS_INGEST_CHUNK_SIZE", "1000"))
+# Largest body, in bytes, a gzip-encoded request may decompress to.
+DATA_UPLOAD_MAX_DECOMPRESSED_SIZE = int(
+    os.getenv("DATA_UPLOAD_MAX_DECOMPRESSED_SIZE", str(32 * 1024 * 1024))
+)
+# Seconds to wait after a minute ends before rolling it up, so late samples still count.
+PC_STATS_ROLLUP_LAG_SECONDS = int(os.getenv("PC_STATS_ROLLUP_LAG_SECONDS", "120"))
+# Days of raw PCStats samples and of each rollup resolution to keep; 0 keeps them forever.
+PC_STATS_RETENTION_RAW_DAYS = int(os.getenv("PC_STATS_RETENTION_RAW_DAYS", "7"))
+PC_STATS_RETENTION_1M_DAYS = int(os.getenv("PC_STATS_RETENTION_1M_DAYS", "30"))
+PC_STATS_RETENTION_1H_DAYS = int(os.getenv("PC_STATS_RETENTION_1H_DAYS", "365"))
+PC_STATS_RETENTION_1D_DAYS = int(os.getenv("PC_STATS_RETENTION_1D_DAYS", "0"))
+# Days of BoardLog entries to keep; 0 keeps them forever.
+BOARD_LOG_RETENTION_DAYS = int(os.getenv("BOARD_LOG_RETENTION_DAYS", "0"))
+# Days each PostgreSQL partition of PCStats and BoardLog covers (see partition_tables), and days of
+# partitions created ahead of time.
+PC_STATS_PARTITION_DAYS = int(os.getenv("PC_STATS_PARTITION_DAYS", "1"))
+BOARD_LOG_PARTITION_DAYS = int(os.getenv("BOARD_LOG_PARTITION_DAYS", "7"))
+PARTITION_PREMAKE_DAYS = int(os.getenv("PARTITION_PREMAKE_DAYS", "14"))
+# Rows per DELETE when pruning tables that are not partitioned.
+RETENTION_DELETE_CHUNK_SIZE = int(os.getenv("RETENTION_DELETE_CHUNK_SIZE", "5000"))
+# Boards scoring below these are served after healthier ones, or given no new work at all.
+DISPATCHER_HEALTH_DEPRIORITIZE_SCORE = float(
+    os.getenv("DISPATCHER_HEALTH_DEPRIORITIZE_SCORE", "0.8")
+)
+DISPATCHER_QUARANTINE_SCORE = float(os.getenv("DISPATCHER_QUARANTINE_SCORE", "0.3"))
+# Reserve the next request for busy boards expected to finish within this many seconds;
+# 0 disables it.
+DISPATCHER_RESERVE_AHEAD_SECONDS = int(os.getenv("DISPATCHER_RESERVE_AHEAD_SECONDS", "0"))
@@ -10,3 +10,40 @@ logging.disable(logging.CRITICAL)
 def api_client():
     return APIClient()
 
+
+@pytest.fixture
+def agent_client(api_client, django_user_model):
+    """``api_client`` signed in as a TestPC agent account."""
+    agent = django_user_model.objects.create_user(email="agent@example.com", username="agent")
+    api_client.force_authenticate(agent)
+    return api_client
+
+
+@pytest.fixture
+def make_fleet(db):
+    """Create one TestPC with ``count`` idle j721e boards, all with the same capabilities."""
+    from apps.boards.models import Board, Capability, TestPC
+
+    def make(count=4, capabilities=("uart",), hostname="pc-1", ip_address="10.0.0.1"):
+        caps = [Capability.objects.get_or_create(name=name)[0] for name in capabilities]
+        test_pc = TestPC.objects.create(
+            hostname=hostname, ip_address=ip_address, os_version="ubuntu_22_04", status="ONLINE"
+        )
+        boards = []
+        for i in range(count):
+            board = Board.objects.create(
+                name=f"{hostname}-board-{i}",
+                hardware_serial_number=f"{hostname}-sn-{i}",
+                project="test",
+                platform="j721e",
+                test_farm="HLOS",
+                sdk_version="9.0",
+                status="IDLE",
+                is_alive=True,
+                test_pc=test_pc,
+            )
+            board.capabilities.set(caps)
+            boards.append(board)
+        return test_pc, boards
+
+    return make
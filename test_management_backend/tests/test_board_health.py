@@ -0,0 +1,71 @@
+import pytest
+
+from apps.boards import health
+from apps.boards.models import BoardLog
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+
+
+@pytest.fixture(autouse=True)
+def health_settings(settings):
+    settings.BOARD_HEALTH_ALPHA = 0.5
+    settings.DISPATCHER_QUARANTINE_SCORE = 0.3
+
+
+@pytest.fixture
+def board(make_fleet):
+    _test_pc, boards = make_fleet(count=1)
+    return boards[0]
+
+
+def score(board):
+    board.refresh_from_db()
+    return board.health_score
+
+
+def test_record_moves_the_score_towards_the_outcome(board):
+    health.record([board.pk], 0.0)
+    assert score(board) == pytest.approx(0.5)
+    health.record([board.pk], 1.0)
+    assert score(board) == pytest.approx(0.75)
+    assert board.health_updated_at is not None
+
+
+def test_repeated_ids_weigh_as_consecutive_updates(board):
+    health.record([board.pk, board.pk], 0.0)
+    # 1 - (1 - 0.5) ** 2 = 0.75 of the way to 0.
+    assert score(board) == pytest.approx(0.25)
+
+
+def test_record_results_counts_passes_and_failures(make_fleet):
+    _test_pc, (passing, failing) = make_fleet(count=2)
+    health.record([passing.pk, failing.pk], 0.0)
+    health.record_results([(passing.pk, True), (failing.pk, False), (None, False)])
+    assert score(passing) == pytest.approx(0.75)
+    assert score(failing) == pytest.approx(0.25)
+
+
+def test_crossing_the_threshold_logs_quarantine_and_release(board):
+    health.record([board.pk], 0.0)
+    assert not BoardLog.objects.filter(board=board).exists()
+
+    health.record([board.pk], 0.0)
+    assert score(board) == pytest.approx(0.25)
+    assert board.is_quarantined
+    quarantined = BoardLog.objects.get(board=board)
+    assert (quarantined.level, quarantined.message.startswith("Quarantined")) == ("WARN", True)
+
+    health.record_results([(board.pk, True)])
+    assert score(board) == pytest.approx(0.625)
+    levels = BoardLog.objects.filter(board=board).order_by("created_at").values_list("level")
+    assert list(levels) == [("WARN",), ("INFO",)]
+
+
+def test_quarantined_boards_get_no_work(board):
+    health.record([board.pk, board.pk], 0.0)
+    created = dispatcher_service.queue_requests([{"platform": "j721e"}]).created
+    assert Request.objects.get(pk=created[0].pk).status == "QUEUED"
+
+    health.record([board.pk], 1.0)
+    dispatcher_service.schedule()
+    assert Request.objects.get(pk=created[0].pk).status == "RUNNING"
@@ -0,0 +1,177 @@
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+from apps.boards import health, heartbeats
+from apps.boards.models import Board, BoardLog
+from config.celery import app
+
+
+@pytest.fixture(autouse=True)
+def heartbeat_settings(settings):
+    settings.BOARD_HEARTBEAT_WRITE_BEHIND = False
+    settings.BOARD_HEARTBEAT_MAX_GAP = 60
+    settings.BOARD_HEALTH_HEARTBEAT_ALPHA = 0.5
+    settings.DISPATCHER_QUARANTINE_SCORE = 0.3
+
+
+@pytest.fixture
+def fleet(make_fleet):
+    return make_fleet(count=2)
+
+
+def beat(client, test_pc, boards, **data):
+    response = client.post(
+        f"/api/v1/test-pcs/{test_pc.pk}/heartbeat/", {"boards": boards, **data}, format="json"
+    )
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+def state(board):
+    board.refresh_from_db()
+    return board.is_alive, board.status
+
+
+def test_heartbeat_requires_authentication(api_client, fleet):
+    test_pc, _boards = fleet
+    response = api_client.post(f"/api/v1/test-pcs/{test_pc.pk}/heartbeat/", {}, format="json")
+    assert response.status_code in (401, 403)
+
+
+def test_heartbeat_stamps_the_pc_and_its_boards(agent_client, fleet):
+    test_pc, boards = fleet
+    body = beat(agent_client, test_pc, [{"id": str(board.pk)} for board in boards])
+
+    assert (body["seen"], body["changed"], body["unknown"]) == (2, [], [])
+    test_pc.refresh_from_db()
+    assert test_pc.last_heartbeat_at is not None
+    assert Board.objects.filter(pk__in=[b.pk for b in boards], last_heartbeat_at=None).count() == 0
+
+
+def test_dead_boards_go_offline_and_come_back_idle(agent_client, fleet):
+    test_pc, (board, _other) = fleet
+
+    body = beat(agent_client, test_pc, [{"id": str(board.pk), "is_alive": False}])
+    assert state(board) == (False, "OFFLINE")
+    assert [(c["was_status"], c["status"]) for c in body["changed"]] == [("IDLE", "OFFLINE")]
+    assert BoardLog.objects.get(board=board).level == "WARN"
+
+    beat(agent_client, test_pc, [{"id": str(board.pk), "is_alive": True}])
+    assert state(board) == (True, "IDLE")
+
+
+def test_reported_status_wins_except_over_running_or_locked_boards(agent_client, fleet):
+    test_pc, (board, busy) = fleet
+    Board.objects.filter(pk=busy.pk).update(status="BUSY")
+
+    beat(
+        agent_client,
+        test_pc,
+        [{"id": str(board.pk), "status": "ERROR"}, {"id": str(busy.pk), "status": "UPDATING_SDK"}],
+    )
+    assert state(board) == (True, "ERROR")
+    assert state(busy) == (True, "BUSY")
+    assert BoardLog.objects.get(board=board).level == "ERROR"
+
+
+def test_unknown_and_foreign_boards_are_reported_not_touched(agent_client, fleet, make_fleet):
+    test_pc, (board, _other) = fleet
+    _other_pc, (foreign,) = make_fleet(count=1, hostname="pc-2", ip_address="10.0.0.2")
+    missing = uuid.uuid4()
+
+    body = beat(
+        agent_client,
+        test_pc,
+        [{"id": str(board.pk)}, {"id": str(foreign.pk), "is_alive": False}, {"id": str(missing)}],
+    )
+    assert body["seen"] == 1
+    assert set(body["unknown"]) == {str(foreign.pk), str(missing)}
+    assert state(foreign) == (True, "IDLE")
+
+
+def test_late_heartbeats_quarantine_and_on_time_ones_release(agent_client, fleet):
+    test_pc, (board, _other) = fleet
+    report = [{"id": str(board.pk)}]
+    stale = timezone.now() - timedelta(minutes=5)
+
+    for _ in range(2):
+        Board.objects.filter(pk=board.pk).update(last_heartbeat_at=stale)
+        beat(agent_client, test_pc, report)
+    board.refresh_from_db()
+    # Each late beat halves the score: 1.0 -> 0.5 -> 0.25.
+    assert board.health_score == pytest.approx(0.25)
+    assert board.is_quarantined
+    assert BoardLog.objects.filter(board=board, message__startswith="Quarantined").exists()
+
+    beat(agent_client, test_pc, report)
+    board.refresh_from_db()
+    assert board.health_score == pytest.approx(0.625)
+    assert BoardLog.objects.filter(board=board, message__startswith="Released").exists()
+
+
+@pytest.fixture
+def write_behind(settings):
+    settings.BOARD_HEARTBEAT_WRITE_BEHIND = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_failed_flush_keeps_the_buffered_heartbeat_visible(
+    agent_client, fleet, write_behind, django_capture_on_commit_callbacks
+):
+    test_pc, (board, _other) = fleet
+    beat(agent_client, test_pc, [{"id": str(board.pk)}])
+    seen_at = heartbeats.buffered([test_pc.pk])[test_pc.pk]["seen_at"]
+
+    with mock.patch.object(health, "apply_heartbeats", side_effect=DatabaseError("gone")):
+        with django_capture_on_commit_callbacks(execute=True), pytest.raises(DatabaseError):
+            heartbeats.flush()
+
+    # Nothing was written, the entry is still buffered and the API still reports it.
+    test_pc.refresh_from_db()
+    assert test_pc.last_heartbeat_at is None
+    assert heartbeats.buffered([test_pc.pk])[test_pc.pk]["seen_at"] == seen_at
+    body = agent_client.get(f"/api/v1/test-pcs/{test_pc.pk}/").json()
+    assert body["last_heartbeat_at"] == seen_at.isoformat().replace("+00:00", "Z")
+
+
+def test_scheduled_flush_persists_and_empties_the_buffer(
+    agent_client, fleet, write_behind, django_capture_on_commit_callbacks
+):
+    test_pc, (board, _other) = fleet
+    beat(agent_client, test_pc, [{"id": str(board.pk)}])
+    seen_at = heartbeats.buffered([test_pc.pk])[test_pc.pk]["seen_at"]
+    app.loader.import_default_modules()  # registers tasks as a worker does at startup
+    task = django_settings.CELERY_BEAT_SCHEDULE["boards-flush-heartbeats"]["task"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        flushed = app.tasks[task].apply().get()
+
+    assert flushed == {"test_pcs": 1, "boards": 1}
+    test_pc.refresh_from_db()
+    board.refresh_from_db()
+    assert test_pc.last_heartbeat_at == board.last_heartbeat_at == seen_at
+    assert heartbeats.buffered([test_pc.pk]) == {}
+
+
+def test_flush_keeps_entries_replaced_while_it_ran(
+    agent_client, fleet, write_behind, django_capture_on_commit_callbacks
+):
+    test_pc, (board, _other) = fleet
+    beat(agent_client, test_pc, [{"id": str(board.pk)}])
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        heartbeats.flush()
+    beat(agent_client, test_pc, [{"id": str(board.pk)}])
+    for callback in callbacks:
+        callback()
+
+    assert test_pc.pk in heartbeats.buffered([test_pc.pk])
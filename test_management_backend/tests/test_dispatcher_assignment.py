@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.dispatcher.assignment import MinCostFlow, greedy_assignment, optimal_assignment
+from apps.dispatcher.benchmarks import SyntheticBoard
+from apps.dispatcher.matching import CapabilityCatalog, RequestIndex
+from apps.dispatcher.models import TestRequest as Request
+
+CATALOG = CapabilityCatalog([(1, "uart"), (2, "ethernet")])
+
+
+def _index(*requests):
+    index = RequestIndex(CATALOG)
+    index.extend((req, CATALOG.mask_for_names(req.required_capabilities)) for req in requests)
+    return index
+
+
+def _request(pk, capabilities, priority, age=0):
+    return Request(
+        pk=pk,
+        platform="j721e",
+        priority=priority,
+        required_capabilities=capabilities,
+        created_at=timezone.now() - timedelta(seconds=age),
+    )
+
+
+def _board(pk, *capabilities):
+    return SyntheticBoard(pk=pk, platform="j721e", capabilities=frozenset(capabilities))
+
+
+def _masks(*boards):
+    return {board.pk: CATALOG.mask_for_names(",".join(board.capabilities)) for board in boards}
+
+
+def _pairs(plan):
+    return sorted((board.pk, req.pk) for board, req in plan)
+
+
+def test_optimal_assignment_beats_greedy_on_contended_board():
+    # Greedy hands the versatile board the urgent uart-only request, leaving the plain board
+    # with nothing it can run; the optimum gives each board one request.
+    both, uart_only = _board("both", "uart", "ethernet"), _board("uart", "uart")
+    boards, masks = [both, uart_only], _masks(both, uart_only)
+    requests = (_request(1, "uart", priority=5), _request(2, "ethernet,uart", priority=1))
+
+    greedy = greedy_assignment("j721e", boards, masks, _index(*requests))
+    optimal = optimal_assignment("j721e", boards, masks, _index(*requests))
+
+    assert _pairs(greedy) == [("both", 1)]
+    assert _pairs(optimal) == [("both", 2), ("uart", 1)]
+
+
+def test_optimal_assignment_prefers_higher_priority_among_maximum_matchings():
+    board = _board("uart", "uart")
+    requests = (_request(1, "uart", priority=1, age=60), _request(2, "uart", priority=3))
+
+    plan = optimal_assignment("j721e", [board], _masks(board), _index(*requests))
+
+    assert _pairs(plan) == [("uart", 2)]
+
+
+def test_min_cost_flow_on_small_network():
+    # source -> {a, b} -> sink with a cheaper but narrower path through a.
+    network = MinCostFlow(4)
+    network.add_edge(0, 1, 1, 1)
+    network.add_edge(0, 2, 2, 3)
+    network.add_edge(1, 3, 2, 0)
+    network.add_edge(2, 3, 2, 0)
+
+    assert network.solve(0, 3) == (3, 7)
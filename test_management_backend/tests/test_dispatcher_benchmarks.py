@@ -0,0 +1,46 @@
+import pytest
+
+from apps.dispatcher.benchmarks import (
+    benchmark_assignment,
+    benchmark_matcher,
+    build_fleet,
+    indexed_pass,
+    legacy_scan_pass,
+    seed_fleet,
+    simulate,
+)
+
+
+@pytest.mark.parametrize("boards", [10, 50, 200])
+def test_indexed_matching_assigns_like_legacy_scan(boards):
+    fleet = build_fleet(boards, requests_per_board=5, seed=boards)
+    assert indexed_pass(fleet) == legacy_scan_pass(fleet)
+
+
+def test_benchmark_matcher_reports_both_passes():
+    rows = benchmark_matcher([20, 40], requests_per_board=5, legacy_limit=20)
+    assert rows[0]["assigned"] == rows[0]["legacy_assigned"]
+    assert rows[1]["legacy_assigned"] is None
+    assert all(row["indexed_ms"] >= 0 for row in rows)
+
+
+def test_optimal_assignment_serves_at_least_as_many_boards_as_greedy():
+    rows = benchmark_assignment([20, 60, 120], requests_per_board=1, seed=3)
+    by_size = {}
+    for row in rows:
+        by_size.setdefault(row["boards"], {})[row["mode"]] = row["assigned"]
+    for assigned in by_size.values():
+        assert assigned["optimal"] >= assigned["greedy"]
+
+
+@pytest.mark.django_db
+def test_simulation_drains_queue_without_double_dispatch():
+    fleet = build_fleet(16, requests_per_board=3, blocked_ratio=0.0, seed=1, prefix="bench-")
+    seeded = seed_fleet(fleet, prefix="bench-", with_requests=False)
+
+    result = simulate(seeded, fleet, arrivals_per_tick=10, completions_per_tick=8)
+
+    assert result["violations"] == []
+    assert result["requests"] == len(fleet.requests)
+    assert result["assigned"] > 0
+    assert result["operations"]["queue_requests"]["calls"] > 0
@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from apps.boards.models import Board
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+from apps.dispatcher.signals import requests_finished
+
+
+@pytest.fixture
+def finished():
+    received = []
+
+    def receiver(sender, requests, **kwargs):
+        received.extend(req.request_id for req in requests)
+
+    requests_finished.connect(receiver)
+    yield received
+    requests_finished.disconnect(receiver)
+
+
+@pytest.fixture
+def running(make_fleet):
+    """Three running requests on three boards plus one still queued."""
+    make_fleet(count=3)
+    ids = dispatcher_service.queue_requests([{"platform": "j721e"} for _ in range(4)]).request_ids
+    requests = Request.objects.filter(pk__in=ids)
+    running = list(requests.filter(status="RUNNING").values_list("pk", flat=True))
+    queued = list(requests.filter(status="QUEUED").values_list("pk", flat=True))
+    assert len(running) == 3 and len(queued) == 1
+    return running, queued[0]
+
+
+@pytest.mark.django_db
+def test_complete_requests_finishes_a_mixed_batch(running, finished):
+    (passed, failed, _other), queued = running
+    boards = dict(
+        Request.objects.filter(pk__in=[passed, failed]).values_list("pk", "executed_on_board")
+    )
+
+    result = dispatcher_service.complete_requests(
+        [(passed, True), (failed, False), (queued, True), (999999, True)]
+    )
+
+    assert result == {"completed": 3, "ignored": [999999]}
+    assert sorted(finished) == sorted([passed, failed, queued])
+    statuses = dict(
+        Request.objects.filter(pk__in=[passed, failed, queued]).values_list("pk", "status")
+    )
+    assert statuses == {passed: "DONE", failed: "FAILED", queued: "DONE"}
+    freed = Board.objects.filter(pk__in=boards.values())
+    assert set(freed.values_list("status", flat=True)) == {"IDLE"}
+    assert Board.objects.get(pk=boards[failed]).health_score < 1.0
+
+
+@pytest.mark.django_db
+def test_complete_requests_ignores_already_finished_ids(running, finished):
+    (first, second, _other), _queued = running
+    dispatcher_service.complete_requests([(first, True)])
+    finished.clear()
+
+    result = dispatcher_service.complete_requests([(first, False), (second, True)])
+
+    assert result == {"completed": 1, "ignored": [first]}
+    assert finished == [second]
+    assert Request.objects.get(pk=first).status == "DONE"
+
+
+@pytest.mark.django_db
+def test_calls_sharing_a_timestamp_only_claim_their_own_rows(running, finished):
+    (first, second, _other), _queued = running
+    frozen = timezone.now()
+    with mock.patch("apps.dispatcher.services.timezone.now", return_value=frozen):
+        dispatcher_service.complete_requests([(first, True)])
+        finished.clear()
+        result = dispatcher_service.complete_requests([(first, True), (second, True)])
+
+    assert result["completed"] == 1
+    assert finished == [second]
@@ -0,0 +1,17 @@
+import pytest
+
+from apps.dispatcher.benchmarks import find_double_dispatch, hammer_schedule
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_schedule_never_double_dispatches(make_fleet):
+    make_fleet(count=6)
+    result = dispatcher_service.queue_requests([{"platform": "j721e"} for _ in range(60)])
+
+    report = hammer_schedule(result.request_ids, threads=6, processes=0, rounds=15)
+
+    assert report["violations"] == []
+    assert find_double_dispatch(result.request_ids) == []
+    assert Request.objects.filter(pk__in=result.request_ids, status__in=["DONE", "FAILED"]).exists()
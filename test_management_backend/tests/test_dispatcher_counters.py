@@ -0,0 +1,50 @@
+import pytest
+
+from apps.dispatcher import counters
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+
+
+@pytest.fixture
+def fleet(make_fleet):
+    """Two requests running on two boards and one queued, with freshly counted counters."""
+    make_fleet(count=2)
+    ids = dispatcher_service.queue_requests([{"platform": "j721e"} for _ in range(3)]).request_ids
+    counters.recount()
+    return ids
+
+
+def complete(results, capture):
+    with capture(execute=True):
+        dispatcher_service.complete_requests(results)
+
+
+@pytest.mark.django_db
+def test_completions_keep_the_cached_counters_exact(fleet, django_capture_on_commit_callbacks):
+    first, second, queued = fleet
+    assert counters.read() == {
+        "queued_requests": 1,
+        "running_requests": 2,
+        "busy_boards": 2,
+        "idle_boards": 0,
+    }
+
+    complete([(first, True), (queued, False)], django_capture_on_commit_callbacks)
+
+    assert counters.read() == counters.recount()
+    assert counters.read()["running_requests"] == 1
+
+
+@pytest.mark.django_db
+def test_running_request_without_a_board_is_taken_off_the_running_count(
+    fleet, django_capture_on_commit_callbacks
+):
+    first, _second, queued = fleet
+    Request.objects.get(pk=first).executed_on_board.delete()
+    counters.recount()
+
+    complete([(first, True)], django_capture_on_commit_callbacks)
+
+    assert counters.read() == counters.recount()
+    assert counters.read()["queued_requests"] == 1
+    assert Request.objects.get(pk=queued).status == "QUEUED"
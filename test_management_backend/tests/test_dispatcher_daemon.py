@@ -0,0 +1,86 @@
+from unittest import mock
+
+import pytest
+
+from apps.dispatcher import wakeup
+from apps.dispatcher.daemon import DispatcherDaemon
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+from apps.dispatcher.wakeup import Wakeup, WakeupListener
+
+
+@pytest.fixture
+def daemon_mode(settings):
+    settings.DISPATCHER_INLINE_SCHEDULING = False
+    settings.DISPATCHER_WAKEUP_BACKEND = "channels"
+
+
+class FakeListener:
+    kind = "fake"
+
+    def __init__(self, *bursts):
+        self.bursts = list(bursts)
+
+    def wait(self, timeout, coalesce):
+        return self.bursts.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_wake_notifies_the_daemon_instead_of_scheduling(daemon_mode):
+    with mock.patch.object(wakeup, "notify") as notify, mock.patch.object(
+        dispatcher_service, "schedule"
+    ) as schedule:
+        dispatcher_service.wake(platforms={"j721e"}, board_ids=[7])
+
+    notify.assert_called_once_with(full=False, platforms={"j721e"}, board_ids=[7])
+    schedule.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_arrivals_wait_for_the_daemon_pass(make_fleet, daemon_mode):
+    make_fleet(count=1)
+    (pk,) = dispatcher_service.queue_requests([{"platform": "j721e"}]).request_ids
+    assert Request.objects.get(pk=pk).status == "QUEUED"
+
+    DispatcherDaemon(listener=FakeListener([Wakeup(platforms={"j721e"})])).run(max_loops=1)
+
+    assert Request.objects.get(pk=pk).status == "RUNNING"
+
+
+@pytest.mark.django_db
+def test_notifications_sent_on_commit_reach_the_listener_merged(
+    daemon_mode, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        wakeup.notify(platforms=["j721e"])
+        wakeup.notify(board_ids=[3, 4])
+
+    received = WakeupListener().wait(timeout=1, coalesce=0.05)
+
+    assert len(received) == 2
+    merged = Wakeup()
+    for item in received:
+        merged.merge(item)
+    assert merged == Wakeup(platforms={"j721e"}, board_ids={"3", "4"})
+
+
+@pytest.mark.django_db
+def test_daemon_runs_one_pass_per_burst_and_a_full_pass_when_idle():
+    service = mock.Mock()
+    burst = [Wakeup(platforms={"j721e"}), Wakeup(platforms={"am62x"}, board_ids={"9"})]
+    daemon = DispatcherDaemon(service=service, listener=FakeListener(burst, []))
+
+    daemon.run(max_loops=2)
+
+    assert service.method_calls == [
+        mock.call.schedule(platforms={"j721e", "am62x"}),
+        mock.call.schedule_boards({"9"}),
+        mock.call.schedule(),
+    ]
+
+
+def test_oversized_wakeups_ask_for_a_full_pass():
+    huge = Wakeup(board_ids={str(pk) for pk in range(5000)})
+    assert Wakeup.decode(huge.encode()) == Wakeup(full=True)
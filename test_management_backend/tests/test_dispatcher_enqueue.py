@@ -0,0 +1,94 @@
+from unittest import mock
+
+import pytest
+from django.db import DatabaseError, connection
+from django.test import override_settings
+
+from apps.dispatcher import counters, services
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+
+
+@pytest.fixture
+def no_boards(db):
+    """Keep requests queued: no boards exist, so scheduling passes assign nothing."""
+
+
+def _keyed(*keys):
+    return [{"platform": "j721e", "client_key": key} for key in keys]
+
+
+@pytest.mark.django_db
+def test_duplicate_keys_within_one_batch_create_one_row(no_boards):
+    result = dispatcher_service.queue_requests(_keyed("a", "b", "a") + [{"platform": "j721e"}])
+
+    assert len(result.created) == 3
+    first, second, repeat, unkeyed = result.request_ids
+    assert repeat == first and len({first, second, unkeyed}) == 3
+    assert result.duplicates == {"a": first}
+    assert Request.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_duplicate_keys_across_batches_return_existing_ids(
+    no_boards, django_capture_on_commit_callbacks
+):
+    first = dispatcher_service.queue_requests(_keyed("a", "b"))
+    queued = counters.read(fresh=True)["queued_requests"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second = dispatcher_service.queue_requests(_keyed("b", "c"))
+
+    assert [req.client_key for req in second.created] == ["c"]
+    assert second.duplicates == {"b": first.request_ids[1]}
+    assert second.request_ids[0] == first.request_ids[1]
+    assert Request.objects.count() == 3
+    assert counters.read()["queued_requests"] == queued + 1
+
+
+@pytest.mark.django_db
+@override_settings(DISPATCHER_ENQUEUE_CHUNK_SIZE=2)
+def test_duplicate_keys_across_chunks_of_one_submission(no_boards):
+    result = dispatcher_service.queue_requests(_keyed("a", "b", "c", "a", "b"))
+
+    assert len(result.created) == 3
+    assert result.request_ids[3:] == result.request_ids[:2]
+    assert set(result.duplicates) == {"a", "b"}
+    assert Request.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_keys_committed_by_another_submission_count_as_duplicates(no_boards):
+    # A racing submission that committed the key first is seen once the key lock is held.
+    other = Request.objects.create(platform="j721e", client_key="a")
+
+    result = dispatcher_service.queue_requests(_keyed("a", "b"))
+
+    assert [req.client_key for req in result.created] == ["b"]
+    assert result.duplicates == {"a": other.pk}
+
+
+@pytest.mark.django_db
+@override_settings(DISPATCHER_ENQUEUE_CHUNK_SIZE=2)
+def test_enqueue_view_commits_each_chunk_on_its_own(no_boards, agent_client, monkeypatch):
+    monkeypatch.setitem(connection.settings_dict, "ATOMIC_REQUESTS", True)
+    payload = {"requests": [{**req, "required_capabilities": []} for req in _keyed(*"abcd")]}
+    capability_ids = services._capability_ids
+    calls = []
+
+    def fail_second_chunk(names):
+        calls.append(names)
+        if len(calls) == 2:
+            raise DatabaseError("connection lost")
+        return capability_ids(names)
+
+    with mock.patch.object(services, "_capability_ids", fail_second_chunk):
+        with pytest.raises(DatabaseError):
+            agent_client.post("/api/v1/dispatcher/", payload, format="json")
+    assert set(Request.objects.values_list("client_key", flat=True)) == {"a", "b"}
+
+    response = agent_client.post("/api/v1/dispatcher/", payload, format="json")
+
+    assert response.status_code == 202
+    assert response.data["queued"] == 2
+    assert {item["client_key"] for item in response.data["duplicates"]} == {"a", "b"}
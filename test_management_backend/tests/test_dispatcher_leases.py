@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.boards.models import BoardLog
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+from apps.dispatcher.tasks import expire_request_leases
+
+LEASE_URL = "/api/v1/dispatcher/lease/"
+TOKEN = "pc-1-secret"
+
+# The lease view claims work on pool threads with their own connections, so data must commit.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def test_pc(make_fleet):
+    test_pc, _boards = make_fleet(count=1)
+    test_pc.auth_token = TOKEN
+    test_pc.save(update_fields=["auth_token"])
+    return test_pc
+
+
+def lease(client, test_pc, token=TOKEN, **body):
+    headers = {"X-TestPC-Token": token} if token else {}
+    return client.post(
+        LEASE_URL, {"test_pc": str(test_pc.pk), **body}, format="json", headers=headers
+    )
+
+
+def test_lease_hands_out_dispatched_work_once(agent_client, test_pc):
+    (pk,) = dispatcher_service.queue_requests([{"platform": "j721e"}]).request_ids
+
+    first = lease(agent_client, test_pc)
+    again = lease(agent_client, test_pc)
+
+    assert first.status_code == 200
+    assert [item["id"] for item in first.json()["leases"]] == [pk]
+    assert Request.objects.get(pk=pk).leased_until is not None
+    assert again.json()["leases"] == []
+
+
+@pytest.mark.parametrize("token", [None, "someone-else"])
+def test_leasing_another_pcs_work_is_forbidden(agent_client, test_pc, token):
+    dispatcher_service.queue_requests([{"platform": "j721e"}])
+
+    response = lease(agent_client, test_pc, token=token)
+
+    assert response.status_code == 403
+    assert not Request.objects.filter(leased_until__isnull=False).exists()
+
+
+def test_pcs_without_a_token_only_lease_to_admins(agent_client, test_pc, django_user_model):
+    test_pc.auth_token = ""
+    test_pc.save(update_fields=["auth_token"])
+    admin = django_user_model.objects.create_user(
+        email="admin@example.com", username="admin", role="ADMIN"
+    )
+    admin_client = APIClient()
+    admin_client.force_authenticate(admin)
+
+    assert lease(agent_client, test_pc, token="").status_code == 403
+    assert lease(admin_client, test_pc, token=None).status_code == 200
+
+
+def test_waiting_agent_is_woken_by_new_work(test_pc, django_user_model):
+    agent = django_user_model.objects.create_user(email="agent@example.com", username="agent")
+    access = str(RefreshToken.for_user(agent).access_token)
+    headers = {"Authorization": f"Bearer {access}", "X-TestPC-Token": TOKEN}
+
+    async def wait_for_work():
+        body = {"test_pc": str(test_pc.pk), "wait": 10}
+        waiting = asyncio.ensure_future(
+            AsyncClient().post(LEASE_URL, body, content_type="application/json", headers=headers)
+        )
+        await asyncio.sleep(0.3)
+        assert not waiting.done()
+        queued_at = time.monotonic()
+        await sync_to_async(dispatcher_service.queue_requests)([{"platform": "j721e"}])
+        return await waiting, time.monotonic() - queued_at
+
+    response, waited = async_to_sync(wait_for_work)()
+
+    assert response.status_code == 200
+    assert len(response.json()["leases"]) == 1
+    assert waited < 5
+
+
+def test_renew_extends_held_leases_and_reports_lost_ones(agent_client, test_pc):
+    pk, other = dispatcher_service.queue_requests([{"platform": "j721e"}] * 2).request_ids
+    lease(agent_client, test_pc)
+    before = Request.objects.get(pk=pk).leased_until
+    body = {"test_pc": str(test_pc.pk), "request_ids": [pk, other]}
+
+    forbidden = agent_client.post("/api/v1/dispatcher/renew-leases/", body, format="json")
+    response = agent_client.post(
+        "/api/v1/dispatcher/renew-leases/", body, format="json", headers={"X-TestPC-Token": TOKEN}
+    )
+
+    assert forbidden.status_code == 403
+    assert (response.data["renewed"], response.data["lost"]) == ([pk], [other])
+    assert Request.objects.get(pk=pk).leased_until > before
+
+
+def test_reserved_work_needs_the_pc_token(agent_client, test_pc):
+    params = {"test_pc": str(test_pc.pk)}
+    url = "/api/v1/dispatcher/reserved/"
+
+    assert agent_client.get(url, params).status_code == 403
+    assert agent_client.get(url, params, headers={"X-TestPC-Token": TOKEN}).status_code == 200
+
+
+def test_lapsed_leases_are_requeued_and_dispatched_again(agent_client, test_pc):
+    (pk,) = dispatcher_service.queue_requests([{"platform": "j721e"}]).request_ids
+    lease(agent_client, test_pc)
+    Request.objects.filter(pk=pk).update(leased_until=timezone.now() - timedelta(seconds=1))
+    board = Request.objects.get(pk=pk).executed_on_board
+
+    assert expire_request_leases() == 1
+
+    log = BoardLog.objects.get(board=board)
+    assert (log.level, log.message) == ("WARN", f"Lease on request {pk} expired; requeued")
+    # The freed board takes the request straight back, ready to be leased afresh.
+    req = Request.objects.get(pk=pk)
+    assert (req.status, req.executed_on_board_id, req.leased_until) == ("RUNNING", board.pk, None)
+    assert [item["id"] for item in lease(agent_client, test_pc).json()["leases"]] == [pk]
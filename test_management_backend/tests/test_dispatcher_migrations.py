@@ -0,0 +1,36 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE_BACKFILL = [("dispatcher", "0006_testrequest_capabilities")]
+BACKFILL = [("dispatcher", "0007_backfill_testrequest_capabilities")]
+
+
+def migrate(targets):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+@pytest.fixture
+def before_backfill(transactional_db):
+    yield migrate(BEFORE_BACKFILL)
+    migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+
+def test_backfill_links_requests_to_their_capabilities(before_backfill):
+    Capability = before_backfill.get_model("boards", "Capability")
+    TestRequest = before_backfill.get_model("dispatcher", "TestRequest")
+    Capability.objects.create(name="uart", is_active=True)
+    both = TestRequest.objects.create(platform="j721e", required_capabilities="uart,camera")
+    plain = TestRequest.objects.create(platform="j721e", required_capabilities="")
+
+    apps = migrate(BACKFILL)
+
+    Capability = apps.get_model("boards", "Capability")
+    TestRequest = apps.get_model("dispatcher", "TestRequest")
+    linked = TestRequest.objects.get(pk=both.pk).capabilities.values_list("name", "is_active")
+    assert sorted(linked) == [("camera", False), ("uart", True)]
+    assert not TestRequest.objects.get(pk=plain.pk).capabilities.exists()
+    assert Capability.objects.count() == 2
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.boards.models import Board, BoardLog
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+from apps.dispatcher.tasks import reap_expired_requests
+
+
+@pytest.fixture
+def overdue(make_fleet, settings):
+    """Two requests running on two boards, the first past its timeout, and one still queued."""
+    settings.DISPATCHER_REAPER_GRACE = 30
+    make_fleet(count=2)
+    ids = dispatcher_service.queue_requests([{"platform": "j721e"} for _ in range(3)]).request_ids
+    expired, running, queued = ids
+    Request.objects.filter(pk=expired).update(
+        timeout=60, started_at=timezone.now() - timedelta(seconds=120)
+    )
+    return Request.objects.get(pk=expired), running, queued
+
+
+def test_reaper_fails_overdue_requests_and_frees_their_boards(overdue):
+    expired, running, queued = overdue
+    board = expired.executed_on_board
+
+    assert reap_expired_requests() == 1
+
+    expired.refresh_from_db()
+    assert (expired.status, expired.completed_at is not None) == ("FAILED", True)
+    assert Request.objects.get(pk=running).status == "RUNNING"
+    log = BoardLog.objects.get(board=board)
+    assert (log.level, log.message) == ("ERROR", f"Request {expired.pk} timed out after 60s")
+    # The freed board goes straight back to the scheduler and takes the queued request.
+    assert Request.objects.get(pk=queued).executed_on_board_id == board.pk
+    assert Board.objects.get(pk=board.pk).health_score < 1.0
+
+
+def test_reaper_waits_out_the_grace_period(overdue, settings):
+    settings.DISPATCHER_REAPER_GRACE = 120
+    expired, _running, _queued = overdue
+
+    assert dispatcher_service.reap_expired() == []
+    assert Request.objects.get(pk=expired.pk).status == "RUNNING"
+
+
+def test_dry_run_only_lists_overdue_requests(overdue):
+    expired, _running, queued = overdue
+
+    assert dispatcher_service.reap_expired(dry_run=True) == [expired.pk]
+    assert Request.objects.get(pk=expired.pk).status == "RUNNING"
+    assert Request.objects.get(pk=queued).status == "QUEUED"
+    assert not BoardLog.objects.exists()
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from apps.boards.models import Board
+from apps.dispatcher import wakeup
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+
+
+@pytest.fixture
+def reserved(make_fleet):
+    """One request running on board 0 and one queued request reserved for idle board 1."""
+    test_pc, boards = make_fleet(count=2)
+    Board.objects.filter(pk=boards[1].pk).update(status="OFFLINE")
+    (running,) = dispatcher_service.queue_requests([{"platform": "j721e"}]).request_ids
+    assert Request.objects.get(pk=running).executed_on_board_id == boards[0].pk
+    Board.objects.filter(pk=boards[1].pk).update(status="IDLE")
+    waiting = Request.objects.create(
+        platform="j721e",
+        reserved_for_board=boards[1],
+        reserved_until=timezone.now() + timedelta(minutes=5),
+    )
+    return test_pc, boards, waiting.pk
+
+
+@pytest.mark.django_db
+def test_reservation_is_taken_when_the_host_has_a_slot(reserved):
+    _test_pc, boards, waiting = reserved
+
+    dispatcher_service.schedule_boards([boards[1].pk])
+
+    req = Request.objects.get(pk=waiting)
+    assert (req.status, req.executed_on_board_id) == ("RUNNING", boards[1].pk)
+
+
+@pytest.mark.django_db
+def test_reservation_waits_while_the_host_is_at_its_concurrency_limit(reserved):
+    test_pc, boards, waiting = reserved
+    test_pc.max_concurrent_runs = 1
+    test_pc.save(update_fields=["max_concurrent_runs"])
+
+    dispatcher_service.schedule_boards([boards[1].pk])
+
+    req = Request.objects.get(pk=waiting)
+    assert (req.status, req.reserved_for_board_id) == ("QUEUED", boards[1].pk)
+
+
+@pytest.mark.django_db
+def test_handover_is_left_to_the_daemon_when_scheduling_is_not_inline(reserved, settings):
+    settings.DISPATCHER_INLINE_SCHEDULING = False
+    _test_pc, boards, waiting = reserved
+    running = Request.objects.get(executed_on_board=boards[0]).pk
+    Request.objects.filter(pk=waiting).update(reserved_for_board=boards[0])
+
+    with mock.patch.object(wakeup, "notify") as notify, mock.patch.object(
+        dispatcher_service, "schedule_boards"
+    ) as schedule_boards:
+        dispatcher_service.complete_requests([(running, True)])
+
+    schedule_boards.assert_not_called()
+    notify.assert_called_once_with(full=False, platforms=(), board_ids=[boards[0].pk])
+    assert Request.objects.get(pk=waiting).status == "QUEUED"
@@ -0,0 +1,27 @@
+import pytest
+from django.core.cache import cache
+
+from apps.dispatcher.services import PASS_REPORT_CACHE_KEY, dispatcher_service
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def last_trigger(platform="j721e"):
+    return cache.get(PASS_REPORT_CACHE_KEY.format(platform=platform))["trigger"]
+
+
+@pytest.mark.django_db
+def test_passes_for_given_platforms_are_arrival_passes(make_fleet):
+    make_fleet(count=1)
+    dispatcher_service.schedule(platforms=["j721e"])
+    assert last_trigger() == "arrival"
+
+
+@pytest.mark.django_db
+def test_a_sweep_over_every_platform_is_a_full_pass(make_fleet):
+    make_fleet(count=1)
+    dispatcher_service.schedule()
+    assert last_trigger() == "full"
@@ -0,0 +1,132 @@
+import gzip
+import json
+
+import pytest
+
+from apps.boards.models import PCStats
+
+URL = "/api/v1/pc-stats/ingest/"
+
+
+@pytest.fixture
+def test_pc(make_fleet):
+    test_pc, _boards = make_fleet(count=0)
+    return test_pc
+
+
+def batch(test_pc, size=3, **columns):
+    samples = {
+        "timestamp": [1718000000 + 60 * i for i in range(size)],
+        "memory_total_gb": [16.0] * size,
+        "memory_used_gb": [8.0] * size,
+        "memory_free_gb": [8.0] * size,
+        "memory_percent": [50] * size,
+        "disk_total_gb": [500.0] * size,
+        "disk_used_gb": [100.0] * size,
+        "disk_free_gb": [400.0] * size,
+        "disk_percent": [20] * size,
+        "cpu_percent": [12.5] * size,
+        "process_count": [3] * size,
+        "thread_count": [30] * size,
+        **columns,
+    }
+    return {"test_pc": str(test_pc.pk), "samples": samples}
+
+
+def post_gzip(client, body: bytes):
+    return client.post(
+        URL, gzip.compress(body), content_type="application/json", HTTP_CONTENT_ENCODING="gzip"
+    )
+
+
+def test_plain_json_batch_is_stored(agent_client, test_pc):
+    response = agent_client.post(URL, batch(test_pc, status=["HEALTHY"] * 3), format="json")
+
+    assert response.status_code == 201, response.content
+    assert response.json()["created"] == 3
+    rows = PCStats.objects.filter(test_pc=test_pc).order_by("timestamp")
+    assert [row.status for row in rows] == ["HEALTHY"] * 3
+    assert rows[0].network_io_read_mb == 0
+    assert (rows[1].timestamp - rows[0].timestamp).total_seconds() == 60
+
+
+def test_gzip_batch_is_stored(agent_client, test_pc):
+    response = post_gzip(agent_client, json.dumps(batch(test_pc, size=5)).encode())
+
+    assert response.status_code == 201, response.content
+    assert PCStats.objects.filter(test_pc=test_pc).count() == 5
+
+
+def test_invalid_gzip_is_rejected(agent_client, test_pc):
+    response = agent_client.post(
+        URL, b"not gzip at all", content_type="application/json", HTTP_CONTENT_ENCODING="gzip"
+    )
+
+    assert response.status_code == 400
+    assert "gzip" in response.json()["detail"]
+
+
+def test_unsupported_encoding_is_rejected(agent_client, test_pc):
+    response = agent_client.post(
+        URL, json.dumps(batch(test_pc)), content_type="application/json", HTTP_CONTENT_ENCODING="br"
+    )
+
+    assert response.status_code == 400
+
+
+def test_decompressed_size_is_capped(agent_client, test_pc, settings):
+    body = json.dumps(batch(test_pc)).encode()
+    settings.DATA_UPLOAD_MAX_DECOMPRESSED_SIZE = len(body) - 1
+
+    response = post_gzip(agent_client, body)
+
+    assert response.status_code == 400
+    assert "larger than" in response.json()["detail"]
+    assert not PCStats.objects.exists()
+
+    settings.DATA_UPLOAD_MAX_DECOMPRESSED_SIZE = len(body)
+    assert post_gzip(agent_client, body).status_code == 201
+
+
+def test_columns_are_validated_with_the_offending_index(agent_client, test_pc):
+    response = agent_client.post(
+        URL,
+        batch(test_pc, cpu_percent=[10.0, 101.0, 5.0], memory_percent=[1, 2, "x"], bogus=[1, 2, 3]),
+        format="json",
+    )
+
+    assert response.status_code == 400
+    errors = response.json()
+    assert set(errors) == {"bogus"}
+
+    response = agent_client.post(
+        URL,
+        batch(test_pc, cpu_percent=[10.0, 101.0, 5.0], memory_percent=[1, 2, "x"]),
+        format="json",
+    )
+    errors = response.json()
+    assert errors["cpu_percent"] == ["Value 101.0 at index 1 is above 100."]
+    assert errors["memory_percent"] == ["Invalid value 'x' at index 2."]
+    assert not PCStats.objects.exists()
+
+
+@pytest.mark.parametrize("stamp", [1e18, -1e18])
+def test_out_of_range_timestamps_are_column_errors(agent_client, test_pc, stamp):
+    response = agent_client.post(
+        URL, batch(test_pc, timestamp=[1718000000, stamp, 1718000120]), format="json"
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"timestamp": [f"Invalid value {stamp!r} at index 1."]}
+    assert not PCStats.objects.exists()
+
+
+def test_columns_must_line_up(agent_client, test_pc):
+    body = batch(test_pc)
+    body["samples"]["cpu_percent"] = [1.0]
+    del body["samples"]["thread_count"]
+
+    errors = agent_client.post(URL, body, format="json").json()
+
+    assert errors["thread_count"] == ["This column is required."]
+    assert "samples" in errors
@@ -0,0 +1,131 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from apps.boards import rollups
+from apps.boards.models import PCStats, PCStatsRollup, PCStatsRollupMark
+
+DAY = datetime(2024, 6, 10, tzinfo=UTC)
+# One hour into the next day: every minute, hour and day of DAY is complete.
+NOW = DAY + timedelta(days=1, hours=1)
+
+
+@pytest.fixture(autouse=True)
+def rollup_settings(settings):
+    settings.PC_STATS_ROLLUP_LAG_SECONDS = 120
+    settings.PC_STATS_RETENTION_RAW_DAYS = 2
+    settings.PC_STATS_RETENTION_1M_DAYS = 2
+    settings.PC_STATS_RETENTION_1H_DAYS = 2
+    settings.PC_STATS_RETENTION_1D_DAYS = 0
+
+
+@pytest.fixture
+def test_pc(make_fleet):
+    test_pc, _boards = make_fleet(count=0)
+    return test_pc
+
+
+def sample(test_pc, moment, cpu):
+    return PCStats.objects.create(
+        test_pc=test_pc,
+        timestamp=moment,
+        cpu_percent=cpu,
+        memory_total_gb=16,
+        memory_used_gb=8,
+        memory_free_gb=8,
+        memory_percent=50,
+        disk_total_gb=500,
+        disk_used_gb=100,
+        disk_free_gb=400,
+        disk_percent=20,
+        process_count=1,
+        thread_count=1,
+    )
+
+
+@pytest.fixture
+def samples(test_pc):
+    for offset, cpu in [
+        (timedelta(seconds=30), 10),
+        (timedelta(seconds=45), 30),
+        (timedelta(minutes=1, seconds=10), 50),
+        (timedelta(hours=5, minutes=30), 90),
+    ]:
+        sample(test_pc, DAY + offset, cpu)
+    return test_pc
+
+
+def rollup(resolution, bucket_start):
+    return PCStatsRollup.objects.get(resolution=resolution, bucket_start=bucket_start)
+
+
+def marks():
+    return dict(PCStatsRollupMark.objects.values_list("resolution", "rolled_up_to"))
+
+
+def test_roll_up_builds_minutes_hours_and_days(samples):
+    assert rollups.roll_up(NOW) == {"1m": 3, "1h": 2, "1d": 1}
+
+    minute = rollup("1m", DAY)
+    assert (minute.samples, minute.cpu_avg, minute.cpu_min, minute.cpu_max) == (2, 20, 10, 30)
+    hour = rollup("1h", DAY)
+    assert (hour.samples, hour.cpu_avg, hour.cpu_max) == (3, pytest.approx(30), 50)
+    day = rollup("1d", DAY)
+    assert (day.samples, day.cpu_avg, day.cpu_min, day.cpu_max) == (4, 45, 10, 90)
+    assert day.memory_avg == 50
+
+
+def test_marks_advance_by_finished_buckets_and_rerunning_is_a_no_op(samples):
+    rollups.roll_up(NOW)
+
+    # Minutes lag real time by PC_STATS_ROLLUP_LAG_SECONDS; hours and days follow finished levels.
+    assert marks() == {
+        "1m": NOW - timedelta(minutes=2),
+        "1h": DAY + timedelta(days=1),
+        "1d": DAY + timedelta(days=1),
+    }
+    assert rollups.roll_up(NOW) == {"1m": 0, "1h": 0, "1d": 0}
+
+
+def test_samples_within_the_lag_wait_for_a_later_pass(samples):
+    rollups.roll_up(NOW)
+    sample(samples, NOW - timedelta(seconds=90), 70)
+
+    assert rollups.roll_up(NOW) == {"1m": 0, "1h": 0, "1d": 0}
+    # Five minutes on, its minute is past the lag and the hour it ends is complete.
+    assert rollups.roll_up(NOW + timedelta(minutes=5)) == {"1m": 1, "1h": 1, "1d": 0}
+
+
+def test_prune_keeps_what_is_not_rolled_up_yet(samples):
+    later = NOW + timedelta(days=10)
+    assert rollups.prune(later) == {}
+    assert PCStats.objects.count() == 4
+
+    rollups.roll_up(NOW)
+    sample(samples, NOW - timedelta(seconds=30), 70)
+    assert rollups.prune(later) == {"raw": 4, "1m": 3, "1h": 2}
+
+    # The newest sample is past the 1m mark; days are kept forever.
+    assert list(PCStats.objects.values_list("cpu_percent", flat=True)) == [70]
+    assert list(PCStatsRollup.objects.values_list("resolution", flat=True)) == ["1d"]
+
+
+def test_prune_respects_retention(samples):
+    rollups.roll_up(NOW)
+    assert rollups.prune(NOW) == {"raw": 0, "1m": 0, "1h": 0}
+    assert PCStats.objects.count() == 4
+
+
+def test_series_reads_rollups_and_summarizes_past_the_mark(samples, settings):
+    settings.PC_STATS_RETENTION_RAW_DAYS = 1
+    settings.PC_STATS_RETENTION_1M_DAYS = 0
+    end = DAY + timedelta(days=1)
+    assert rollups.pick_resolution(samples.pk, DAY, end, 30, NOW) == "1h"
+
+    live = rollups.series(samples.pk, DAY, end, max_points=30, resolution="1h")
+    rollups.roll_up(NOW)
+    stored = rollups.series(samples.pk, DAY, end, max_points=30, resolution="1h")
+
+    for result in (live, stored):
+        assert [point["t"] for point in result["points"]] == [DAY, DAY + timedelta(hours=5)]
+        assert [point["cpu"]["avg"] for point in result["points"]] == [pytest.approx(30), 90]
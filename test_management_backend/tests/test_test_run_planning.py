@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.dispatcher.models import TestRequest as Request
+from apps.dispatcher.services import dispatcher_service
+from apps.dispatcher.signals import FinishedRequest
+from apps.test_cases.models import TestCase as Case
+from apps.test_execution.models import TestCaseDuration as Duration
+from apps.test_execution.models import TestRun as Run
+from apps.test_execution.models import TestScenario as Scenario
+from apps.test_execution.planning import (
+    WorkItem,
+    dispatch_test_run,
+    order_work,
+    predict_makespan,
+    record_test_case_durations,
+)
+
+
+def items(*seconds):
+    return [
+        WorkItem(scenario_id=1, test_case_id=i, expected_seconds=s) for i, s in enumerate(seconds)
+    ]
+
+
+def test_order_work_keeps_declared_order():
+    work = items(1, 5, 3)
+    assert [item.test_case_id for item in order_work(work, "declared")] == [0, 1, 2]
+
+
+def test_order_work_puts_longest_first():
+    ordered = order_work(items(1, 5, 3, 5), "longest_first")
+    assert [item.expected_seconds for item in ordered] == [5, 5, 3, 1]
+
+
+def test_predict_makespan_sends_each_item_to_the_board_free_first():
+    # Board A: 5 + 1, board B: 3 + 2 + 1 -> the last item ends at 6.
+    assert predict_makespan(items(5, 3, 2, 1, 1), boards=2) == 6
+    assert predict_makespan(items(5, 3, 2), boards=5) == 5
+    assert predict_makespan(items(2, 2), boards=0) == 4
+
+
+def test_longest_first_shortens_the_predicted_makespan():
+    work = items(1, 1, 1, 1, 4)
+    assert predict_makespan(order_work(work, "declared"), 2) == 6
+    assert predict_makespan(order_work(work, "longest_first"), 2) == 4
+
+
+@pytest.fixture
+def cases(db):
+    return [Case.objects.create(title=f"case-{i}") for i in range(2)]
+
+
+def finished(case, seconds, success=True):
+    completed_at = timezone.now()
+    return FinishedRequest(
+        request_id=0,
+        test_run_id=None,
+        test_case_id=case.pk,
+        started_at=completed_at - timedelta(seconds=seconds),
+        completed_at=completed_at,
+        success=success,
+    )
+
+
+@override_settings(DISPATCHER_DURATION_EWMA_ALPHA=0.5)
+def test_record_test_case_durations_updates_the_ewma(cases):
+    first, second = cases
+    record_test_case_durations([finished(first, 100), finished(second, 40)])
+    record_test_case_durations([finished(first, 200), finished(first, 10, success=False)])
+    record_test_case_durations([finished(first, 50)])
+
+    stat = Duration.objects.get(test_case=first)
+    # 100 seeds the mean, then 100 + 0.5 * (200 - 100) = 150 and 150 + 0.5 * (50 - 150) = 100.
+    assert stat.runs == 3
+    assert stat.total_seconds == pytest.approx(350)
+    assert stat.recent_seconds == pytest.approx(100)
+    assert Duration.objects.get(test_case=second).recent_seconds == pytest.approx(40)
+
+
+@pytest.fixture
+def test_run(make_fleet, cases):
+    make_fleet(count=2)
+    scenario = Scenario.objects.create(name="smoke")
+    scenario.test_cases.set(cases)
+    run = Run.objects.create(name="nightly")
+    run.scenarios.add(scenario)
+    return run
+
+
+def complete_open_requests(test_run):
+    open_ids = test_run.test_requests.filter(status="RUNNING").values_list("pk", flat=True)
+    dispatcher_service.complete_requests([(pk, True) for pk in open_ids])
+
+
+def test_dispatching_again_before_the_run_finishes_is_a_retry(test_run):
+    first = dispatch_test_run(test_run, {"platform": "j721e"})
+    retry = dispatch_test_run(test_run, {"platform": "j721e"})
+
+    assert first["queued"] == 2
+    assert first["predicted_makespan_seconds"] == 600
+    assert (retry["queued"], retry["duplicates"]) == (0, 2)
+    assert retry["request_ids"] == first["request_ids"]
+
+
+def test_dispatching_a_finished_run_queues_it_again(test_run):
+    first = dispatch_test_run(test_run, {"platform": "j721e"})
+    complete_open_requests(test_run)
+    test_run.refresh_from_db()
+    first_dispatched_at = test_run.dispatched_at
+    assert test_run.actual_makespan_seconds is not None
+
+    rerun = dispatch_test_run(test_run, {"platform": "j721e"})
+    test_run.refresh_from_db()
+
+    assert (rerun["queued"], rerun["duplicates"]) == (2, 0)
+    assert not set(rerun["request_ids"]) & set(first["request_ids"])
+    assert test_run.dispatched_at > first_dispatched_at
+    assert test_run.actual_makespan_seconds is None
+    assert Request.objects.filter(test_run=test_run).count() == 4